@@ -3,14 +3,30 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import os
+import sys
+
+# Run as a script (python analysis/plot_graphs.py): the project root is not on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.results_store import ResultsStore, is_store
+
+
+def load_results(path, columns=None):
+    """
+    DataFrame of a results CSV or store. From a store only 'columns'
+    are read (memory-mapped), so wide sweeps stay cheap to plot.
+    """
+    if is_store(path):
+        return pd.DataFrame(ResultsStore(path).read(columns))
+    return pd.read_csv(path, usecols=columns)
 
 def plot_heatmap(csv_path, output_path):
-    # 1. Veriyi Oku
+    # 1. Veriyi Oku (CSV veya .store)
     if not os.path.exists(csv_path):
         print(f"HATA: {csv_path} bulunamadı. Önce simülasyonu çalıştırın.")
         return
 
-    df = pd.read_csv(csv_path)
+    df = load_results(csv_path, columns=['W', 'L', 'goodput_mbps'])
 
     # 2. Veriyi Grupla ve Ortalamasını Al
     # Her (W, L) çifti için 10 farklı deneme (run_id) yapmıştık.
@@ -66,7 +82,8 @@ if __name__ == "__main__":
     # Bir üst dizine çıkıp results klasörünü buluyoruz
     project_root = os.path.dirname(current_dir) 
     
-    csv_file = os.path.join(project_root, 'results', 'simulation_data.csv')
+    # İstenirse ilk argüman olarak başka bir CSV / .store verilebilir
+    csv_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(project_root, 'results', 'simulation_data.csv')
     output_image = os.path.join(project_root, 'results', 'figures', 'test.png')
 
     plot_heatmap(csv_file, output_image)
\ No newline at end of file
@@ -0,0 +1,198 @@
+# benchmarks/bench_simulator.py
+"""
+Simulator throughput benchmarks.
+
+Runs a few representative (W, L) points with fixed seeds and reports, for each:
+events/sec, simulated seconds per wall second, frames/sec, peak RSS and a
+per-layer breakdown of where the time goes (from a separate cProfile run).
+
+Usage (from the project root):
+    python -m benchmarks.bench_simulator                  # run and compare to baseline.json
+    python -m benchmarks.bench_simulator --save-baseline  # record a new baseline
+    python -m benchmarks.bench_simulator --case w64_retx  # a single case
+
+The exit code is 1 if any throughput metric dropped by more than --tolerance
+against the baseline. Timings are machine-specific: record the baseline on
+the machine that runs the comparison.
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import config
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# name: (W, L, file size in bytes, max simulated seconds, seed)
+CASES = {
+    # Small window, never finishes: runs into the simulated time cap
+    'small_w_capped': (2, 128, config.FILE_SIZE_BYTES, config.MAX_SIM_TIME, 20128),
+    # Large window with heavy retransmission
+    'w64_retx': (64, 1024, 10 * 1024 * 1024, config.MAX_SIM_TIME, 641024),
+    # Large frames: almost every frame is hit by the burst errors
+    'large_l': (16, 4096, config.FILE_SIZE_BYTES, config.MAX_SIM_TIME, 164096),
+}
+
+# Throughput metrics compared against the baseline (higher is better)
+THROUGHPUT_METRICS = ['events_per_sec', 'sim_sec_per_wall_sec', 'frames_per_sec']
+
+# Source file -> layer label for the time breakdown
+LAYERS = {
+    'event_manager.py': 'EventManager',
+    'physical.py': 'PhysicalLayer',
+    'link.py': 'LinkLayer',
+    'timer_wheel.py': 'LinkLayer',
+    'packet.py': 'LinkLayer',
+    'transport.py': 'TransportLayer',
+    'application.py': 'TransportLayer',
+}
+
+
+def _simulate(case, profile=False):
+    """
+    Runs one case in the current process. Returns (stats, wall seconds, profile or None).
+    """
+    import main
+
+    W, L, file_size, max_sim_time, seed = CASES[case]
+    default_file_size = config.FILE_SIZE_BYTES
+    config.FILE_SIZE_BYTES = file_size
+
+    profiler = cProfile.Profile() if profile else None
+    try:
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        stats = main.run_simulation(W, L, seed, 0, max_sim_time=max_sim_time, engine_stats=True)
+        if profiler:
+            profiler.disable()
+        wall = time.perf_counter() - start
+    finally:
+        config.FILE_SIZE_BYTES = default_file_size
+    return stats, wall, profiler
+
+
+def _layer_breakdown(profiler):
+    """
+    Share of total profiled time spent in each layer's own code.
+    Time in NumPy, builtins and the main loop is reported as 'other'.
+    """
+    times = {}
+    total = 0.0
+    for (filename, _, _), (_, _, tottime, _, _) in pstats.Stats(profiler).stats.items():
+        layer = 'other'
+        if os.path.basename(os.path.dirname(filename)) == 'src':
+            layer = LAYERS.get(os.path.basename(filename), 'other')
+        times[layer] = times.get(layer, 0.0) + tottime
+        total += tottime
+    return {layer: round(t / total, 4) for layer, t in sorted(times.items())} if total else {}
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_case(case, repeats):
+    """
+    Measures one case. Called in a fresh worker process, so peak RSS
+    belongs to this case alone.
+    """
+    best = None
+    for _ in range(repeats):
+        stats, wall, _ = _simulate(case)
+        if best is None or wall < best[1]:
+            best = (stats, wall)
+    stats, wall = best
+
+    _, _, profiler = _simulate(case, profile=True)
+
+    return {
+        'W': stats['W'],
+        'L': stats['L'],
+        'wall_sec': round(wall, 4),
+        'events': stats['events'],
+        'frames': stats['frames'],
+        'sim_sec': round(stats['duration'], 3),
+        'events_per_sec': round(stats['events'] / wall, 1),
+        'sim_sec_per_wall_sec': round(stats['duration'] / wall, 3),
+        'frames_per_sec': round(stats['frames'] / wall, 1),
+        'peak_rss_mb': _peak_rss_mb(),
+        'layer_time_share': _layer_breakdown(profiler),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of human-readable regressions.
+    """
+    regressions = []
+    for case, result in results.items():
+        reference = baseline.get('cases', {}).get(case)
+        if not reference:
+            continue
+        for metric in THROUGHPUT_METRICS:
+            old, new = reference[metric], result[metric]
+            if new < old * (1.0 - tolerance):
+                regressions.append(f"{case}: {metric} {old} -> {new} ({(new / old - 1) * 100:+.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator throughput benchmarks")
+    parser.add_argument('--case', action='append', choices=sorted(CASES),
+                        help="Case to run (repeatable, default: all)")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed runs per case (best is kept)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed relative drop in throughput before flagging a regression")
+    args = parser.parse_args()
+
+    results = {}
+    for case in args.case or list(CASES):
+        # One fresh process per case keeps peak RSS and warm caches independent
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results[case] = executor.submit(run_case, case, args.repeats).result()
+
+        r = results[case]
+        print(f"{case:16s} W={r['W']:<3} L={r['L']:<5} "
+              f"{r['events_per_sec']:>10.0f} ev/s  {r['sim_sec_per_wall_sec']:>8.1f} sim-s/s  "
+              f"{r['frames_per_sec']:>9.0f} frames/s  peak RSS {r['peak_rss_mb']} MB")
+        print(" " * 16 + "  ".join(f"{layer} {share * 100:.1f}%" for layer, share in r['layer_time_share'].items()))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'cases': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for line in regressions:
+        print("REGRESSION " + line)
+    if not regressions:
+        print("No regressions against the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,10 @@ Reference: BLG 337E Assignment 2 PDF
 # "Accepts a large data file (fixed at 100 MB)" [cite: 16]
 FILE_SIZE_BYTES = 100 * 1024 * 1024 
 
+# Real data mode: path of a file to transfer instead of FILE_SIZE_BYTES of
+# virtual (length-only) data. The receiver then verifies its SHA-256.
+PAYLOAD_FILE = None
+
 # "Application-side buffer capacity is fixed at 256 KB" [cite: 20]
 RECEIVER_BUFFER_SIZE = 256 * 1024 
 
@@ -19,6 +23,15 @@ TRANSPORT_HEADER_SIZE = 8
 # "Link Layer header overhead fixed at 24 bytes per frame" [cite: 31]
 LINK_HEADER_SIZE = 24
 
+# ACK format: 'per_frame' (one ACK per received data frame) or 'sack'
+# (cumulative ACK + bitmap of the receive window, see src/packet.py:SackFrame).
+# With SACKs, in-order frames are acknowledged every SACK_EVERY frames or after
+# SACK_DELAY seconds, whichever comes first; out-of-order and duplicate frames
+# are acknowledged immediately.
+ACK_MODE = 'per_frame'
+SACK_EVERY = 2
+SACK_DELAY = 0.01
+
 # --- PHYSICAL LAYER (BASELINE PARAMETERS) ---
 # "Bit Rate: R = 10 Mbps" [cite: 34]
 BIT_RATE = 10 * 10**6  
@@ -28,9 +41,69 @@ PROPAGATION_DELAY_FWD = 0.040  # 40 ms (Forward path)
 PROPAGATION_DELAY_REV = 0.010  # 10 ms (Reverse path/ACK)
 PROCESSING_DELAY = 0.002       # 2 ms (Per frame)
 
+# --- TRANSMIT QUEUES ---
+# 'shared': one transmitter for both directions (the original model, which
+# the results in results/ were produced with).
+# 'duplex': one transmitter per direction, ACKs never wait behind data frames.
+TRANSMITTER_MODE = 'shared'
+
+# Capacity of each transmit queue in bytes, frame being sent included
+# (None = unbounded), and what happens when it fills up: 'droptail' or 'red'.
+QUEUE_CAPACITY_BYTES = None
+QUEUE_DISCIPLINE = 'droptail'
+
+# RED (Floyd & Jacobson): thresholds as fractions of QUEUE_CAPACITY_BYTES,
+# drop probability at the upper threshold and averaging weight.
+RED_MIN_TH = 0.25
+RED_MAX_TH = 0.75
+RED_MAX_P = 0.1
+RED_WEIGHT = 0.002
+
 # --- ERROR MODEL (GILBERT-ELLIOT) ---
 # Parameters from Table 2 [cite: 39-40]
 P_G = 1e-6           # Good-state BER
 P_B = 5e-3           # Bad-state BER
 TRANS_G_TO_B = 0.002 # P(G->B)
-TRANS_B_TO_G = 0.05  # P(B->G)
\ No newline at end of file
+TRANS_B_TO_G = 0.05  # P(B->G)
+
+# Channel implementation, all with the same statistical model:
+# 'batched' (vectorised block sampling), 'matrix' (exact per-frame-size
+# probabilities, O(1) per frame) or 'scalar' (original one-draw-at-a-time sampler).
+CHANNEL_MODEL = 'batched'
+
+# One independent channel per direction (data path and ACK path, each with its
+# own random stream). False shares a single channel state between both
+# directions, in transmission order, as in the original model.
+CHANNEL_PER_DIRECTION = True
+
+# --- SIMULATION ENGINE ---
+# Limit simulation to avoid infinite loops (e.g., if Goodput is 0)
+# 100MB at 10Mbps takes ~80 seconds min. Let's give it 1000 simulated seconds max.
+MAX_SIM_TIME = 1000.0
+
+# Event queue backend: 'heap' (binary heap) or 'calendar' (bucketed, O(1) amortised).
+# Both pop events in the same order, so results do not depend on this choice.
+# The calendar queue pays off once the queue holds thousands of pending events.
+EVENT_QUEUE = 'heap'
+
+# Slot width of the retransmission timer wheel (seconds). Timers still expire at
+# their exact deadline; this only controls how they are bucketed.
+TIMER_WHEEL_TICK = 0.001
+
+# Frames sent back-to-back (window opening, simultaneous timeouts) are handed to
+# the physical layer in one call and delivered by a single train event, with the
+# same timing as one event per frame.
+FRAME_TRAINS = True
+
+# --- STEADY-STATE MODE ---
+# Stop a run once the batch-means goodput estimate has converged instead of
+# transferring the whole file. The first WARMUP_TIME simulated seconds are
+# discarded, the rest is cut into batches of BATCH_TIME seconds, and the run
+# stops when the CI half-width (relative to the mean, STEADY_STATE_CONFIDENCE
+# level) drops below STEADY_STATE_PRECISION with at least MIN_BATCHES batches.
+STEADY_STATE = False
+WARMUP_TIME = 5.0
+BATCH_TIME = 2.0
+STEADY_STATE_PRECISION = 0.05
+STEADY_STATE_CONFIDENCE = 0.95
+MIN_BATCHES = 10
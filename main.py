@@ -1,135 +1,42 @@
 # main.py
-import csv
-import random
-import time
+import argparse
+import functools
 import os
-import config
+import shutil
 
 # Import our modules
-from src.event_manager import EventManager
-from src.physical import PhysicalLayer
-from src.link import LinkLayer
-from src.transport import TransportLayer
-from src.application import ApplicationLayer
+from src.simulation import Simulation
+from src.sweep import build_grid, run_sweep, run_adaptive_sweep
+from src.surrogate import optimize
+from src.cache import ResultCache
 
+FIELDNAMES = ['W', 'L', 'run_id', 'goodput_mbps', 'retransmissions', 'avg_rtt', 'utilization', 'buffer_events', 'duration',
+              'rtt_std', 'rtt_p50', 'rtt_p99', 'rto_mean', 'rto_max', 'goodput_precision', 'stopped_early',
+              'queue_drops', 'queue_peak_bytes']
 
-def run_simulation(window_size, payload_size, seed, run_id):
+
+def run_simulation(window_size, payload_size, seed, run_id, max_sim_time=None, engine_stats=False,
+                   profile=False, steady_state=None):
     """
     Runs a SINGLE simulation with specific parameters.
+    max_sim_time overrides config.MAX_SIM_TIME.
+    steady_state overrides config.STEADY_STATE: goodput is then the
+    batch-means estimate after the warm-up, and the run stops as soon as it
+    reaches config.STEADY_STATE_PRECISION ('goodput_precision' and
+    'stopped_early' are filled in).
+    With engine_stats=True, the dictionary also carries simulator counters
+    ('events', 'frames') for benchmarking and the sampled RTO trajectory
+    ('rto_trajectory', (time, RTO) pairs).
+    With profile=True, it carries the per-handler EventManager profile ('profile').
     Returns: Stats dictionary (Goodput, etc.)
-    """
-    # 1. Setup Random Seed [cite: 61]
-    random.seed(seed)
-    
-    # 2. Initialize Layers
-    event_manager = EventManager()
-    
-    # Application
-    app_sender = ApplicationLayer(role='SENDER')
-    app_receiver = ApplicationLayer(role='RECEIVER')
-    
-    # Transport
-    transport_sender = TransportLayer(app_sender)
-    transport_receiver = TransportLayer(app_receiver)
-    
-    # Physical (Shared Channel)
-    physical_layer = PhysicalLayer(event_manager)
-    
-    # Link (ARQ)
-    # Note: Window Size is configurable [cite: 58]
-    link_sender = LinkLayer(physical_layer, event_manager, transport_sender, window_size=window_size)
-    link_receiver = LinkLayer(physical_layer, event_manager, transport_receiver, window_size=window_size)
-    
-    # 3. Wire them together
-    # Sender Link -> Receiver Link (via Physical)
-    link_sender.set_peer_callback(link_receiver.receive_frame_from_physical)
-    
-    # Receiver Link -> Sender Link (ACK path via Physical)
-    link_receiver.set_peer_callback(link_sender.receive_frame_from_physical)
-    
-    # 4. Start Simulation Loop
-    # Strategy: Sender Link Layer keeps pulling from Transport as long as window is open
-    
-    # Initial Kickstart: Try to send initial window
-    # To do this, we need a driving loop or periodic check.
-    # In Event-Driven, we can schedule a "Send More" event loop or just call it initially.
-    
-    def try_send_more():
-        # L = Payload Size (Frame Payload).
-        # Transport needs to fit into L - 24 bytes.
-        # So we ask Transport for segments that fit into 'payload_size' (which is L).
-        
-        # As long as window is not full...
-        while link_sender.next_seq_num < link_sender.send_base + link_sender.window_size:
-            segment = transport_sender.create_segments(max_payload_size=payload_size)
-            if segment is None:
-                break # No more data
-            
-            link_sender.send(segment)
-        
-        # If we still have data, schedule next check
-        if not app_receiver.is_finished():
-             # Check again every 1ms (simulated polling)
-            event_manager.schedule(0.001, try_send_more)
-
-    # Start the sending process
-    event_manager.schedule(0.0, try_send_more)
-    
-    # Run the Engine!
-    start_real_time = time.time()
-    
-    # Limit simulation to avoid infinite loops (e.g., if Goodput is 0)
-    # 100MB at 10Mbps takes ~80 seconds min. Let's give it 1000 simulated seconds max.
-    MAX_SIM_TIME = 1000.0
-    
-    while event_manager.event_queue:
-        event_manager.run_step() # We need to expose a single-step or check time
-        # Since our event_manager.run() is a loop, we can't easily interrupt unless we modify it.
-        # Let's rely on app_receiver.is_finished() inside handlers or events.
-        
-        # Better approach: Standard event_manager.run() runs until empty.
-        # But "try_send_more" keeps refilling it. We need a stop condition.
-        if app_receiver.is_finished():
-            break
-        
-        if event_manager.current_time > MAX_SIM_TIME:
-            break
-
-    # --- Metrics Calculation [cite: 45-53] ---
-    sim_duration = event_manager.current_time
-    total_bytes = app_receiver.bytes_received
-    
-    # Goodput (Mbps) = (Bits Delivered) / (Time in Seconds) / 10^6
-    goodput_mbps = (total_bytes * 8) / sim_duration / 1e6 if sim_duration > 0 else 0
-    
-    # YENİ: Detaylı Metrikler
-    # Retransmission: Sender Link Layer'dan alıyoruz
-    retransmissions = link_sender.total_retransmissions
-    
-    # Avg RTT: Sender Link Layer'dan ortalama alıyoruz
-    avg_rtt = 0
-    if link_sender.rtt_samples:
-        avg_rtt = sum(link_sender.rtt_samples) / len(link_sender.rtt_samples)
-        
-    # Buffer Events: Receiver Transport Layer'dan alıyoruz
-    buffer_events = transport_receiver.buffer_overflow_count
-    
-    # Utilization: (Goodput / Capacity) * 100 basit bir yaklaşımdır.
-    # Kapasite 10 Mbps.
-    utilization = (goodput_mbps / 10.0) * 100
 
-    return {
-        'W': window_size,
-        'L': payload_size,
-        'run_id': run_id,
-        'goodput_mbps': goodput_mbps,
-        # Yeni sütunlar:
-        'retransmissions': retransmissions,
-        'avg_rtt': avg_rtt,
-        'utilization': utilization,
-        'buffer_events': buffer_events,
-        'duration': sim_duration
-    }
+    The wiring lives in src/simulation.py (Simulation), which can also
+    pause, snapshot and fork a run.
+    """
+    with Simulation(window_size, payload_size, seed, run_id, max_sim_time=max_sim_time,
+                    profile=profile, steady_state=steady_state) as simulation:
+        simulation.run()
+        return simulation.stats(engine_stats=engine_stats)
 
 # --- Main Execution Block ---
 if __name__ == "__main__":
@@ -143,33 +50,77 @@ if __name__ == "__main__":
     # L_VALUES = [256, 512, 1024]
 
     RUNS_PER_CONFIG = 10 # [cite: 61]
-    
-    results = []
-    
+
+    parser = argparse.ArgumentParser(description="Selective Repeat ARQ parameter sweep")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: all cores, 1 = serial)")
+    parser.add_argument('--output', default=None,
+                        help="CSV file to write (and resume from); default results/simulation_data_test.csv, "
+                             "or results/optimization_history.csv with --optimize")
+    parser.add_argument('--store', action='store_true',
+                        help="Write a columnar results store (.store directory) instead of a CSV")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always simulate instead of reusing cached results from .cache/")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="Start from scratch instead of skipping finished runs")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Replicate each cell until its goodput CI reaches --target-precision")
+    parser.add_argument('--target-precision', type=float, default=0.05,
+                        help="Target CI half-width relative to the mean (adaptive mode)")
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help="Confidence level of the goodput CI (adaptive mode)")
+    parser.add_argument('--min-runs', type=int, default=5,
+                        help="Replications every cell gets (adaptive mode)")
+    parser.add_argument('--max-runs', type=int, default=30,
+                        help="Replication cap per cell (adaptive mode)")
+    parser.add_argument('--steady-state', action='store_true',
+                        help="Stop each run once its batch-means goodput has converged")
+    parser.add_argument('--optimize', action='store_true',
+                        help="Search for the best (W, L) with a surrogate model instead of the full grid")
+    parser.add_argument('--budget', type=int, default=30,
+                        help="Simulations the search may run in total (optimize mode)")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help="Points picked per search round, e.g. the worker count (optimize mode)")
+    args = parser.parse_args()
+    if args.output is None:
+        args.output = 'results/optimization_history.csv' if args.optimize else 'results/simulation_data_test.csv'
+    if args.store and not args.output.endswith('.store'):
+        args.output = os.path.splitext(args.output)[0] + '.store'
+
     print("Starting Simulation... (This may take a while)")
     
     # Create results directory
-    os.makedirs("results", exist_ok=True)
-    
-    total_sims = len(W_VALUES) * len(L_VALUES) * RUNS_PER_CONFIG
-    current_sim = 0
-    
-    with open('results/simulation_data_test.csv', 'w', newline='') as csvfile:
-        fieldnames = ['W', 'L', 'run_id', 'goodput_mbps', 'retransmissions', 'avg_rtt', 'utilization', 'buffer_events', 'duration']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for W in W_VALUES:
-            for L in L_VALUES:
-                for run_id in range(RUNS_PER_CONFIG):
-                    current_sim += 1
-                    # Use a deterministic seed for reproducibility
-                    seed = (W * 10000) + (L * 100) + run_id
-                    
-                    stats = run_simulation(W, L, seed, run_id)
-                    results.append(stats)
-                    writer.writerow(stats)
-                    
-                    print(f"[{current_sim}/{total_sims}] W={W}, L={L} -> Goodput={stats['goodput_mbps']:.3f} Mbps")
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+
+    simulate = run_simulation
+    if args.steady_state:
+        simulate = functools.partial(run_simulation, steady_state=True)
+    if not args.no_cache:
+        # Cells computed by any earlier sweep (same config and sources) are not rerun
+        simulate = ResultCache(simulate)
+
+    if args.optimize:
+        if args.no_resume and os.path.isdir(args.output):
+            shutil.rmtree(args.output)  # The history is the search state
+        elif args.no_resume and os.path.exists(args.output):
+            os.remove(args.output)
+        best = optimize(simulate, args.output, FIELDNAMES, budget=args.budget, batch_size=args.batch_size,
+                        workers=args.workers)
+        if best:
+            print(f"Best point: W={best['W']}, L={best['L']} -> predicted goodput "
+                  f"{best['predicted_goodput_mbps']:.3f} ± {best['predicted_std']:.3f} Mbps "
+                  f"({best['runs']} runs, mean {best['mean_goodput_mbps']:.3f} Mbps)")
+    elif args.adaptive:
+        # Per-cell confidence intervals go next to the per-run CSV
+        summary_path = os.path.splitext(args.output)[0] + '_ci.csv'
+        run_adaptive_sweep(simulate, W_VALUES, L_VALUES, args.output, FIELDNAMES, summary_path,
+                           min_runs=args.min_runs, max_runs=args.max_runs,
+                           target=args.target_precision, confidence=args.confidence,
+                           workers=args.workers, resume=not args.no_resume)
+        print(f"Confidence intervals saved to {summary_path}")
+    else:
+        tasks = build_grid(W_VALUES, L_VALUES, RUNS_PER_CONFIG)
+        run_sweep(simulate, tasks, args.output, FIELDNAMES,
+                  workers=args.workers, resume=not args.no_resume)
 
-    print("Simulation Complete. Results saved to results/simulation_data_test.csv")
\ No newline at end of file
+    print(f"Simulation Complete. Results saved to {args.output}")
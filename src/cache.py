@@ -0,0 +1,234 @@
+# src/cache.py
+"""
+Persistent, content-addressed cache of simulation results.
+
+run_simulation is deterministic for a given (W, L, seed, run_id),
+config.py and source tree, so its result row can be stored under a hash
+of exactly those inputs:
+- W, L, seed, run_id,
+- the simulate function and its fixed keyword arguments (e.g. the
+  steady_state of a functools.partial),
+- every UPPERCASE constant of config.py (protocol variant, channel, ...),
+- the content of config.PAYLOAD_FILE, if set (sha256, recomputed only
+  when the file's size or mtime changes),
+- a hash of the Python sources (src/, main.py, config.py).
+
+Changing any source file changes every key, so stale entries are never
+returned; they are removed by eviction or 'prune'. Entries are small JSON
+files under CACHE_DIR; when the cache grows past MAX_BYTES the least
+recently used entries (by mtime, refreshed on every hit) are evicted.
+Eviction scans the whole cache, so each process runs it on its first
+write and then every EVICT_EVERY writes; the cache may overshoot
+MAX_BYTES by that many entries per worker in between.
+
+Usage (from the project root):
+    python -m src.cache info | prune | clear
+"""
+import argparse
+import functools
+import glob
+import hashlib
+import json
+import os
+
+import config
+from src.results_store import config_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT, '.cache', 'results')
+MAX_BYTES = 64 * 1024 * 1024
+EVICT_EVERY = 64
+
+
+@functools.lru_cache(maxsize=None)
+def source_hash():
+    """
+    sha256 over the simulator's Python sources (paths and contents).
+    """
+    paths = sorted(glob.glob(os.path.join(ROOT, 'src', '**', '*.py'), recursive=True) +
+                   [os.path.join(ROOT, 'main.py'), os.path.join(ROOT, 'config.py')])
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.relpath(path, ROOT).encode())
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _file_digest(path, size, mtime_ns):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def payload_hash():
+    """
+    sha256 of config.PAYLOAD_FILE (None with virtual payloads): results
+    depend on the file's content, not on its path. Cached per (path, size,
+    mtime), so the file is read again only when it changes.
+    """
+    if not config.PAYLOAD_FILE:
+        return None
+    st = os.stat(config.PAYLOAD_FILE)
+    return _file_digest(os.path.abspath(config.PAYLOAD_FILE), st.st_size, st.st_mtime_ns)
+
+
+def describe(simulate):
+    """
+    JSON-friendly identity of a simulate callable: qualified name plus the
+    positional/keyword arguments bound by functools.partial.
+    """
+    args, keywords = (), {}
+    while isinstance(simulate, functools.partial):
+        args = simulate.args + args
+        keywords = {**simulate.keywords, **keywords}
+        simulate = simulate.func
+    return {
+        'function': f'{simulate.__module__}.{simulate.__qualname__}',
+        'args': [repr(a) for a in args],
+        'kwargs': {k: repr(v) for k, v in sorted(keywords.items())},
+    }
+
+
+class ResultCache:
+    """
+    Wraps simulate(W, L, seed, run_id): a hit returns the stored row
+    without running anything, a miss runs the simulation and stores it.
+    Picklable, so it can be handed to the sweep's worker pool.
+    """
+    def __init__(self, simulate, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.simulate = simulate
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._puts = 0  # Writes by this process (a pickled copy starts over)
+
+    def key(self, window_size, payload_size, seed, run_id):
+        inputs = {
+            'W': window_size,
+            'L': payload_size,
+            'seed': seed,
+            'run_id': run_id,
+            'simulate': describe(self.simulate),
+            'config': config_values(),
+            'payload': payload_hash(),
+            'src': source_hash(),
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)  # Recently used
+        except (OSError, ValueError):
+            return None
+        return entry['row']
+
+    def put(self, key, row):
+        path = self._path(key)
+        try:
+            data = json.dumps({'src': source_hash(), 'row': row})
+        except (TypeError, ValueError):
+            return  # Rows with non-JSON extras (profiles, ...) are not cached
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        if self._puts % EVICT_EVERY == 0:
+            evict(self.cache_dir, self.max_bytes)
+        self._puts += 1
+
+    def __call__(self, window_size, payload_size, seed, run_id):
+        key = self.key(window_size, payload_size, seed, run_id)
+        row = self.get(key)
+        if row is None:
+            row = self.simulate(window_size, payload_size, seed, run_id)
+            self.put(key, row)
+        return row
+
+
+def _entries(cache_dir):
+    """
+    [(mtime, size, path)] of every cache entry, oldest first.
+    """
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, '*', '*.json')):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue  # Evicted by another worker meanwhile
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+    return entries
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    """
+    Removes least recently used entries until the cache fits in max_bytes.
+    Returns the number of entries removed.
+    """
+    entries = _entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def prune(cache_dir=CACHE_DIR):
+    """
+    Removes entries written by another version of the sources.
+    Returns the number of entries removed.
+    """
+    removed = 0
+    current = source_hash()
+    for _, _, path in _entries(cache_dir):
+        try:
+            with open(path) as f:
+                stale = json.load(f).get('src') != current
+        except (OSError, ValueError):
+            stale = True
+        if stale:
+            _remove(path)
+            removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation result cache")
+    parser.add_argument('command', choices=['info', 'prune', 'clear'])
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'prune':
+        print(f"Removed {prune(args.cache_dir)} stale entries")
+    elif args.command == 'clear':
+        print(f"Removed {evict(args.cache_dir, max_bytes=-1)} entries")
+    else:
+        entries = _entries(args.cache_dir)
+        total = sum(size for _, size, _ in entries)
+        print(f"{args.cache_dir}: {len(entries)} entries, {total / 1024:.1f} KiB "
+              f"(limit {MAX_BYTES / 1024 / 1024:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
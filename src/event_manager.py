@@ -1,42 +1,294 @@
 # src/event_manager.py
 import heapq
+import itertools
+import math
+import time
 
-class Event:
-    def __init__(self, timestamp, handler, args=()):
-        self.timestamp = timestamp
-        self.handler = handler  # Function to execute
-        self.args = args        # Arguments for the function
-        self.canceled = False   # To support timer cancellation
+# Events are plain lists laid out as [timestamp, seq, handler, args].
+# Lists compare element-wise in C, so the queues order events by
+# (timestamp, seq) without any Python-level __lt__ call, and no per-event
+# __dict__ is allocated. seq is unique, so handlers are never compared.
+# The handler slot is set to None once the event is canceled or has run.
+TIMESTAMP, SEQ, HANDLER, ARGS = range(4)
+
+
+class HeapQueue:
+    """
+    Binary heap backend.
+    """
+    def __init__(self):
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, entry):
+        heapq.heappush(self._heap, entry)
+
+    def pop(self):
+        return heapq.heappop(self._heap)
+
+    def peek(self):
+        return self._heap[0]
+
+    def compact(self):
+        """
+        Drops canceled events and restores the heap. Returns how many were dropped.
+        """
+        before = len(self._heap)
+        self._heap = [event for event in self._heap if event[HANDLER] is not None]
+        heapq.heapify(self._heap)
+        return before - len(self._heap)
+
+
+class CalendarQueue:
+    """
+    Calendar queue backend (R. Brown, CACM 1988).
+    Time is cut into 'days' of bucket_width seconds, and day d lives in
+    bucket d % num_buckets. Since almost every event is scheduled a few
+    hundred ms ahead, the next event is nearly always found in the
+    current bucket or one of the following ones: O(1) amortised
+    schedule/pop. The bucket count doubles/halves with the queue size and
+    the width is re-estimated from the event spacing on every resize.
+    """
+    MIN_BUCKETS = 16
+
+    def __init__(self, bucket_width=0.001, num_buckets=MIN_BUCKETS):
+        self._size = 0
+        self._last_time = 0.0
+        self._setup(bucket_width, num_buckets)
+
+    def _setup(self, bucket_width, num_buckets):
+        self._width = bucket_width
+        self._nbuckets = num_buckets
+        self._buckets = [[] for _ in range(num_buckets)]
+        self._day = int(self._last_time / bucket_width)
+        self._grow_at = 2 * num_buckets
+        self._shrink_at = num_buckets // 2 if num_buckets > self.MIN_BUCKETS else -1
+
+    def __len__(self):
+        return self._size
+
+    def push(self, entry):
+        day = int(entry[0] / self._width)
+        heapq.heappush(self._buckets[day % self._nbuckets], entry)
+        if day < self._day:
+            # Before the last popped event (possible after popping a canceled
+            # one): the search for the head must start from that day again
+            self._day = day
+            self._last_time = entry[0]
+        self._size += 1
+        if self._size > self._grow_at:
+            self._resize(2 * self._nbuckets)
+
+    def _find(self):
+        """
+        Returns (bucket, day) of the earliest entry. The queue must not be empty.
+        """
+        buckets = self._buckets
+        width = self._width
+        day = self._day
+
+        # Fast path: the earliest event is in today's bucket
+        bucket = buckets[day % self._nbuckets]
+        if bucket and int(bucket[0][0] / width) <= day:
+            return bucket, day
+
+        # Walk the rest of the 'year', one day at a time
+        n = self._nbuckets
+        i = day % n
+        for _ in range(n - 1):
+            day += 1
+            i += 1
+            if i == n:
+                i = 0
+            bucket = buckets[i]
+            if bucket and int(bucket[0][0] / width) <= day:
+                return bucket, day
+
+        # Nothing within a year: jump straight to the earliest event
+        bucket = min((b for b in buckets if b), key=lambda b: b[0])
+        return bucket, int(bucket[0][0] / width)
+
+    def pop(self):
+        if not self._size:
+            raise IndexError("pop from an empty calendar queue")
+
+        bucket, self._day = self._find()
+        entry = heapq.heappop(bucket)
+        self._last_time = entry[0]
+        self._size -= 1
+        if self._size < self._shrink_at:
+            self._resize(self._nbuckets // 2)
+        return entry
+
+    def peek(self):
+        if not self._size:
+            raise IndexError("peek at an empty calendar queue")
+        # Only pop() moves the current day: events may still be pushed
+        # before the head
+        bucket, _ = self._find()
+        return bucket[0]
+
+    def compact(self):
+        """
+        Drops canceled events from every bucket. Returns how many were dropped.
+        """
+        dropped = 0
+        for i, bucket in enumerate(self._buckets):
+            live = [event for event in bucket if event[HANDLER] is not None]
+            if len(live) != len(bucket):
+                dropped += len(bucket) - len(live)
+                heapq.heapify(live)
+                self._buckets[i] = live
+        self._size -= dropped
+        return dropped
+
+    def _resize(self, num_buckets):
+        entries = [entry for bucket in self._buckets for entry in bucket]
+        entries.sort()
+
+        # Brown's heuristic: width = 3 x average spacing of the next events
+        width = self._width
+        sample = [entry[0] for entry in entries[:64]]
+        gaps = [b - a for a, b in zip(sample, sample[1:]) if b > a]
+        if gaps:
+            width = 3.0 * sum(gaps) / len(gaps)
+
+        self._setup(width, num_buckets)
+        for entry in entries:
+            self._buckets[int(entry[0] / width) % num_buckets].append(entry)
+        # Each bucket received its entries in sorted order, so it already is a heap
+
+
+QUEUE_BACKENDS = {
+    'heap': HeapQueue,
+    'calendar': CalendarQueue,
+}
+
+
+def make_event_queue(kind):
+    """
+    Builds an event queue backend by name ('heap' or 'calendar').
+    """
+    if kind not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown event queue backend: {kind!r}")
+    return QUEUE_BACKENDS[kind]()
 
-    # Comparison for Priority Queue (Min-Heap)
-    def __lt__(self, other):
-        return self.timestamp < other.timestamp
 
 class EventManager:
     """
     Discrete Event Simulator Engine.
     Manages the global simulation clock and event queue.
+    Events with equal timestamps run in the order they were scheduled,
+    whichever queue backend is used.
+    Canceled events stay queued (lazy deletion) until popped, or until
+    they make up more than COMPACT_RATIO of the queue, at which point the
+    queue is compacted in one pass.
     """
-    def __init__(self):
+    COMPACT_RATIO = 0.5
+    COMPACT_MIN_DEAD = 256
+
+    def __init__(self, queue=None):
         self.current_time = 0.0
-        self.event_queue = []
+        self.event_queue = queue if queue is not None else HeapQueue()
+        self._seq = itertools.count()
+        self.dead_events = 0    # Canceled events still in the queue
+        self.compactions = 0
+        self.events_executed = 0
+
+        # Bounds for try_advance(), set by whoever drives run_step():
+        # no in-handler advance past advance_limit or while stop_condition() holds
+        self.advance_limit = math.inf
+        self.stop_condition = None
+
+    def __getstate__(self):
+        # Tie-break counter as a plain number, for simulation snapshots
+        state = self.__dict__.copy()
+        next_seq = next(self._seq)
+        self._seq = itertools.count(next_seq)
+        state['_seq'] = next_seq
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._seq = itertools.count(state['_seq'])
 
     def schedule(self, delay, handler, args=()):
         """
         Schedules an event to run after 'delay' seconds.
-        Returns the Event object (so it can be canceled if needed).
+        Returns the event (so it can be canceled if needed).
+        """
+        return self.schedule_at(self.current_time + delay, handler, args)
+
+    def reserve_seq(self):
         """
-        timestamp = self.current_time + delay
-        event = Event(timestamp, handler, args)
-        heapq.heappush(self.event_queue, event)
+        Takes a tie-break number now for an event that will be scheduled later,
+        so it keeps its FIFO position among events with the same timestamp.
+        """
+        return next(self._seq)
+
+    def schedule_at(self, timestamp, handler, args=(), seq=None):
+        """
+        Schedules an event at the absolute simulated time 'timestamp'.
+        'seq' is a number obtained from reserve_seq(), if any.
+        """
+        if seq is None:
+            seq = next(self._seq)
+        event = [timestamp, seq, handler, args]
+        self.event_queue.push(event)
         return event
 
+    def try_advance(self, timestamp, seq):
+        """
+        Lets a running handler move the clock to (timestamp, seq) and carry
+        on, instead of scheduling an event there. Allowed only when that
+        event would be the very next one to run anyway: nothing queued comes
+        first, advance_limit is not crossed and the driver would not stop
+        now. Returns False if the caller must schedule the event instead.
+        'seq' is a number obtained from reserve_seq().
+        """
+        if timestamp > self.advance_limit:
+            return False
+        if self.event_queue:
+            head = self.event_queue.peek()
+            if head[TIMESTAMP] < timestamp or (head[TIMESTAMP] == timestamp and head[SEQ] < seq):
+                return False
+        if self.stop_condition is not None and self.stop_condition():
+            return False
+
+        self.current_time = timestamp
+        self.events_executed += 1
+        return True
+
     def cancel_event(self, event):
         """
-        Marks an event as canceled. It will be ignored when popped.
+        Cancels a pending event. It will be ignored when popped.
+        """
+        if event and event[HANDLER] is not None:
+            event[HANDLER] = None
+            event[ARGS] = ()
+            self.dead_events += 1
+            if (self.dead_events > self.COMPACT_MIN_DEAD
+                    and self.dead_events > self.COMPACT_RATIO * len(self.event_queue)):
+                self.compact()
+
+    def compact(self):
+        """
+        Removes all canceled events from the queue right away.
+        """
+        self.dead_events -= self.event_queue.compact()
+        self.compactions += 1
+
+    def queue_stats(self):
+        """
+        Live vs dead (canceled, not yet removed) entries in the queue.
         """
-        if event:
-            event.canceled = True
+        return {
+            'live': len(self.event_queue) - self.dead_events,
+            'dead': self.dead_events,
+            'compactions': self.compactions,
+        }
 
     def run_step(self):
         """
@@ -45,19 +297,79 @@ class EventManager:
         """
         if not self.event_queue:
             return False
-            
-        event = heapq.heappop(self.event_queue)
-        
-        if event.canceled:
+
+        event = self.event_queue.pop()
+        handler = event[HANDLER]
+
+        if handler is None:
+            self.dead_events -= 1
             return True # Event processed (ignored), continue
-            
-        self.current_time = event.timestamp
-        event.handler(*event.args)
+
+        event[HANDLER] = None   # Spent: a late cancel_event() is a no-op
+        self.current_time = event[TIMESTAMP]
+        self.events_executed += 1
+        handler(*event[ARGS])
         return True
 
+    # ==========================
+    # PROFILING (opt-in)
+    # ==========================
+
+    def enable_profiling(self):
+        """
+        Starts recording, per handler, how many events ran and their
+        cumulative wall time, plus how many canceled events were skipped.
+        run_step is swapped for an instrumented version on this instance
+        only, so a manager that never enables profiling pays nothing.
+        """
+        self.handler_profile = {}   # qualname -> [count, seconds]
+        self.canceled_skipped = 0
+        self.run_step = self._run_step_profiled
+
+    def _run_step_profiled(self):
+        if not self.event_queue:
+            return False
+
+        event = self.event_queue.pop()
+        handler = event[HANDLER]
+
+        if handler is None:
+            self.dead_events -= 1
+            self.canceled_skipped += 1
+            return True
+
+        event[HANDLER] = None
+        self.current_time = event[TIMESTAMP]
+        self.events_executed += 1
+
+        start = time.perf_counter()
+        handler(*event[ARGS])
+        elapsed = time.perf_counter() - start
+
+        name = getattr(handler, '__qualname__', None) or repr(handler)
+        entry = self.handler_profile.get(name)
+        if entry is None:
+            self.handler_profile[name] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+        return True
+
+    def profile_report(self):
+        """
+        Profile collected since enable_profiling(), busiest handler first.
+        Handler times are inclusive: they contain the nested calls the
+        handler makes (transmit, schedule, ...).
+        """
+        handlers = sorted(self.handler_profile.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            'handlers': {name: {'count': count, 'seconds': seconds} for name, (count, seconds) in handlers},
+            'canceled_skipped': self.canceled_skipped,
+        }
+
     def run(self):
         """
         Runs until queue is empty.
         """
         while self.event_queue:
-            self.run_step()
\ No newline at end of file
+            self.run_step()
@@ -1,11 +1,20 @@
 # src/link.py
+from collections import deque
 import config
-from src.packet import LinkFrame
+from src.packet import LinkFrame, SackFrame
+from src.stats import P2Quantile, RunningStats, Trajectory
+from src.timer_wheel import TimerWheel
+from src.trace import SEND, RETRANSMIT, RX, RX_ACK, BUFFERED, DELIVERED, ACKED
 
 class LinkLayer:
     """
     Implements Selective Repeat ARQ Protocol.
     Reference: PDF Phase 1, Section 1 
+
+    Window state lives in rings of window_size slots indexed by seq % W,
+    plus int bitmaps relative to the window base (bit i <-> base + i) for
+    ACKed and received frames. Every operation is O(1) (sliding is one
+    shift), memory is bounded by W and no dict entries are created per frame.
     """
     def __init__(self, physical_layer, event_manager, transport_layer=None, window_size=4):
         self.physical = physical_layer
@@ -14,12 +23,13 @@ class LinkLayer:
         self.window_size = window_size
         
         # --- SENDER STATE ---
-        self.send_buffer = []       # Queue of segments waiting to be sent
+        self.send_buffer = deque()  # Queue of segments waiting to be sent
         self.next_seq_num = 0       # Next sequence number to use
         self.send_base = 0          # Oldest unacknowledged frame
-        self.sent_frames = {}       # Buffer of sent frames (for retransmission): {seq: frame}
-        self.ack_received = set()   # Set of received ACKs
-        self.timers = {}            # Active timers: {seq: event}
+        self.sent_frames = [None] * window_size  # Sent frames (for retransmission), slot seq % W
+        self.acked_mask = 0         # ACKed frames: bit i <-> send_base + i
+        # Active retransmission timers, keyed by seq (one batch callback per expiry instant)
+        self.timers = TimerWheel(event_manager, self._handle_timeouts, tick=config.TIMER_WHEEL_TICK)
         
         # Timeout Value (Fixed for Phase 1, Adaptive for Phase 2)
         # 100ms is a safe start (RTT is ~50ms)
@@ -27,16 +37,39 @@ class LinkLayer:
 
         # YENİ EKLENEN: İstatistikler
         self.total_retransmissions = 0
-        self.rtt_samples = []       # RTT ölçümlerini saklayacağız
-        self.send_times = {}        # {seq_num: timestamp} - Gönderim anı
+        # RTT ölçümleri: streaming, constant memory however long the run
+        self.rtt_stats = RunningStats()
+        self.rtt_p50 = P2Quantile(0.50)
+        self.rtt_p99 = P2Quantile(0.99)
+        self.rto_stats = RunningStats()
+        self.rto_trajectory = Trajectory()  # (time, RTO) after every update
+        self.send_times = [None] * window_size  # Gönderim anı (first transmission), slot seq % W
 
         # --- RECEIVER STATE ---
         self.rcv_base = 0           # Expected sequence number
-        self.rcv_buffer = {}        # Buffered out-of-order frames: {seq: payload}
+        self.rcv_buffer = [None] * window_size  # Buffered out-of-order payloads, slot seq % W
+        self.rcv_mask = 0           # Buffered frames: bit i <-> rcv_base + i
+
+        # ACK format ('per_frame' or 'sack') and delayed SACK state
+        if config.ACK_MODE not in ('per_frame', 'sack'):
+            raise ValueError(f"Unknown ACK mode: {config.ACK_MODE!r}")
+        self.sack = config.ACK_MODE == 'sack'
+        self._sack_pending = 0      # In-order frames not acknowledged yet
+        self._sack_trigger = None   # Latest of them
+        self._sack_generation = 0   # Bumped on every SACK: stale delay timers do nothing
         
+        # Back-to-back frames leave as one frame train (PhysicalLayer.transmit_batch)
+        self.frame_trains = config.FRAME_TRAINS
+
         # To connect two link layers (Sender <-> Receiver)
         self.peer_receive_callback = None
 
+        # Called whenever send_base slides, so the upper layer can refill the window
+        self.window_open_callback = None
+
+        # Per-frame trace (src/trace.py TraceRecorder), None when not tracing
+        self.trace = None
+
         # YENİ EKLENEN: RTT Hesaplama için Değişkenler
         self.srtt = None          # Smoothed Round Trip Time
         self.rttvar = None        # RTT Variation
@@ -68,11 +101,16 @@ class LinkLayer:
 
         # 3. Calculate RTO
         # RTO = Average + 4 * Deviation (Safety Margin)
-        self.current_rto = self.srtt + 4 * self.rttvar
+        rto = self.srtt + 4 * self.rttvar
 
         # 4. Clamp RTO to safe limits
         # Ensure it never drops below min_rto (e.g., 50ms)
-        self.current_rto = max(self.current_rto, self.min_rto)
+        if rto < self.min_rto:
+            rto = self.min_rto
+        self.current_rto = rto
+
+        self.rto_stats.push(rto)
+        self.rto_trajectory.push(self.event_manager.current_time, rto)
 
 
 
@@ -82,6 +120,21 @@ class LinkLayer:
         """
         self.peer_receive_callback = callback_func
 
+    def set_window_open_callback(self, callback_func):
+        """
+        Sets the function to call when ACKs slide the send window forward.
+        """
+        self.window_open_callback = callback_func
+
+    def drop_frames(self):
+        """
+        Forgets every frame still held: waiting to be sent, unacknowledged
+        or buffered out of order. Only for a link that will not run again.
+        """
+        self.send_buffer.clear()
+        self.sent_frames = [None] * self.window_size
+        self.rcv_buffer = [None] * self.window_size
+
     # ==========================
     # SENDER LOGIC
     # ==========================
@@ -93,125 +146,202 @@ class LinkLayer:
         self.send_buffer.append(transport_segment)
         self._process_send_buffer()
 
+    def send_segments(self, transport_segments):
+        """
+        Sends several segments at once: the frames that fit in the window
+        leave back-to-back, as one frame train.
+        """
+        self.send_buffer.extend(transport_segments)
+        self._process_send_buffer()
 
     def _process_send_buffer(self):
         """
         Sends frames as long as the window is open.
         Constraint: next_seq_num < send_base + window_size [cite: 30]
         """
-        while self.send_buffer and (self.next_seq_num < self.send_base + self.window_size):
-            segment = self.send_buffer.pop(0)
+        send_buffer = self.send_buffer
+        window_size = self.window_size
+        free = self.send_base + window_size - self.next_seq_num
+        sent_frames = self.sent_frames
+        send_times = self.send_times
+        now = self.event_manager.current_time
+        trace = self.trace
+        frames = []
+        while send_buffer and free > 0:
+            segment = send_buffer.popleft()
             seq = segment.seq_num
             
             # Create Link Frame (Overhead added automatically in Packet class)
             frame = LinkFrame(seq, type_flag='DATA', payload=segment)
             
-            self.sent_frames[seq] = frame
-            self.next_seq_num += 1
+            # The slot was last used by seq - W, which is ACKed since seq < send_base + W
+            slot = seq % window_size
+            sent_frames[slot] = frame
+
+            # YENİ: İlk gönderim zamanını kaydet (RTT için)
+            send_times[slot] = now
+            if trace is not None:
+                trace.record(now, SEND, seq, frame.size_bytes)
             
-            self._transmit_frame(frame)
+            frames.append(frame)
+            free -= 1
 
-    def _transmit_frame(self, frame):
+        if frames:
+            self.next_seq_num += len(frames)
+            self._transmit_frames(frames)
+
+    def _transmit_frames(self, frames):
         """
-        Helper to transmit a frame and start its timer.
+        Transmits frames that leave back-to-back and starts their timers.
         """
-
-        # YENİ: İlk gönderimse zamanı kaydet (RTT için)
-        if frame.seq_num not in self.send_times:
-            self.send_times[frame.seq_num] = self.event_manager.current_time
-
-        # Start Timer [cite: 27]
-        self._start_timer(frame.seq_num)
-        
-        # Send via Physical Layer
-        if self.peer_receive_callback:
-            # Note: For simulation, we assume 'Forward' path. 
-            # In a full duplex, we might need more logic.
-            self.physical.transmit(frame, is_forward_path=True, receiver_callback=self.peer_receive_callback)
-
-    def _start_timer(self, seq_num):
+        # Re-arming replaces any running timer (for retransmissions)
+        arm = self.timers.arm
+        callback = self.peer_receive_callback
+        if not self.frame_trains or len(frames) == 1:
+            # Each timer is started right before its frame is sent [cite: 27]
+            transmit = self.physical.transmit
+            for frame in frames:
+                arm(frame.seq_num, self.current_rto)
+                if callback:
+                    transmit(frame, True, callback)
+            return
+
+        for frame in frames:
+            arm(frame.seq_num, self.current_rto)
+        if callback:
+            self.physical.transmit_batch(frames, is_forward_path=True, receiver_callback=callback)
+
+    def _handle_timeouts(self, seq_nums):
         """
-        Schedules a timeout event for a specific frame.
+        Timer wheel callback: all frames whose timers expired at this instant.
+        Their retransmissions leave together.
         """
-        # Cancel existing timer if any (for retransmissions)
-        if seq_num in self.timers:
-            self.event_manager.cancel_event(self.timers[seq_num])
-            
-        event = self.event_manager.schedule(
-            self.current_rto,  # <--- CHANGED FROM self.timeout_interval
-            self._handle_timeout, 
-            args=(seq_num,)
-        )
-        self.timers[seq_num] = event
+        frames = []
+        for seq_num in seq_nums:
+            frame = self._handle_timeout(seq_num)
+            if frame is not None:
+                frames.append(frame)
+        if frames:
+            self._transmit_frames(frames)
 
     def _handle_timeout(self, seq_num):
         """
-        Callback when a timer expires.
-        Resends ONLY the specific lost frame (Selective Repeat). [cite: 29]
+        Called when a timer expires.
+        Returns the frame to resend: ONLY the specific lost one (Selective Repeat). [cite: 29]
         """
-        if seq_num in self.ack_received:
-            return # Already ACKed, ignore
+        if seq_num < self.send_base or (self.acked_mask >> (seq_num - self.send_base)) & 1:
+            return None # Already ACKed, ignore
 
         # Retransmit
-        if seq_num in self.sent_frames:
-            frame = self.sent_frames[seq_num]
+        if seq_num < self.next_seq_num:
+            frame = self.sent_frames[seq_num % self.window_size]
             frame.retry_count += 1
 
             # YENİ: Retransmission sayacını artır
             self.total_retransmissions += 1
+            if self.trace is not None:
+                self.trace.record(self.event_manager.current_time, RETRANSMIT, seq_num, frame.size_bytes)
 
-            self._transmit_frame(frame)
+            return frame
+        return None
 
     def receive_ack(self, ack_seq_num):
+        offset = ack_seq_num - self.send_base
+        if offset < 0 or ack_seq_num >= self.next_seq_num:
+            return # Outside the window: an old duplicate, already ACKed
+
+        self._sample_rtt(ack_seq_num % self.window_size)
+
+        self.acked_mask |= 1 << offset
+        if self.trace is not None:
+            self.trace.record(self.event_manager.current_time, ACKED, ack_seq_num, 0)
+        
+        # Cancel timer for this frame
+        self.timers.cancel(ack_seq_num)
+
+        # Slide Window [cite: 30]
+        # If we ACKed the base, move base forward to the next unACKed frame
+        if offset == 0:
+            self._slide_window()
+
+    def _sample_rtt(self, slot):
+        """
+        RTT measurement for the frame in 'slot', on its first ACK only.
+        The mean/variance accumulator takes a clean (never retransmitted)
+        sample twice, as the rtt_samples list always did, so avg_rtt and
+        rtt_std stay comparable with earlier results; the quantiles see
+        every ACK once.
+        """
         # YENİ: RTT Hesaplama
-        # Eğer bu paket için gönderim zamanı kayıtlıysa
-        if ack_seq_num in self.send_times:
-            send_time = self.send_times[ack_seq_num]
-            arrival_time = self.event_manager.current_time
-            rtt = arrival_time - send_time
-            self.rtt_samples.append(rtt)
-            
+        # Eğer bu paket için gönderim zamanı kayıtlıysa (first ACK for it)
+        send_time = self.send_times[slot]
+        if send_time is not None:
+            rtt = self.event_manager.current_time - send_time
+            rtt_stats = self.rtt_stats
+            rtt_stats.push(rtt)
+
             # --- KARN'S ALGORITHM CHECK ---
             # Only calculate RTT if the frame was NOT retransmitted
-            # You need to check the retry_count of the frame in sent_frames
-            is_retransmitted = False
-            if ack_seq_num in self.sent_frames:
-                if self.sent_frames[ack_seq_num].retry_count > 0:
-                    is_retransmitted = True
-            
             # If it's a clean "first try" ACK, update RTO
-            if not is_retransmitted:
-                current_time = self.event_manager.current_time
-                rtt_sample = current_time - send_time
-                
+            if not self.sent_frames[slot].retry_count:
                 # Update the adaptive timeout
-                self._update_rto(rtt_sample)
-                
-                # (Optional) Save for stats
-                self.rtt_samples.append(rtt_sample)
+                self._update_rto(rtt)
+                rtt_stats.push(rtt)
+            self.rtt_p50.push(rtt)
+            self.rtt_p99.push(rtt)
 
             # Kaydı sil (tekrar hesaplamamak için)
-            del self.send_times[ack_seq_num]
-
+            self.send_times[slot] = None
 
-        self.ack_received.add(ack_seq_num)
+    def _slide_window(self):
+        """
+        Moves send_base past the ACKed frames at the start of the window.
+        """
+        # Number of consecutive ACKed frames from the base (trailing ones)
+        mask = self.acked_mask
+        shift = ((~mask) & (mask + 1)).bit_length() - 1
+        self.acked_mask = mask >> shift
+        self.send_base += shift
         
-        # Cancel timer for this frame
-        if ack_seq_num in self.timers:
-            self.event_manager.cancel_event(self.timers[ack_seq_num])
-            del self.timers[ack_seq_num]
-
-        # Slide Window [cite: 30]
-        # If we ACKed the base, move base forward to the next unACKed frame
-        if ack_seq_num == self.send_base:
-            while self.send_base in self.ack_received:
-                # Clean up memory
-                if self.send_base in self.sent_frames:
-                    del self.sent_frames[self.send_base]
-                self.send_base += 1
-            
-            # Window moved, try to send more data
+        # Window moved, try to send more data
+        if self.send_buffer:
             self._process_send_buffer()
+        if self.window_open_callback:
+            self.window_open_callback()
+
+    def receive_sack(self, trigger_seq, cum_ack, bitmap):
+        """
+        Processes a SACK in bulk: every frame below cum_ack plus those
+        flagged in the bitmap are ACKed at once. Only the frame that
+        triggered the SACK yields an RTT sample.
+        """
+        base = self.send_base
+        # Frames covered by this SACK, as a mask relative to send_base
+        offset = cum_ack - base
+        if offset >= 0:
+            covered = ((1 << offset) - 1) | (bitmap << offset)
+        else:
+            covered = bitmap >> -offset  # Old SACK: bits below send_base are stale
+        covered &= (1 << (self.next_seq_num - base)) - 1
+        new = covered & ~self.acked_mask
+        if not new:
+            return # Nothing new: an old or duplicate SACK
+
+        if trigger_seq >= base and (new >> (trigger_seq - base)) & 1:
+            self._sample_rtt(trigger_seq % self.window_size)
+
+        self.acked_mask |= new
+        while new:
+            low = new & -new
+            seq = base + low.bit_length() - 1
+            self.send_times[seq % self.window_size] = None  # No RTT sample from these
+            self.timers.cancel(seq)
+            if self.trace is not None:
+                self.trace.record(self.event_manager.current_time, ACKED, seq, 0)
+            new ^= low
+
+        if self.acked_mask & 1:
+            self._slide_window()
 
     # ==========================
     # RECEIVER LOGIC
@@ -221,6 +351,10 @@ class LinkLayer:
         """
         Called by Physical Layer when a packet arrives.
         """
+        if self.trace is not None:
+            self.trace.record(self.event_manager.current_time, RX if packet.type == 'DATA' else RX_ACK,
+                              packet.seq_num, packet.size_bytes, corrupted)
+
         if corrupted:
             # In ARQ, corrupted frames are silently dropped.
             # Sender will timeout and retransmit.
@@ -228,30 +362,48 @@ class LinkLayer:
 
         if packet.type == 'ACK':
             self.receive_ack(packet.seq_num)
+
+        elif packet.type == 'SACK':
+            self.receive_sack(packet.seq_num, packet.cum_ack, packet.bitmap)
             
         elif packet.type == 'DATA':
             self._handle_incoming_data(packet)
 
     def _handle_incoming_data(self, frame):
         seq = frame.seq_num
+        rcv_base = self.rcv_base
+        in_order = seq == rcv_base
         
         # 1. Send ACK (Selective Repeat sends ACK for every correct frame)
-        self._send_ack(seq)
+        # SACKs go out after delivery instead, so they carry the new window state
+        if not self.sack:
+            self._send_ack(seq)
 
         # 2. Check Window Validity
         # We accept frames within [rcv_base, rcv_base + window_size - 1]
-        if self.rcv_base <= seq < (self.rcv_base + self.window_size):
+        offset = seq - rcv_base
+        window_size = self.window_size
+        if 0 <= offset < window_size:
+            rcv_buffer = self.rcv_buffer
+            rcv_mask = self.rcv_mask
+            trace = self.trace
             # Buffer the frame [cite: 28]
-            if seq not in self.rcv_buffer:
-                self.rcv_buffer[seq] = frame.payload
+            bit = 1 << offset
+            if not rcv_mask & bit:
+                rcv_buffer[seq % window_size] = frame.payload
+                rcv_mask |= bit
+                if trace is not None:
+                    trace.record(self.event_manager.current_time, BUFFERED, seq, frame.size_bytes)
             
             # 3. Deliver In-Order Data to Transport
-            while self.rcv_base in self.rcv_buffer:
-                data_segment = self.rcv_buffer[self.rcv_base]
+            transport = self.transport
+            while rcv_mask & 1:
+                slot = rcv_base % window_size
+                data_segment = rcv_buffer[slot]
                 
                 # --- FLOW CONTROL / BACKPRESSURE CHECK [cite: 21-22] ---
-                if self.transport:
-                    accepted = self.transport.receive_segment(data_segment)
+                if transport:
+                    accepted = transport.receive_segment(data_segment)
                     if not accepted:
                         # Transport buffer is full! 
                         # We cannot deliver this packet. 
@@ -259,15 +411,57 @@ class LinkLayer:
                         # Effectively, we stop sliding the window.
                         break 
                 
+                if trace is not None:
+                    trace.record(self.event_manager.current_time, DELIVERED, rcv_base, data_segment.size_bytes)
+
                 # If accepted, remove from buffer and slide window
-                del self.rcv_buffer[self.rcv_base]
-                self.rcv_base += 1
+                rcv_buffer[slot] = None
+                rcv_mask >>= 1
+                rcv_base += 1
+
+            # The window state lives in locals above; store it once
+            self.rcv_mask = rcv_mask
+            self.rcv_base = rcv_base
                 
-        elif seq < self.rcv_base:
+        elif offset < 0:
             # Duplicate/Old frame. We already ACKed it, but ACK might be lost.
             # So we ACK again (Step 1 handles this).
             pass
 
+        if self.sack:
+            self._acknowledge(seq, in_order)
+
+    def _acknowledge(self, seq, in_order):
+        """
+        SACK mode: in-order frames with no gap behind them are acknowledged
+        every SACK_EVERY frames or after SACK_DELAY; anything else (gap,
+        duplicate, backpressure) right away, so the sender learns about it.
+        """
+        if in_order and not self.rcv_mask:
+            self._sack_pending += 1
+            self._sack_trigger = seq
+            # A window smaller than SACK_EVERY could never fill the quota
+            if self._sack_pending >= min(config.SACK_EVERY, self.window_size):
+                self._send_sack(seq)
+            elif self._sack_pending == 1:
+                # Delayed SACK timer, never canceled: a SACK sent meanwhile makes it stale
+                self.event_manager.schedule(config.SACK_DELAY, self._sack_timeout, args=(self._sack_generation,))
+        else:
+            self._send_sack(seq)
+
+    def _sack_timeout(self, generation):
+        if generation == self._sack_generation and self._sack_pending:
+            self._send_sack(self._sack_trigger)
+
+    def _send_sack(self, trigger_seq):
+        self._sack_pending = 0
+        self._sack_generation += 1
+        sack_frame = SackFrame(trigger_seq, self.rcv_base, self.rcv_mask, self.window_size)
+
+        # Send back (Reverse path)
+        if self.peer_receive_callback:
+            self.physical.transmit(sack_frame, is_forward_path=False, receiver_callback=self.peer_receive_callback)
+
     def _send_ack(self, seq_num):
         ack_frame = LinkFrame(seq_num, type_flag='ACK')
         
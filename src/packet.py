@@ -29,4 +29,19 @@ class LinkFrame:
         # If carrying data, add the payload's TOTAL size (which includes Transport Header).
         self.size_bytes = config.LINK_HEADER_SIZE
         if self.payload:
-            self.size_bytes += self.payload.size_bytes
\ No newline at end of file
+            self.size_bytes += self.payload.size_bytes
+
+
+class SackFrame(LinkFrame):
+    """
+    Selective ACK: a cumulative ACK plus a bitmap of the receive window.
+    Every seq below cum_ack was received; bit i of bitmap <-> cum_ack + i
+    is buffered at the receiver. seq_num is the data frame that triggered it.
+    """
+    def __init__(self, seq_num, cum_ack, bitmap, window_size):
+        super().__init__(seq_num, type_flag='SACK')
+        self.cum_ack = cum_ack
+        self.bitmap = bitmap
+
+        # The bitmap covers the receive window: ceil(W / 8) bytes on top of the header
+        self.size_bytes += (window_size + 7) // 8
@@ -0,0 +1,93 @@
+# src/payload.py
+import hashlib
+import mmap
+import os
+
+
+class VirtualPayload:
+    """
+    Length-only stand-in for a chunk of the file.
+    The simulator only ever needs len() of the data, so nothing is allocated
+    beyond this small descriptor.
+    """
+    __slots__ = ('offset', 'length')
+
+    def __init__(self, offset, length):
+        self.offset = offset
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+
+class VirtualSource:
+    """
+    A file of 'total_size' bytes whose content does not matter.
+    """
+    def __init__(self, total_size):
+        self.total_size = total_size
+
+    def __len__(self):
+        return self.total_size
+
+    def read(self, offset, size):
+        return VirtualPayload(offset, size)
+
+    def digest(self):
+        """
+        No content, so nothing to verify.
+        """
+        return None
+
+    def close(self):
+        pass
+
+
+class FileSource:
+    """
+    Real data read from a file ("real data" mode).
+    The file is memory-mapped once and every chunk is a zero-copy
+    memoryview slice of it, so only pages actually touched are read.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap) if size else memoryview(b'')
+        self._digest = None
+
+    def __len__(self):
+        return len(self._view)
+
+    def __getstate__(self):
+        # The mapping cannot be pickled: snapshots reopen the file by path
+        return {'path': self.path, '_digest': self._digest}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+        self._digest = state['_digest']
+
+    def read(self, offset, size):
+        return self._view[offset:offset + size]
+
+    def digest(self):
+        """
+        SHA-256 of the whole file, which the receiver must reproduce.
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha256(self._view).hexdigest()
+        return self._digest
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._view.release()
+        self._file.close()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Chunks are still referenced somewhere: the mapping goes
+                # away with the last of them
+                pass
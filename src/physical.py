@@ -1,18 +1,32 @@
 # src/physical.py
-import random
+import math
+from array import array
+from bisect import bisect_right
+from collections import deque
 import numpy as np # Numpy eklendi
 import config
+from src.trace import TX, TX_ACK, QUEUE_DROP, QUEUE_DROP_ACK
 
 class GilbertElliotChannel:
     STATE_GOOD = 0
     STATE_BAD = 1
 
-    def __init__(self):
+    def __init__(self, rng=None):
         self.current_state = self.STATE_GOOD
         self.p_g = config.P_G
         self.p_b = config.P_B
         self.trans_g_to_b = config.TRANS_G_TO_B
         self.trans_b_to_g = config.TRANS_B_TO_G
+        # Own random stream (src/rng.py); unseeded if none is given
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def reset_stream(self, rng):
+        """
+        Switches the channel to the generator 'rng' (e.g. a reseeded
+        stream), dropping any randomness pre-generated from the old one.
+        The channel state itself is kept.
+        """
+        self.rng = rng
 
     def is_packet_corrupted(self, packet_size_bytes):
         """
@@ -36,7 +50,7 @@ class GilbertElliotChannel:
             
             # Numpy ile bir sonraki geçişe kadar kaç bit geçeceğini çekiyoruz
             # (+1 ekliyoruz çünkü geometric dağılım 1'den başlar, biz bit sayıyoruz)
-            bits_until_transition = np.random.geometric(transition_prob)
+            bits_until_transition = self.rng.geometric(transition_prob)
             
             # Bu segmentin uzunluğu (Paket bitiyor mu yoksa durum mu değişiyor?)
             segment_bits = min(remaining_bits, bits_until_transition)
@@ -45,7 +59,7 @@ class GilbertElliotChannel:
             # P(Error) = 1 - (1 - BER)^bits
             if not is_corrupted:
                 prob_error = 1.0 - (1.0 - current_ber) ** segment_bits
-                if random.random() < prob_error:
+                if self.rng.random() < prob_error:
                     is_corrupted = True
                     # Hata bulundu, ama döngüyü kırmıyoruz çünkü 
                     # State'in (self.current_state) paketin sonunda ne olacağını 
@@ -60,45 +74,529 @@ class GilbertElliotChannel:
                  
         return is_corrupted
 
-# PhysicalLayer sınıfında bir değişiklik yapmana gerek yok, 
-# çünkü o sadece channel.is_packet_corrupted() çağırıyor.
+class BatchedGilbertElliotChannel(GilbertElliotChannel):
+    """
+    Same Gilbert-Elliot model, served from pre-generated random blocks.
+
+    The channel is a timeline of alternating state sojourns. Sojourn
+    lengths (geometric) are drawn 'block_size' per state at a time with
+    one vectorised NumPy call, and kept as prefix sums of bit positions
+    and of good-state bits. A frame of n bits is then resolved with one
+    bisect: it yields the number of good/bad bits inside the frame and
+    the state at its end, however many transitions the frame spans.
+    Uniforms come from a refillable buffer as well.
+
+    Two equivalent reformulations keep the model unchanged:
+    - The unused part of a sojourn carries over to the next frame instead
+      of being redrawn (the geometric distribution is memoryless).
+    - A frame is corrupted with probability 1 - (1-P_G)^g * (1-P_B)^b for
+      g good-state and b bad-state bits, decided with one uniform draw
+      instead of one per state segment.
+    """
+    def __init__(self, block_size=4096, rng=None):
+        super().__init__(rng)
+        self.block_size = block_size
+
+        self._log_ok = (math.log1p(-self.p_g), math.log1p(-self.p_b))
+        self._trans = (self.trans_g_to_b, self.trans_b_to_g)
+        self._uniforms = []
+
+        # Current block: sojourn k starts at bit _starts[k], is in state
+        # _first_state ^ (k & 1) and is preceded by _good_prefix[k] good bits.
+        self._starts = None
+        self._good_prefix = None
+        self._first_state = self.current_state
+        self._pos = 0           # Bit position of the next frame in the block
+        self._good_at_pos = 0   # Good bits before _pos
+
+    def _next_uniform(self):
+        if not self._uniforms:
+            self._uniforms.extend(self.rng.random(self.block_size).tolist())
+        return self._uniforms.pop()
+
+    def reset_stream(self, rng):
+        super().reset_stream(rng)
+        # The rest of the current sojourn is redrawn from current_state (memoryless)
+        self._uniforms = []
+        self._starts = None
+        self._good_prefix = None
+
+    def _refill(self, min_bits):
+        """
+        Starts a new block at the current position, keeping the remainder
+        of the current sojourn, with at least 'min_bits' bits of timeline.
+        """
+        if self._starts is None:
+            state = self.current_state
+            leftover = int(self.rng.geometric(self._trans[state]))
+        else:
+            k = bisect_right(self._starts, self._pos) - 1
+            state = self._first_state ^ (k & 1)
+            leftover = self._starts[k + 1] - self._pos
+
+        lengths = [np.array([leftover])]
+        total = leftover
+        while total <= min_bits or len(lengths) == 1:
+            other = self.rng.geometric(self._trans[1 - state], self.block_size)
+            same = self.rng.geometric(self._trans[state], self.block_size)
+            pair = np.empty(2 * self.block_size, dtype=np.int64)
+            pair[0::2] = other
+            pair[1::2] = same
+            lengths.append(pair)
+            total += int(pair.sum())
+        lengths = np.concatenate(lengths)
+
+        states = state ^ (np.arange(len(lengths)) & 1)
+        good = np.where(states == self.STATE_GOOD, lengths, 0)
+        # array('q') shares NumPy's int64 layout: a memcpy instead of tolist()
+        self._starts = array('q', np.concatenate(([0], np.cumsum(lengths))).astype(np.int64).tobytes())
+        self._good_prefix = array('q', np.concatenate(([0], np.cumsum(good))).astype(np.int64).tobytes())
+        self._first_state = state
+        self._pos = 0
+        self._good_at_pos = 0
+
+    def is_packet_corrupted(self, packet_size_bytes):
+        bits = packet_size_bytes * 8
+        end = self._pos + bits
+        if self._starts is None or end >= self._starts[-1]:
+            self._refill(bits)
+            end = bits
+
+        # Sojourn holding the first bit after the frame
+        k = bisect_right(self._starts, end) - 1
+        state = self._first_state ^ (k & 1)
+        good_at_end = self._good_prefix[k]
+        if state == self.STATE_GOOD:
+            good_at_end += end - self._starts[k]
+
+        good_bits = good_at_end - self._good_at_pos
+        log_ok = good_bits * self._log_ok[0] + (bits - good_bits) * self._log_ok[1]
+
+        self._pos = end
+        self._good_at_pos = good_at_end
+        self.current_state = state
+        return self._next_uniform() < -math.expm1(log_ok)
+
+
+class MatrixGilbertElliotChannel(GilbertElliotChannel):
+    """
+    Exact per-frame Gilbert-Elliot model, with no sojourn sampling at all.
+
+    Bit by bit, the channel errs with its state's BER and then moves with
+    the transition matrix P. With D = diag(1-P_G, 1-P_B) and A = D @ P,
+    for an n-bit frame starting in state i:
+        P(no error, ends in j) = (A^n)[i, j]
+        P(error,    ends in j) = (P^n)[i, j] - (A^n)[i, j]
+    These four joint probabilities are computed once per frame size (ACKs
+    plus one data size per L) and cached as cumulative rows. Each frame
+    then costs one uniform draw to pick (corrupted, next_state), whatever
+    its length.
+    """
+    def __init__(self, block_size=4096, rng=None):
+        super().__init__(rng)
+        self.block_size = block_size
+        self._uniforms = []
+        self._tables = {}   # size_bytes -> cumulative outcome rows, one per start state
+
+        self._transition = np.array([
+            [1.0 - self.trans_g_to_b, self.trans_g_to_b],
+            [self.trans_b_to_g, 1.0 - self.trans_b_to_g],
+        ])
+        self._ok_transition = np.diag([1.0 - self.p_g, 1.0 - self.p_b]) @ self._transition
+
+    def _next_uniform(self):
+        if not self._uniforms:
+            self._uniforms.extend(self.rng.random(self.block_size).tolist())
+        return self._uniforms.pop()
+
+    def reset_stream(self, rng):
+        super().reset_stream(rng)
+        self._uniforms = []
+
+    def _table(self, packet_size_bytes):
+        bits = packet_size_bytes * 8
+        p_n = np.linalg.matrix_power(self._transition, bits)
+        a_n = np.linalg.matrix_power(self._ok_transition, bits)
+
+        rows = []
+        for state in (self.STATE_GOOD, self.STATE_BAD):
+            # Outcome order: (ok, GOOD), (ok, BAD), (error, GOOD), (error, BAD)
+            probs = [a_n[state, 0], a_n[state, 1],
+                     p_n[state, 0] - a_n[state, 0], p_n[state, 1] - a_n[state, 1]]
+            rows.append(tuple(np.cumsum(probs)[:3].tolist()))
+
+        self._tables[packet_size_bytes] = rows
+        return rows
+
+    def precompute(self, sizes):
+        """
+        Fills the cache for the given frame sizes (in bytes) up front.
+        """
+        for size in sizes:
+            if size not in self._tables:
+                self._table(size)
+
+    def is_packet_corrupted(self, packet_size_bytes):
+        rows = self._tables.get(packet_size_bytes)
+        if rows is None:
+            rows = self._table(packet_size_bytes)
+        c_ok_good, c_ok_bad, c_err_good = rows[self.current_state]
+
+        u = self._next_uniform()
+        if u < c_ok_good:
+            self.current_state = self.STATE_GOOD
+            return False
+        if u < c_ok_bad:
+            self.current_state = self.STATE_BAD
+            return False
+        self.current_state = self.STATE_GOOD if u < c_err_good else self.STATE_BAD
+        return True
+
+
+CHANNEL_MODELS = {
+    'scalar': GilbertElliotChannel,
+    'batched': BatchedGilbertElliotChannel,
+    'matrix': MatrixGilbertElliotChannel,
+}
+
+
+def make_channel(model, rng=None):
+    """
+    Builds a Gilbert-Elliot channel by model name ('scalar', 'batched' or 'matrix'),
+    drawing from the Generator 'rng'.
+    """
+    if model not in CHANNEL_MODELS:
+        raise ValueError(f"Unknown channel model: {model!r}")
+    return CHANNEL_MODELS[model](rng=rng)
+
+
+QUEUE_DISCIPLINES = ('droptail', 'red')
+
+
+class Transmitter:
+    """
+    One output port: a FIFO transmit queue in front of a BIT_RATE link.
+
+    Frames are served back-to-back, so a frame's departure time is known
+    when it arrives; the queue is just the frames still in the system
+    (the one being sent included). With a finite capacity in bytes, a
+    frame that does not fit is dropped (drop-tail). With RED, frames are
+    also dropped early, with a probability growing with the average
+    occupancy (Floyd & Jacobson 1993); thresholds are fractions of the
+    capacity.
+    Occupancy is reported as its peak and its time average. A bounded
+    queue counts whole frames (the one in service included). An unbounded
+    queue never drops, so it keeps no per-frame state at all: its
+    occupancy is the backlog still to be sent, (busy_until - t) * BIT_RATE,
+    which decreases linearly between arrivals and is integrated in closed
+    form.
+    """
+    def __init__(self, capacity_bytes=None, discipline='droptail', rng=None):
+        if discipline not in QUEUE_DISCIPLINES:
+            raise ValueError(f"Unknown queue discipline: {discipline!r}")
+        if discipline == 'red' and capacity_bytes is None:
+            raise ValueError("RED needs a finite queue capacity")
+        self.busy_until = 0.0
+        self.capacity = capacity_bytes
+        self.red = discipline == 'red'
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self._in_system = deque()   # (end of transmission, size) of queued frames
+        self.occupancy = 0          # Bytes queued, frame in service included
+
+        # Counters
+        self.enqueued = 0
+        self.drops = 0              # Tail drops and RED drops
+        self.early_drops = 0        # RED drops only
+        self.peak_occupancy = 0
+        self._area = 0.0            # Integral of the occupancy over time (byte-seconds)
+        self._area_until = 0.0      # Time the integral runs to
+        # Unbounded queues: backlog as seconds of transmission (converted in stats())
+        self._peak_backlog = 0.0
+        self._backlog_area = 0.0    # Twice the integral of the backlog of all frames sent (seconds^2)
+
+        # RED state
+        self._avg = 0.0             # EWMA of the occupancy (bytes)
+        self._count = -1            # Frames accepted since the last RED drop
+
+    def send(self, now, size_bytes):
+        """
+        Queues a frame arriving at 'now'. Returns the time its transmission
+        ends, or None if it was dropped.
+        """
+        if self.capacity is None:
+            busy_until = self.busy_until
+            tx_time = (size_bytes * 8) / config.BIT_RATE
+            # The frame adds tx_time to the backlog while it waits, then drains it
+            if now > busy_until:
+                end_tx = now + tx_time
+                self._backlog_area += tx_time * tx_time
+            else:
+                end_tx = busy_until + tx_time
+                self._backlog_area += tx_time * (2 * (busy_until - now) + tx_time)
+            self.busy_until = end_tx
+            self.enqueued += 1
+            backlog = end_tx - now
+            if backlog > self._peak_backlog:
+                self._peak_backlog = backlog
+            return end_tx
+
+        in_system = self._in_system
+        while in_system and in_system[0][0] <= now:
+            end, size = in_system.popleft()
+            self._area += self.occupancy * (end - self._area_until)
+            self._area_until = end
+            self.occupancy -= size
+        self._area += self.occupancy * (now - self._area_until)
+        self._area_until = now
+
+        if self.red and self._red_drop(now, size_bytes):
+            self.drops += 1
+            self.early_drops += 1
+            return None
+        if self.occupancy + size_bytes > self.capacity:
+            self.drops += 1
+            return None
+
+        end_tx = max(now, self.busy_until) + (size_bytes * 8) / config.BIT_RATE
+        self.busy_until = end_tx
+        in_system.append((end_tx, size_bytes))
+        self.occupancy += size_bytes
+        self.enqueued += 1
+        if self.occupancy > self.peak_occupancy:
+            self.peak_occupancy = self.occupancy
+        return end_tx
+
+    def _red_drop(self, now, size_bytes):
+        weight = config.RED_WEIGHT
+        if self.occupancy:
+            self._avg += weight * (self.occupancy - self._avg)
+        else:
+            # Idle link: decay the average as if empty-queue samples had arrived meanwhile
+            idle_frames = (now - self.busy_until) * config.BIT_RATE / (size_bytes * 8)
+            self._avg *= (1 - weight) ** max(idle_frames, 1.0)
+
+        min_th = config.RED_MIN_TH * self.capacity
+        max_th = config.RED_MAX_TH * self.capacity
+        if self._avg < min_th:
+            self._count = -1
+            return False
+        if self._avg >= max_th:
+            self._count = 0
+            return True
+
+        self._count += 1
+        p_b = config.RED_MAX_P * (self._avg - min_th) / (max_th - min_th)
+        # Spread drops evenly instead of letting them cluster
+        p_a = p_b / (1 - self._count * p_b) if self._count * p_b < 1 else 1.0
+        if self.rng.random() < p_a:
+            self._count = 0
+            return True
+        return False
+
+    def stats(self, now=None):
+        """
+        Counters, with the occupancy averaged over [0, now] (by default,
+        until the queue last empties).
+        """
+        if now is None:
+            now = max(self._area_until, self.busy_until)
+        if self.capacity is None:
+            bytes_per_sec = config.BIT_RATE / 8
+            peak = round(self._peak_backlog * bytes_per_sec)
+            # Backlog still to be sent after 'now' is not part of [0, now]
+            left = self.busy_until - now
+            area = self._backlog_area - left * left if left > 0 else self._backlog_area
+            area *= bytes_per_sec / 2
+        else:
+            peak = self.peak_occupancy
+            area = self._area
+            occupancy = self.occupancy
+            until = self._area_until
+            for end, size in self._in_system:
+                if end > now:
+                    break
+                area += occupancy * (end - until)
+                occupancy -= size
+                until = end
+            area += occupancy * max(now - until, 0.0)
+        return {
+            'enqueued': self.enqueued,
+            'drops': self.drops,
+            'early_drops': self.early_drops,
+            'peak_occupancy_bytes': peak,
+            'avg_occupancy_bytes': area / now if now > 0 else 0.0,
+        }
+
+
 class PhysicalLayer:
-    def __init__(self, event_manager):
+    """
+    Shared medium between the two link layers.
+    Each direction has its own Gilbert-Elliot channel (forward: data,
+    reverse: ACKs), so the error process of one path does not depend on
+    the traffic of the other. Passing only 'channel' shares it between
+    both directions.
+    Likewise each direction has its own Transmitter (queue + link), so
+    ACKs do not wait behind data frames; passing only 'transmitter'
+    shares one between both directions (the original half-duplex model).
+    """
+    def __init__(self, event_manager, channel=None, reverse_channel=None, transmitter=None,
+                 reverse_transmitter=None):
         self.event_manager = event_manager
-        self.channel = GilbertElliotChannel()
+        self.channel = channel if channel is not None else make_channel(config.CHANNEL_MODEL)
+        if reverse_channel is None:
+            reverse_channel = self.channel if channel is not None else make_channel(config.CHANNEL_MODEL)
+        self.reverse_channel = reverse_channel
+        self.channels = {True: self.channel, False: self.reverse_channel}
         
         # --- BOTTLENECKS ---
-        self.tx_busy_until = 0.0 
+        self.transmitter = transmitter if transmitter is not None else Transmitter()
+        if reverse_transmitter is None:
+            reverse_transmitter = self.transmitter if transmitter is not None else Transmitter()
+        self.reverse_transmitter = reverse_transmitter
+        self.transmitters = {True: self.transmitter, False: self.reverse_transmitter}
         self.rx_busy_until = {True: 0.0, False: 0.0}
 
+        self.frames_transmitted = 0
+
+        # Per-frame trace (src/trace.py TraceRecorder), None when not tracing
+        self.trace = None
+
+    def queue_stats(self):
+        """
+        Counters of each transmit queue ('forward' and 'reverse', or 'shared'),
+        occupancy averaged over the run so far.
+        """
+        now = self.event_manager.current_time
+        if self.reverse_transmitter is self.transmitter:
+            return {'shared': self.transmitter.stats(now)}
+        return {'forward': self.transmitter.stats(now), 'reverse': self.reverse_transmitter.stats(now)}
+
     def transmit(self, packet, is_forward_path, receiver_callback):
+        current_time = self.event_manager.current_time
+
+        # 0. Queue admission: a dropped frame never reaches the channel
+        end_tx = self.transmitters[is_forward_path].send(current_time, packet.size_bytes)
+        if end_tx is None:
+            if self.trace is not None:
+                self.trace.record(current_time, QUEUE_DROP if packet.type == 'DATA' else QUEUE_DROP_ACK,
+                                  packet.seq_num, packet.size_bytes)
+            return
+
         # NOT: Artık update_state() fonksiyonunu manuel çağırmıyoruz,
         # is_packet_corrupted içinde otomatik yapılıyor.
         
         # 1. Check Errors (ve State Update)
-        corrupted = self.channel.is_packet_corrupted(packet.size_bytes)
-        
-        # ... (Geri kalan transmit kodları AYNI kalacak) ...
-        # Transmit delay, propagation delay vb. hesaplamaları değiştirme.
+        channel = self.channels[is_forward_path]
+        corrupted = channel.is_packet_corrupted(packet.size_bytes)
+        self.frames_transmitted += 1
+        if self.trace is not None:
+            self.trace.record(current_time, TX if packet.type == 'DATA' else TX_ACK, packet.seq_num,
+                              packet.size_bytes, corrupted, channel.current_state)
         
-        trans_delay = (packet.size_bytes * 8) / config.BIT_RATE
+        # Transmit delay is accounted for by the transmitter (end_tx);
+        # propagation and processing delays are added here.
         prop_delay = config.PROPAGATION_DELAY_FWD if is_forward_path else config.PROPAGATION_DELAY_REV
         proc_delay = config.PROCESSING_DELAY
         
-        current_time = self.event_manager.current_time
-        
-        start_tx = max(current_time, self.tx_busy_until)
-        end_tx = start_tx + trans_delay
-        self.tx_busy_until = end_tx
-        
         arrival_at_rx_input = end_tx + prop_delay
         
         rx_free_time = self.rx_busy_until[is_forward_path]
-        start_proc = max(arrival_at_rx_input, rx_free_time)
+        start_proc = arrival_at_rx_input if arrival_at_rx_input >= rx_free_time else rx_free_time
         end_proc = start_proc + proc_delay
         self.rx_busy_until[is_forward_path] = end_proc
         
         delivery_time = end_proc
         
+        # Same rounding as schedule(delivery_time - current_time)
         delay_from_now = delivery_time - current_time
-        self.event_manager.schedule(delay_from_now, receiver_callback, args=(packet, corrupted))
\ No newline at end of file
+        self.event_manager.schedule_at(current_time + delay_from_now, receiver_callback, args=(packet, corrupted))
+
+    def transmit_batch(self, packets, is_forward_path, receiver_callback):
+        """
+        Sends back-to-back frames in one pass: the same channel draws and
+        serialisation/propagation/processing arithmetic as one transmit()
+        per frame, but a single 'frame train' event delivers them all.
+        """
+        if len(packets) == 1:
+            self.transmit(packets[0], is_forward_path, receiver_callback)
+            return
+
+        channel = self.channels[is_forward_path]
+        transmitter = self.transmitters[is_forward_path]
+        event_manager = self.event_manager
+        prop_delay = config.PROPAGATION_DELAY_FWD if is_forward_path else config.PROPAGATION_DELAY_REV
+        proc_delay = config.PROCESSING_DELAY
+
+        current_time = event_manager.current_time
+        rx_busy_until = self.rx_busy_until[is_forward_path]
+        trace = self.trace
+        train = []
+        for packet in packets:
+            end_tx = transmitter.send(current_time, packet.size_bytes)
+            if end_tx is None:
+                if trace is not None:
+                    trace.record(current_time, QUEUE_DROP if packet.type == 'DATA' else QUEUE_DROP_ACK,
+                                 packet.seq_num, packet.size_bytes)
+                continue # Dropped at the queue
+            corrupted = channel.is_packet_corrupted(packet.size_bytes)
+            if trace is not None:
+                trace.record(current_time, TX if packet.type == 'DATA' else TX_ACK, packet.seq_num,
+                             packet.size_bytes, corrupted, channel.current_state)
+
+            rx_busy_until = max(end_tx + prop_delay, rx_busy_until) + proc_delay
+            # Same rounding and tie-break position as a schedule() per frame
+            delivery_time = current_time + (rx_busy_until - current_time)
+            train.append((delivery_time, event_manager.reserve_seq(), packet, corrupted))
+
+        self.rx_busy_until[is_forward_path] = rx_busy_until
+        self.frames_transmitted += len(train)
+        if not train:
+            return
+
+        delivery_time, seq = train[0][0], train[0][1]
+        event_manager.schedule_at(delivery_time, self._deliver_train, args=(train, 0, receiver_callback), seq=seq)
+
+    def _deliver_train(self, train, index, receiver_callback):
+        """
+        Hands the frames of a train to the receiver at their own delivery
+        times. The clock is advanced in place while no other event falls in
+        between; otherwise the rest of the train is scheduled again.
+        """
+        event_manager = self.event_manager
+        last = len(train) - 1
+        while True:
+            receiver_callback(train[index][2], train[index][3])
+            if index == last:
+                return
+            index += 1
+            delivery_time, seq = train[index][0], train[index][1]
+            if not event_manager.try_advance(delivery_time, seq):
+                event_manager.schedule_at(delivery_time, self._deliver_train,
+                                          args=(train, index, receiver_callback), seq=seq)
+                return
+
+
+def make_physical_layer(event_manager, streams):
+    """
+    PhysicalLayer set up from config (channel model, per-direction channels,
+    transmitter mode and queues), drawing from the run's random streams
+    (src/rng.py).
+    """
+    if config.CHANNEL_PER_DIRECTION:
+        channel = make_channel(config.CHANNEL_MODEL, rng=streams.generator('channel_fwd'))
+        reverse_channel = make_channel(config.CHANNEL_MODEL, rng=streams.generator('channel_rev'))
+    else:
+        channel = reverse_channel = make_channel(config.CHANNEL_MODEL, rng=streams.generator('channel'))
+
+    queue = (config.QUEUE_CAPACITY_BYTES, config.QUEUE_DISCIPLINE)
+    if config.TRANSMITTER_MODE == 'duplex':
+        transmitter = Transmitter(*queue, rng=streams.generator('queue_fwd'))
+        reverse_transmitter = Transmitter(*queue, rng=streams.generator('queue_rev'))
+    elif config.TRANSMITTER_MODE == 'shared':
+        transmitter = reverse_transmitter = Transmitter(*queue, rng=streams.generator('queue'))
+    else:
+        raise ValueError(f"Unknown transmitter mode: {config.TRANSMITTER_MODE!r}")
+
+    return PhysicalLayer(event_manager, channel=channel, reverse_channel=reverse_channel,
+                         transmitter=transmitter, reverse_transmitter=reverse_transmitter)
@@ -0,0 +1,348 @@
+# src/realtime.py
+"""
+Real-time mode: the same LinkLayer/TransportLayer code as a real protocol
+over asyncio UDP sockets on 127.0.0.1.
+
+- AsyncioEventManager offers the EventManager API the layers use
+  (current_time, schedule, schedule_at, reserve_seq, cancel_event) on
+  top of the asyncio loop, with wall-clock time.
+- UdpPhysicalLayer serialises frames (header sizes as in config.py, CRC32
+  in the link header) and sends them as datagrams between two sockets.
+- ImpairmentShim optionally applies the simulated link on the way out:
+  transmitter queue at BIT_RATE, propagation and processing delays, and
+  Gilbert-Elliot errors (a corrupted frame gets a flipped byte, so the
+  receiver's CRC check rejects it).
+
+Without the shim, frames go out as fast as the code can produce them,
+which measures whether the Python ARQ logic keeps up with a given line
+rate. Reported: wall-clock goodput, frames/sec and CPU time per frame.
+
+Usage (from the project root):
+    python -m src.realtime -W 64 -L 1024 --bytes 10000000 --no-impairment
+"""
+import argparse
+import asyncio
+import itertools
+import struct
+import time
+import zlib
+
+import config
+from src.packet import LinkFrame, SackFrame, TransportSegment
+from src.payload import FileSource, VirtualSource
+from src.physical import Transmitter, make_channel
+from src.rng import RngStreams
+from src.stats import RunningStats
+from src.topology import Flow
+
+HOST = '127.0.0.1'
+
+# Link header (LINK_HEADER_SIZE bytes): type, seq, cumulative ACK (SACK only), CRC32
+_LINK_HEADER = struct.Struct('!BxxxQQ')
+_CRC = struct.Struct('!I')
+# Transport header (TRANSPORT_HEADER_SIZE bytes): segment number
+_TRANSPORT_HEADER = struct.Struct('!Q')
+
+_TYPES = {'DATA': 0, 'ACK': 1, 'SACK': 2}
+_TYPE_NAMES = {code: name for name, code in _TYPES.items()}
+
+# Virtual payloads go on the wire as zeros, sliced from this buffer
+_ZEROS = memoryview(bytes(64 * 1024))
+
+
+def encode_frame(frame, window_size):
+    """
+    Wire format of a LinkFrame: exactly frame.size_bytes bytes.
+    """
+    cum_ack = frame.cum_ack if frame.type == 'SACK' else 0
+    parts = [_LINK_HEADER.pack(_TYPES[frame.type], frame.seq_num, cum_ack)]
+    if frame.type == 'DATA':
+        segment = frame.payload
+        data = segment.data
+        parts.append(_TRANSPORT_HEADER.pack(segment.seq_num))
+        parts.append(data if isinstance(data, (bytes, bytearray, memoryview)) else _ZEROS[:len(data)])
+    elif frame.type == 'SACK':
+        parts.append(frame.bitmap.to_bytes((window_size + 7) // 8, 'big'))
+
+    body = b''.join(parts[1:])
+    header = parts[0]
+    crc = zlib.crc32(body, zlib.crc32(header))
+    return header + _CRC.pack(crc) + body
+
+
+def decode_frame(datagram, window_size):
+    """
+    (LinkFrame, corrupted) from a datagram. A frame whose CRC does not
+    match is still returned (as far as it can be parsed) with corrupted=True.
+    """
+    header_size = _LINK_HEADER.size + _CRC.size
+    header = datagram[:_LINK_HEADER.size]
+    body = datagram[header_size:]
+    (crc,) = _CRC.unpack_from(datagram, _LINK_HEADER.size)
+    corrupted = zlib.crc32(body, zlib.crc32(header)) != crc
+
+    type_code, seq, cum_ack = _LINK_HEADER.unpack(header)
+    frame_type = _TYPE_NAMES.get(type_code)
+    if frame_type is None:
+        return None, True
+    if frame_type == 'DATA':
+        (segment_seq,) = _TRANSPORT_HEADER.unpack_from(body)
+        segment = TransportSegment(segment_seq, body[_TRANSPORT_HEADER.size:])
+        return LinkFrame(seq, 'DATA', payload=segment), corrupted
+    if frame_type == 'SACK':
+        return SackFrame(seq, cum_ack, int.from_bytes(body, 'big'), window_size), corrupted
+    return LinkFrame(seq, 'ACK'), corrupted
+
+
+class AsyncioEventManager:
+    """
+    EventManager API on the asyncio loop. Simulated time is wall time
+    since creation; events are loop callbacks, canceled through their handle.
+
+    A scheduled handler sees current_time equal to its own timestamp, as
+    in the discrete-event engine (the timer wheel relies on it); how late
+    the loop actually ran it goes into 'lateness'. The first exception
+    raised by a handler stops the run (see 'failed').
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self._t0 = loop.time()
+        self._seq = itertools.count()
+        self._pinned = None     # Timestamp of the scheduled handler running now
+        self.events_executed = 0
+        self.lateness = RunningStats()
+        self.failed = loop.create_future()
+
+    @property
+    def current_time(self):
+        if self._pinned is not None:
+            return self._pinned
+        return self.loop.time() - self._t0
+
+    def run_handler(self, handler, args, timestamp=None):
+        self.events_executed += 1
+        if timestamp is not None:
+            self.lateness.push(self.loop.time() - self._t0 - timestamp)
+        self._pinned = timestamp
+        try:
+            handler(*args)
+        except Exception as error:
+            if not self.failed.done():
+                self.failed.set_exception(error)
+        finally:
+            self._pinned = None
+
+    def schedule(self, delay, handler, args=()):
+        return self.schedule_at(self.current_time + max(delay, 0.0), handler, args)
+
+    def reserve_seq(self):
+        # Ordering among equal deadlines is up to the loop in real time
+        return next(self._seq)
+
+    def schedule_at(self, timestamp, handler, args=(), seq=None):
+        return self.loop.call_at(self._t0 + timestamp, self.run_handler, handler, args, timestamp)
+
+    def cancel_event(self, event):
+        if event:
+            event.cancel()
+
+    def try_advance(self, timestamp, seq):
+        # The clock is real: it cannot be moved
+        return False
+
+
+class _Endpoint(asyncio.DatagramProtocol):
+    """
+    One UDP socket, handing decoded frames to the link layer that owns it.
+    """
+    def __init__(self, physical, owner):
+        self.physical = physical
+        self.owner = owner
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.physical.frames_received += 1
+        frame, corrupted = decode_frame(data, self.physical.window_size)
+        if frame is not None:
+            self.physical.event_manager.run_handler(self.physical.receivers[self.owner], (frame, corrupted))
+
+
+class ImpairmentShim:
+    """
+    Applies the simulated link to outgoing datagrams: a Transmitter per
+    direction (BIT_RATE serialisation, queue), propagation and processing
+    delays from config.py and the Gilbert-Elliot channel. Returns the
+    delay before the datagram may be sent, or None if it was dropped.
+    """
+    def __init__(self, event_manager, streams):
+        self.event_manager = event_manager
+        self.channels = {True: make_channel(config.CHANNEL_MODEL, rng=streams.generator('channel_fwd')),
+                         False: make_channel(config.CHANNEL_MODEL, rng=streams.generator('channel_rev'))}
+        queue = (config.QUEUE_CAPACITY_BYTES, config.QUEUE_DISCIPLINE)
+        self.transmitters = {True: Transmitter(*queue, rng=streams.generator('queue_fwd')),
+                             False: Transmitter(*queue, rng=streams.generator('queue_rev'))}
+        self.rx_busy_until = {True: 0.0, False: 0.0}
+        self.corrupted = 0
+
+    def apply(self, datagram, is_forward_path):
+        now = self.event_manager.current_time
+        end_tx = self.transmitters[is_forward_path].send(now, len(datagram))
+        if end_tx is None:
+            return None, datagram
+
+        if self.channels[is_forward_path].is_packet_corrupted(len(datagram)):
+            self.corrupted += 1
+            datagram = bytearray(datagram)
+            datagram[-1] ^= 0xFF
+
+        prop_delay = config.PROPAGATION_DELAY_FWD if is_forward_path else config.PROPAGATION_DELAY_REV
+        delivery = max(end_tx + prop_delay, self.rx_busy_until[is_forward_path]) + config.PROCESSING_DELAY
+        self.rx_busy_until[is_forward_path] = delivery
+        return delivery - now, datagram
+
+
+class UdpPhysicalLayer:
+    """
+    PhysicalLayer replacement over two localhost UDP sockets: the forward
+    path goes from the sender's socket to the receiver's, the reverse path
+    back. The receiver_callback argument of transmit() is not needed:
+    each socket delivers to the link layer set in 'receivers'.
+    """
+    def __init__(self, event_manager, window_size, shim=None):
+        self.event_manager = event_manager
+        self.window_size = window_size
+        self.shim = shim
+        self._endpoints = {}    # is_forward_path -> (sending endpoint, destination address)
+        self.receivers = {}     # 'sender' / 'receiver' -> receive_frame_from_physical of that side
+        self.frames_transmitted = 0
+        self.frames_received = 0
+        self.bytes_transmitted = 0
+
+    async def open(self):
+        """
+        Opens both sockets. Must be done before the first transmit().
+        """
+        loop = self.event_manager.loop
+        sender, _ = await loop.create_datagram_endpoint(
+            lambda: _Endpoint(self, 'sender'), local_addr=(HOST, 0))
+        receiver, _ = await loop.create_datagram_endpoint(
+            lambda: _Endpoint(self, 'receiver'), local_addr=(HOST, 0))
+        self._endpoints = {
+            True: (sender, receiver.get_extra_info('sockname')),
+            False: (receiver, sender.get_extra_info('sockname')),
+        }
+
+    def close(self):
+        for transport, _ in self._endpoints.values():
+            transport.close()
+
+    def transmit(self, packet, is_forward_path, receiver_callback):
+        datagram = encode_frame(packet, self.window_size)
+        transport, address = self._endpoints[is_forward_path]
+
+        delay = 0.0
+        if self.shim is not None:
+            delay, datagram = self.shim.apply(datagram, is_forward_path)
+            if delay is None:
+                return # Dropped at the transmit queue
+
+        self.frames_transmitted += 1
+        self.bytes_transmitted += len(datagram)
+        if delay > 0:
+            self.event_manager.loop.call_later(delay, transport.sendto, datagram, address)
+        else:
+            transport.sendto(datagram, address)
+
+    def transmit_batch(self, packets, is_forward_path, receiver_callback):
+        for packet in packets:
+            self.transmit(packet, is_forward_path, receiver_callback)
+
+
+async def run_realtime(window_size, payload_size, total_bytes, impair=True, seed=1, timeout=60.0, path=None):
+    """
+    Transfers total_bytes over localhost UDP with the ARQ stack, or the
+    content of the file at 'path' (real data: the receiver checks its
+    SHA-256). Returns wall-clock throughput and CPU cost figures.
+    """
+    loop = asyncio.get_running_loop()
+    event_manager = AsyncioEventManager(loop)
+    streams = RngStreams(seed, window_size, payload_size, 0)
+    shim = ImpairmentShim(event_manager, streams) if impair else None
+    physical = UdpPhysicalLayer(event_manager, window_size, shim=shim)
+
+    await physical.open()
+
+    source = VirtualSource(total_bytes) if path is None else FileSource(path)
+    done = loop.create_future()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    flow = Flow(0, physical, event_manager, window_size, payload_size, source,
+                lambda _: done.done() or done.set_result(True))
+    physical.receivers = {'sender': flow.link_sender.receive_frame_from_physical,
+                          'receiver': flow.link_receiver.receive_frame_from_physical}
+    try:
+        await asyncio.wait_for(asyncio.wait([done, event_manager.failed], return_when=asyncio.FIRST_COMPLETED),
+                               timeout)
+    except asyncio.TimeoutError:
+        pass
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    physical.close()
+    if event_manager.failed.done():
+        event_manager.failed.result()   # Re-raises the handler's exception
+
+    delivered = flow.app_receiver.bytes_received
+    integrity_ok = flow.app_receiver.integrity_ok()
+    flow.link_sender.drop_frames()
+    flow.link_receiver.drop_frames()
+    source.close()
+    frames = physical.frames_transmitted
+    return {
+        'W': window_size,
+        'L': payload_size,
+        'impaired': impair,
+        'finished': done.done(),
+        'bytes_delivered': delivered,
+        'integrity_ok': integrity_ok,
+        'corrupted_frames': shim.corrupted if shim is not None else 0,
+        'wall_sec': wall,
+        'goodput_mbps': delivered * 8 / wall / 1e6 if wall > 0 else 0,
+        'wire_mbps': physical.bytes_transmitted * 8 / wall / 1e6 if wall > 0 else 0,
+        'frames': frames,
+        'frames_per_sec': frames / wall if wall > 0 else 0,
+        'cpu_sec': cpu,
+        'cpu_us_per_frame': cpu / frames * 1e6 if frames else 0,
+        'retransmissions': flow.link_sender.total_retransmissions,
+        'events': event_manager.events_executed,
+        'lateness_mean_ms': event_manager.lateness.mean * 1e3,
+        'lateness_max_ms': (event_manager.lateness.max or 0.0) * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ARQ stack over localhost UDP, in real time")
+    parser.add_argument('-W', type=int, default=64, help="Window size")
+    parser.add_argument('-L', type=int, default=1024, help="Payload size")
+    parser.add_argument('--bytes', type=int, default=1024 * 1024, help="Data to transfer")
+    parser.add_argument('--file', default=None, help="Transfer this file's content instead (overrides --bytes)")
+    parser.add_argument('--no-impairment', action='store_true',
+                        help="Raw sockets: no rate limit, delays or channel errors")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=60.0, help="Wall-clock limit (seconds)")
+    args = parser.parse_args()
+
+    stats = asyncio.run(run_realtime(args.W, args.L, args.bytes, impair=not args.no_impairment,
+                                     seed=args.seed, timeout=args.timeout, path=args.file))
+    status = "finished" if stats['finished'] else "timed out"
+    print(f"W={stats['W']} L={stats['L']} ({'impaired' if stats['impaired'] else 'raw'}): {status} "
+          f"after {stats['wall_sec']:.2f} s, {stats['bytes_delivered']} bytes delivered")
+    print(f"goodput {stats['goodput_mbps']:.2f} Mbps, on the wire {stats['wire_mbps']:.2f} Mbps, "
+          f"{stats['frames_per_sec']:.0f} frames/s, {stats['retransmissions']} retransmissions")
+    print(f"CPU {stats['cpu_sec']:.2f} s = {stats['cpu_us_per_frame']:.1f} us per frame, timers late by "
+          f"{stats['lateness_mean_ms']:.2f} ms on average ({stats['lateness_max_ms']:.2f} ms max)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+# src/results_store.py
+"""
+Columnar results store: an append-friendly alternative to the sweep CSV.
+
+A store is a directory:
+    meta.json               column names and dtypes, plus one entry per
+                            session that wrote to it (config values, code
+                            version, start time)
+    chunk-00000/W.npy       one .npy file per column and chunk
+    chunk-00000/L.npy
+    ...
+
+Rows are buffered and written as a new chunk every 'chunk_rows' rows
+(CHUNK_ROWS by default; sweeps use 1, so every finished simulation is on
+disk at once) or FLUSH_INTERVAL seconds; a chunk is written to a
+temporary directory and renamed into place, so a crash never leaves a
+half-written chunk behind. compact() merges the chunks into one: the new
+chunk is written aside and a marker (compact.json) naming it and the
+chunks it replaces is committed before anything is renamed or removed;
+whoever next lists the chunks completes an interrupted compaction, so
+rows are never lost nor seen twice.
+Columns are read with np.load(mmap_mode='r'): a plot that only needs W,
+L and goodput never touches the other columns.
+
+Usage (from the project root), converting existing CSVs:
+    python -m src.results_store convert results/simulation_data.csv
+    python -m src.results_store export results/simulation_data.store out.csv
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import time
+
+import numpy as np
+
+import config
+
+STORE_SUFFIX = '.store'
+META_FILE = 'meta.json'
+COMPACT_MARKER = 'compact.json'
+CHUNK_PREFIX = 'chunk-'
+FORMAT_VERSION = 1
+
+CHUNK_ROWS = 256
+FLUSH_INTERVAL = 60.0   # Seconds; a slow sweep still gets its rows on disk
+
+# Known sweep columns; anything else is inferred from its values
+COLUMN_TYPES = {
+    'W': 'int32',
+    'L': 'int32',
+    'run_id': 'int32',
+    'seed': 'int64',
+    'retransmissions': 'int64',
+    'buffer_events': 'int64',
+    'queue_drops': 'int64',
+    'queue_peak_bytes': 'int64',
+    'stopped_early': 'bool',
+}
+
+# Value of a column a row does not have (e.g. CSVs from before it existed)
+_MISSING = {'f': np.nan, 'i': -1, 'u': 0, 'b': False, 'U': ''}
+
+
+def is_store(path):
+    """
+    True if 'path' names a results store (existing or to be created).
+    """
+    return path.endswith(STORE_SUFFIX) or os.path.isfile(os.path.join(path, META_FILE))
+
+
+def code_version():
+    """
+    'git describe' of the working tree (with -dirty), or 'unknown'.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        out = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=root,
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+    return out.stdout.strip() or 'unknown'
+
+
+def config_values():
+    """
+    The UPPERCASE constants of config.py that JSON can hold.
+    """
+    values = {}
+    for name in dir(config):
+        if name.isupper():
+            value = getattr(config, name)
+            if value is None or isinstance(value, (bool, int, float, str, list, tuple)):
+                values[name] = value
+    return values
+
+
+def _parse(value):
+    """
+    Typed value of a CSV cell: int, float, bool or the string itself.
+    """
+    if value in ('True', 'False'):
+        return value == 'True'
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _infer_dtype(values):
+    values = [v for v in values if v is not None and v != '']
+    if values and all(isinstance(v, bool) for v in values):
+        return 'bool'
+    if values and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return 'int64'
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return 'float64'
+    return 'str'
+
+
+class ResultsStore:
+    """
+    One store directory. Columns are fixed when the store is created;
+    extra keys in appended rows are ignored, missing ones get NaN / -1 /
+    False / ''.
+    """
+    def __init__(self, path, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.meta = None
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+
+    # --- Schema and metadata ---
+
+    @property
+    def columns(self):
+        return [name for name, _ in self.meta['columns']] if self.meta else []
+
+    def dtypes(self):
+        return {name: ('U' if dtype == 'str' else np.dtype(dtype)) for name, dtype in self.meta['columns']}
+
+    def create(self, columns):
+        """
+        Creates the directory and meta.json. columns: [(name, dtype), ...]
+        with numpy dtype names, or 'str'.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        self.meta = {
+            'format': FORMAT_VERSION,
+            'columns': [list(c) for c in columns],
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'sessions': [],
+        }
+        self._write_meta()
+        return self
+
+    def open_session(self, fieldnames, **info):
+        """
+        Prepares the store for a writing session: creates it (fieldnames
+        plus a 'seed' column, typed from COLUMN_TYPES) if needed and
+        records the config values and code version of this session.
+        """
+        if self.meta is None:
+            names = list(fieldnames) + ([] if 'seed' in fieldnames else ['seed'])
+            self.create([(name, COLUMN_TYPES.get(name, 'float64')) for name in names])
+        return self.record_session(code_version=code_version(), config=config_values(), **info)
+
+    def record_session(self, **info):
+        """
+        Adds an entry to the 'sessions' list of meta.json.
+        """
+        self.meta['sessions'].append({'started': datetime.datetime.now().isoformat(timespec='seconds'), **info})
+        self._write_meta()
+        return self
+
+    def _write_meta(self):
+        tmp_path = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    # --- Writing ---
+
+    def append(self, row):
+        """
+        Buffers one row (a dict); writes a chunk when the buffer is full
+        or FLUSH_INTERVAL has passed since the last one.
+        """
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_rows or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rows as one chunk.
+        """
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        columns = {}
+        for name, dtype in self.dtypes().items():
+            missing = _MISSING[np.dtype(dtype).kind]
+            values = [row.get(name) for row in rows]
+            columns[name] = np.array([missing if v is None or v == '' else v for v in values], dtype=dtype)
+        self._write_chunk(columns)
+
+    def _chunk_dirs(self):
+        if not os.path.isdir(self.path):
+            return []
+        if os.path.exists(os.path.join(self.path, COMPACT_MARKER)):
+            self._finish_compaction()
+        return sorted(os.path.join(self.path, name) for name in os.listdir(self.path)
+                      if name.startswith(CHUNK_PREFIX) and not name.endswith('.tmp'))
+
+    def _write_chunk(self, columns, publish=True):
+        """
+        Writes a new last chunk. With publish=False it is left in its
+        temporary directory; returns the final path either way.
+        """
+        chunks = self._chunk_dirs()
+        index = int(os.path.basename(chunks[-1])[len(CHUNK_PREFIX):]) + 1 if chunks else 0
+        final = os.path.join(self.path, f'{CHUNK_PREFIX}{index:05d}')
+        tmp = final + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp, name + '.npy'), values)
+        if publish:
+            os.rename(tmp, final)
+        return final
+
+    def compact(self, order=None):
+        """
+        Rewrites all chunks as one, optionally reordering the rows by the
+        index array 'order' (e.g. grid order after a parallel sweep).
+        """
+        self.flush()
+        old = self._chunk_dirs()
+        if len(old) <= 1 and order is None:
+            return
+        columns = self.read()
+        if order is not None:
+            columns = {name: values[order] for name, values in columns.items()}
+        final = self._write_chunk(columns, publish=False)
+
+        # Commit point: from here on the new chunk replaces the old ones
+        plan = {'chunk': os.path.basename(final), 'replaces': [os.path.basename(c) for c in old]}
+        tmp_path = os.path.join(self.path, COMPACT_MARKER + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(plan, f)
+        os.replace(tmp_path, os.path.join(self.path, COMPACT_MARKER))
+        self._finish_compaction()
+
+    def _finish_compaction(self):
+        """
+        Carries out the committed compaction plan: publishes the new chunk
+        (if not done yet), removes the chunks it replaces, then the marker.
+        """
+        marker = os.path.join(self.path, COMPACT_MARKER)
+        with open(marker) as f:
+            plan = json.load(f)
+        final = os.path.join(self.path, plan['chunk'])
+        if os.path.isdir(final + '.tmp'):
+            os.rename(final + '.tmp', final)
+        for name in plan['replaces']:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        os.remove(marker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    # --- Reading ---
+
+    def __len__(self):
+        chunks = self._chunk_dirs()
+        if not chunks or not self.columns:
+            return 0
+        name = self.columns[0]
+        return sum(len(np.load(os.path.join(c, name + '.npy'), mmap_mode='r')) for c in chunks)
+
+    def column(self, name):
+        """
+        All values of one column. A single-chunk store returns the
+        memory-mapped array itself; several chunks are concatenated.
+        """
+        if name not in self.columns:
+            raise KeyError(f"No column {name!r} in {self.path}")
+        parts = [np.load(os.path.join(c, name + '.npy'), mmap_mode='r') for c in self._chunk_dirs()]
+        if not parts:
+            return np.empty(0, dtype=self.dtypes()[name])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def read(self, columns=None):
+        """
+        {name: array} for the given columns (default: all).
+        """
+        return {name: self.column(name) for name in (columns or self.columns)}
+
+    def rows(self):
+        """
+        Iterates over the rows as dicts of Python values.
+        """
+        data = self.read()
+        names = list(data)
+        for values in zip(*(data[name].tolist() for name in names)):
+            yield dict(zip(names, values))
+
+
+def csv_to_store(csv_path, store_path=None):
+    """
+    Converts a results CSV into a store (default: same name, STORE_SUFFIX).
+    Known sweep columns get their usual types; others are inferred.
+    Returns the store path.
+    """
+    store_path = store_path or os.path.splitext(csv_path)[0] + STORE_SUFFIX
+    with open(csv_path, newline='') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = [{k: _parse(v) for k, v in row.items() if k in fieldnames} for row in reader]
+
+    if os.path.exists(store_path):
+        shutil.rmtree(store_path)
+    columns = [(name, COLUMN_TYPES.get(name) or _infer_dtype([row.get(name) for row in rows]))
+               for name in fieldnames]
+    store = ResultsStore(store_path).create(columns)
+    store.record_session(converted_from=os.path.abspath(csv_path))
+    with store:
+        for row in rows:
+            store.append(row)
+    return store_path
+
+
+def store_to_csv(store_path, csv_path):
+    """
+    Writes every row of a store to a CSV with the same columns.
+    """
+    store = ResultsStore(store_path)
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=store.columns)
+        writer.writeheader()
+        writer.writerows(store.rows())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar results store tools")
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help="CSV -> store")
+    convert.add_argument('csv', nargs='+')
+    export = commands.add_parser('export', help="store -> CSV")
+    export.add_argument('store')
+    export.add_argument('csv')
+    info = commands.add_parser('info', help="Columns, row count and sessions of a store")
+    info.add_argument('store')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        for path in args.csv:
+            store_path = csv_to_store(path)
+            print(f"{path} -> {store_path} ({len(ResultsStore(store_path))} rows)")
+    elif args.command == 'export':
+        store_to_csv(args.store, args.csv)
+        print(f"{args.store} -> {args.csv}")
+    else:
+        store = ResultsStore(args.store)
+        print(f"{args.store}: {len(store)} rows")
+        for name, dtype in store.meta['columns']:
+            print(f"  {name}: {dtype}")
+        for session in store.meta['sessions']:
+            print(f"  session {session['started']}: {session.get('code_version') or session.get('converted_from')}")
+
+
+if __name__ == "__main__":
+    main()
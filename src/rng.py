@@ -0,0 +1,43 @@
+# src/rng.py
+"""
+Independent, reproducible random streams, one per stochastic component.
+
+Each component gets its own numpy Generator, built from a SeedSequence
+keyed by (W, L, run_id, component). Streams never share state, so the
+draws of one component do not depend on how often another one draws,
+on the order work lands on pool workers, or on code that touches the
+global RNGs.
+Common random numbers hold across config variants of the same cell: two
+runs with the same (seed, W, L, run_id) but, say, another ACK mode or
+queue discipline see the same channel randomness. W and L are part of
+the key, so different (W, L) cells never share streams.
+"""
+import numpy as np
+
+# Component ids are part of the stream keys: append new ones, never renumber
+COMPONENTS = {
+    'channel': 0,       # Single channel shared by both directions
+    'channel_fwd': 1,   # Forward (data) path errors
+    'channel_rev': 2,   # Reverse (ACK) path errors
+    'queue': 3,         # RED drops, transmitter shared by both directions
+    'queue_fwd': 4,     # RED drops, forward transmitter
+    'queue_rev': 5,     # RED drops, reverse transmitter
+}
+
+
+class RngStreams:
+    """
+    Factory of the per-component generators of one run.
+    """
+    def __init__(self, seed, window_size, payload_size, run_id):
+        self.seed = seed
+        self.key = (window_size, payload_size, run_id)
+
+    def generator(self, component):
+        """
+        Fresh Generator for 'component', always the same for the same run.
+        """
+        if component not in COMPONENTS:
+            raise ValueError(f"Unknown random stream component: {component!r}")
+        sequence = np.random.SeedSequence(entropy=self.seed, spawn_key=self.key + (COMPONENTS[component],))
+        return np.random.default_rng(sequence)
@@ -0,0 +1,399 @@
+# src/simulation.py
+import io
+import math
+import pickle
+from multiprocessing import Pool
+
+import config
+
+from src.event_manager import EventManager, make_event_queue, TIMESTAMP
+from src.physical import make_physical_layer
+from src.link import LinkLayer
+from src.transport import TransportLayer
+from src.application import ApplicationLayer
+from src.payload import FileSource, VirtualSource
+from src.rng import RngStreams
+from src.stats import BatchMeans
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """
+    Pickler for whole simulations. Real-data payloads are memoryview
+    slices of the mapped file, which cannot be pickled: they are stored
+    as bytes (same length, same content).
+    """
+    def reducer_override(self, obj):
+        if isinstance(obj, memoryview):
+            return bytes, (obj.tobytes(),)
+        return NotImplemented
+
+
+class Simulation:
+    """
+    One fully wired sender/receiver simulation.
+
+    Besides running to completion (run_simulation does exactly that), a
+    simulation can be paused at a point in simulated time, snapshotted
+    (EventManager queue, PhysicalLayer and channel state, both LinkLayers,
+    Transport/Application counters and the random streams) and forked into
+    independent continuations with different random streams. Forks share
+    the warm-up; config constants read at event time (delays, bit rate,
+    ...) can be changed on a fork for "what-if" continuations.
+    """
+    def __init__(self, window_size, payload_size, seed, run_id, max_sim_time=None, profile=False,
+                 steady_state=None, trace=None):
+        self.window_size = window_size
+        self.payload_size = payload_size
+        self.seed = seed
+        self.run_id = run_id
+        self.profile = profile
+
+        # 1. Setup Random Seed [cite: 61]
+        # Every stochastic component gets its own stream keyed by (W, L, run_id),
+        # so nothing depends on the global RNGs or on pool scheduling.
+        self.streams = RngStreams(seed, window_size, payload_size, run_id)
+
+        # 2. Initialize Layers
+        self.event_manager = EventManager(make_event_queue(config.EVENT_QUEUE))
+        if profile:
+            self.event_manager.enable_profiling()
+
+        # Application
+        # Virtual payloads by default; config.PAYLOAD_FILE switches to real file content
+        if config.PAYLOAD_FILE:
+            source = FileSource(config.PAYLOAD_FILE)
+        else:
+            source = VirtualSource(config.FILE_SIZE_BYTES)
+        self.source = source
+        self.app_sender = ApplicationLayer(role='SENDER', source=source)
+        self.app_receiver = ApplicationLayer(role='RECEIVER', source=source)
+
+        # Transport
+        self.transport_sender = TransportLayer(self.app_sender)
+        self.transport_receiver = TransportLayer(self.app_receiver)
+
+        # Physical (Shared Medium, one channel and one transmitter per direction)
+        self.physical_layer = make_physical_layer(self.event_manager, self.streams)
+
+        # Link (ARQ)
+        # Note: Window Size is configurable [cite: 58]
+        self.link_sender = LinkLayer(self.physical_layer, self.event_manager, self.transport_sender,
+                                     window_size=window_size)
+        self.link_receiver = LinkLayer(self.physical_layer, self.event_manager, self.transport_receiver,
+                                       window_size=window_size)
+
+        # 3. Wire them together
+        # Sender Link -> Receiver Link (via Physical)
+        self.link_sender.set_peer_callback(self.link_receiver.receive_frame_from_physical)
+
+        # Receiver Link -> Sender Link (ACK path via Physical)
+        self.link_receiver.set_peer_callback(self.link_sender.receive_frame_from_physical)
+
+        # Optional per-frame trace (src/trace.py), shared by both link layers and the physical layer
+        self.set_trace(trace)
+
+        # Strategy: Sender Link Layer pulls from Transport as long as window is open.
+        # Instead of polling, the link layer notifies us whenever ACKs open the window.
+        self.link_sender.set_window_open_callback(self.fill_window)
+
+        # Initial Kickstart: send the first window
+        self.event_manager.schedule(0.0, self.fill_window)
+
+        # Limit simulation to avoid infinite loops (e.g., if Goodput is 0)
+        self.max_sim_time = config.MAX_SIM_TIME if max_sim_time is None else max_sim_time
+
+        # Steady-state mode: goodput sampled at batch boundaries of simulated time
+        if config.STEADY_STATE if steady_state is None else steady_state:
+            self.batch_means = BatchMeans(config.WARMUP_TIME, config.BATCH_TIME)
+        else:
+            self.batch_means = None
+        self.stopped_early = False
+        self.finished = False   # A stop condition was reached
+        self.closed = False
+
+        # Frame trains may only run ahead in place while the loop below would go on
+        self.event_manager.stop_condition = self._should_stop
+
+    def set_trace(self, trace):
+        """
+        Records the rest of the run into 'trace' (a TraceRecorder, or None
+        to stop tracing). Forks and restored snapshots carry a detached,
+        in-memory copy of the original trace; give them their own file here.
+        """
+        self.trace = trace
+        self.physical_layer.trace = self.link_sender.trace = self.link_receiver.trace = trace
+
+    def fill_window(self):
+        # L = Payload Size (Frame Payload).
+        # Transport needs to fit into L - 24 bytes.
+        # So we ask Transport for segments that fit into 'payload_size' (which is L).
+        link_sender = self.link_sender
+
+        # As long as window is not full...
+        free = link_sender.send_base + link_sender.window_size - link_sender.next_seq_num
+        segments = []
+        while len(segments) < free:
+            segment = self.transport_sender.create_segments(max_payload_size=self.payload_size)
+            if segment is None:
+                break # No more data
+            segments.append(segment)
+
+        # All at once, so they leave as one frame train
+        if segments:
+            link_sender.send_segments(segments)
+
+    # ==========================
+    # RUNNING
+    # ==========================
+
+    def run(self, until=None):
+        """
+        Runs until a stop condition (transfer complete, time cap, steady-state
+        convergence) or, if 'until' is given, until the next event lies
+        beyond that simulated time. Returns True once the run is finished.
+        """
+        event_manager = self.event_manager
+        queue = event_manager.event_queue
+        app_receiver = self.app_receiver
+        batch_means = self.batch_means
+        self._set_advance_limit(until)
+
+        if until is None and batch_means is None and not self.finished:
+            # Plain run to completion: only the stop conditions to check per event
+            run_step = event_manager.run_step
+            is_finished = app_receiver.is_finished
+            max_sim_time = self.max_sim_time
+            while run_step():
+                if is_finished() or event_manager.current_time > max_sim_time:
+                    break
+            # A stop condition was reached or the queue ran dry
+            self.finished = True
+            return True
+
+        while queue and not self.finished:
+            if until is not None and queue.peek()[TIMESTAMP] > until:
+                break
+
+            bytes_before = app_receiver.bytes_received
+            event_manager.run_step()
+
+            if batch_means is not None and event_manager.current_time >= batch_means.next_boundary:
+                # Nothing ran between the previous event and the boundary, so the
+                # count before this step is the count at the boundary
+                while event_manager.current_time >= batch_means.next_boundary:
+                    batch_means.sample(bytes_before)
+                self._set_advance_limit(until)
+                # All-zero batches are not convergence: deliveries may just be rare
+                if (batch_means.batches.count >= config.MIN_BATCHES and batch_means.mean > 0 and
+                        batch_means.precision(config.STEADY_STATE_CONFIDENCE) <= config.STEADY_STATE_PRECISION):
+                    self.stopped_early = True
+                    self.finished = True
+
+            # Retransmission timers keep refilling the queue: stop conditions
+            if self._should_stop():
+                self.finished = True
+
+        if not queue:
+            self.finished = True
+        return self.finished
+
+    def close(self):
+        """
+        Releases the payload file (real-data mode) and flushes a file-backed
+        trace. Frames still in flight
+        are slices of the mapped file, so pending events and link buffers
+        are dropped first: a closed simulation cannot run any further, but
+        stats() still works and earlier snapshots stay valid (they reopen
+        the file by path).
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.finished = True
+        self.event_manager.event_queue = make_event_queue(config.EVENT_QUEUE)
+        self.event_manager.dead_events = 0
+        self.link_sender.drop_frames()
+        self.link_receiver.drop_frames()
+        self.source.close()
+        if self.trace is not None:
+            self.trace.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _should_stop(self):
+        return self.app_receiver.is_finished() or self.event_manager.current_time > self.max_sim_time
+
+    def _set_advance_limit(self, until):
+        """
+        Keeps in-handler clock advances (frame trains) from crossing a pause
+        point or a batch boundary, where run() must sample between events.
+        """
+        limit = math.inf if until is None else until
+        if self.batch_means is not None:
+            limit = min(limit, math.nextafter(self.batch_means.next_boundary, -math.inf))
+        self.event_manager.advance_limit = limit
+
+    # ==========================
+    # SNAPSHOT / FORK
+    # ==========================
+
+    def snapshot(self):
+        """
+        Compact serialisation (bytes) of the whole simulation state.
+        """
+        buffer = io.BytesIO()
+        _SnapshotPickler(buffer, pickle.HIGHEST_PROTOCOL).dump(self)
+        return buffer.getvalue()
+
+    @staticmethod
+    def restore(snapshot):
+        """
+        Simulation rebuilt from snapshot() bytes.
+        """
+        return pickle.loads(snapshot)
+
+    def fork(self, seed):
+        """
+        Independent copy of this simulation whose random streams continue
+        from 'seed' instead of their current state. Pre-generated channel
+        randomness is dropped; the channel state itself is kept.
+        """
+        sim = Simulation.restore(self.snapshot())
+        sim.reseed(seed)
+        return sim
+
+    def reseed(self, seed):
+        """
+        Restarts every random stream of the simulation from 'seed'.
+        """
+        self.streams = RngStreams(seed, self.window_size, self.payload_size, self.run_id)
+        physical = self.physical_layer
+        if physical.reverse_channel is physical.channel:
+            channels = {'channel': physical.channel}
+        else:
+            channels = {'channel_fwd': physical.channel, 'channel_rev': physical.reverse_channel}
+        for component, channel in channels.items():
+            channel.reset_stream(self.streams.generator(component))
+
+        if physical.reverse_transmitter is physical.transmitter:
+            transmitters = {'queue': physical.transmitter}
+        else:
+            transmitters = {'queue_fwd': physical.transmitter, 'queue_rev': physical.reverse_transmitter}
+        for component, transmitter in transmitters.items():
+            transmitter.rng = self.streams.generator(component)
+        self.seed = seed
+
+    # ==========================
+    # METRICS
+    # ==========================
+
+    def stats(self, engine_stats=False):
+        """
+        Stats dictionary (Goodput, etc.) of the run so far.
+        With engine_stats=True, it also carries simulator counters
+        ('events', 'frames') for benchmarking and the sender's sampled
+        (time, RTO) series ('rto_trajectory').
+        """
+        # --- Metrics Calculation [cite: 45-53] ---
+        link_sender = self.link_sender
+        sim_duration = self.event_manager.current_time
+        total_bytes = self.app_receiver.bytes_received
+
+        # Goodput (Mbps) = (Bits Delivered) / (Time in Seconds) / 10^6
+        goodput_mbps = (total_bytes * 8) / sim_duration / 1e6 if sim_duration > 0 else 0
+        if self.batch_means is not None and self.batch_means.batches.count:
+            # Steady-state estimate: warm-up excluded
+            goodput_mbps = self.batch_means.mean * 8 / 1e6
+
+        # YENİ: Detaylı Metrikler
+        # Retransmission: Sender Link Layer'dan alıyoruz
+        retransmissions = link_sender.total_retransmissions
+
+        # Avg RTT: Sender Link Layer'dan ortalama alıyoruz (streaming statistics)
+        rtt_stats = link_sender.rtt_stats
+        avg_rtt = rtt_stats.mean if rtt_stats.count else 0
+
+        # RTO: values taken after each update (the initial RTO if it never moved)
+        rto_stats = link_sender.rto_stats
+        rto_mean = rto_stats.mean if rto_stats.count else link_sender.current_rto
+        rto_max = rto_stats.max if rto_stats.count else link_sender.current_rto
+
+        # Buffer Events: Receiver Transport Layer'dan alıyoruz
+        buffer_events = self.transport_receiver.buffer_overflow_count
+
+        # Utilization: (Goodput / Capacity) * 100 basit bir yaklaşımdır.
+        # Kapasite 10 Mbps.
+        utilization = (goodput_mbps / 10.0) * 100
+
+        # Transmit queues: drops and occupancy
+        queues = self.physical_layer.queue_stats()
+
+        stats = {
+            'W': self.window_size,
+            'L': self.payload_size,
+            'run_id': self.run_id,
+            'goodput_mbps': goodput_mbps,
+            # Yeni sütunlar:
+            'retransmissions': retransmissions,
+            'avg_rtt': avg_rtt,
+            'utilization': utilization,
+            'buffer_events': buffer_events,
+            'duration': sim_duration,
+            'rtt_std': rtt_stats.std,
+            'rtt_p50': link_sender.rtt_p50.value(),
+            'rtt_p99': link_sender.rtt_p99.value(),
+            'rto_mean': rto_mean,
+            'rto_max': rto_max,
+            'queue_drops': sum(q['drops'] for q in queues.values()),
+            'queue_peak_bytes': max(q['peak_occupancy_bytes'] for q in queues.values()),
+            # Per-queue counters (not a CSV column)
+            'queues': queues,
+        }
+
+        if self.batch_means is not None:
+            stats['goodput_precision'] = self.batch_means.precision(config.STEADY_STATE_CONFIDENCE)
+            stats['stopped_early'] = self.stopped_early
+
+        if config.PAYLOAD_FILE:
+            stats['integrity_ok'] = self.app_receiver.integrity_ok()
+
+        if engine_stats:
+            stats['events'] = self.event_manager.events_executed
+            stats['frames'] = self.physical_layer.frames_transmitted
+            stats['rto_trajectory'] = list(link_sender.rto_trajectory.points)
+
+        if self.profile:
+            stats['profile'] = self.event_manager.profile_report()
+
+        return stats
+
+
+def _run_fork(snapshot, seed, engine_stats):
+    with Simulation.restore(snapshot) as sim:
+        sim.reseed(seed)
+        sim.run()
+        return sim.stats(engine_stats=engine_stats)
+
+
+def run_forked(window_size, payload_size, seed, run_id, warmup_until, fork_seeds, workers=None,
+               engine_stats=False, **kwargs):
+    """
+    Runs one simulation up to 'warmup_until' simulated seconds, then one
+    continuation per seed in fork_seeds over a process pool (workers=1:
+    in this process). Returns the continuations' stats, in fork_seeds order.
+    The continuations share the warm-up, so they are not independent
+    replications of the whole run.
+    """
+    with Simulation(window_size, payload_size, seed, run_id, **kwargs) as sim:
+        sim.run(until=warmup_until)
+        snapshot = sim.snapshot()
+
+    tasks = [(snapshot, fork_seed, engine_stats) for fork_seed in fork_seeds]
+    if workers == 1:
+        return [_run_fork(*task) for task in tasks]
+    with Pool(processes=workers) as pool:
+        return pool.starmap(_run_fork, tasks)
@@ -0,0 +1,281 @@
+# src/stats.py
+"""
+Constant-memory streaming statistics for long simulation runs,
+plus confidence intervals over replications.
+"""
+import math
+from statistics import NormalDist
+
+# Degrees of freedom up to which t_quantile solves the exact CDF
+EXACT_T_DF = 30
+
+
+class RunningStats:
+    """
+    Count, mean, variance, min and max of a stream (Welford's algorithm).
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def push(self, x):
+        self.count = count = self.count + 1
+        mean = self.mean
+        delta = x - mean
+        self.mean = mean = mean + delta / count
+        self._m2 += delta * (x - mean)
+        if count == 1:
+            self.min = self.max = x
+        elif x < self.min:
+            self.min = x
+        elif x > self.max:
+            self.max = x
+
+    @property
+    def variance(self):
+        """
+        Sample variance (0 with fewer than two values).
+        """
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """
+    Streaming estimate of the p-quantile in five markers
+    (P-square algorithm, Jain & Chlamtac, CACM 1985).
+    """
+    def __init__(self, p):
+        self.p = p
+        self._initial = []  # First five values, until the markers exist
+        self._heights = None
+        self._positions = None
+        self._extra = 0     # Values pushed after the first five
+        # Desired marker positions grow linearly: start + extra * increment
+        self._desired_start = (0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0)
+        self._increments = (0.0, p / 2, p, (1 + p) / 2, 1.0)
+
+    def push(self, x):
+        q = self._heights
+        if q is None:
+            self._initial.append(x)
+            if len(self._initial) == 5:
+                self._initial.sort()
+                self._heights = self._initial
+                self._positions = [0, 1, 2, 3, 4]
+            return
+
+        n = self._positions
+
+        # 1. Find the cell holding x, extending the extremes if needed,
+        #    and shift the markers above it
+        if x < q[1]:
+            if x < q[0]:
+                q[0] = x
+            n[1] += 1
+            n[2] += 1
+            n[3] += 1
+        elif x < q[2]:
+            n[2] += 1
+            n[3] += 1
+        elif x < q[3]:
+            n[3] += 1
+        elif x >= q[4]:
+            q[4] = x
+        n[4] += 1
+        self._extra = extra = self._extra + 1
+
+        # 2. Move the middle markers towards their desired positions
+        desired_start = self._desired_start
+        increments = self._increments
+        for i in (1, 2, 3):
+            n_i = n[i]
+            d = desired_start[i] + extra * increments[i] - n_i
+            if d >= 1:
+                if n[i + 1] - n_i <= 1:
+                    continue
+                d = 1
+            elif d <= -1:
+                if n[i - 1] - n_i >= -1:
+                    continue
+                d = -1
+            else:
+                continue
+            n_below, n_above = n[i - 1], n[i + 1]
+            q_below, q_i, q_above = q[i - 1], q[i], q[i + 1]
+            candidate = q_i + d / (n_above - n_below) * (
+                (n_i - n_below + d) * (q_above - q_i) / (n_above - n_i)
+                + (n_above - n_i - d) * (q_i - q_below) / (n_i - n_below)
+            )
+            if not q_below < candidate < q_above:
+                # Parabolic step would break monotonicity: step linearly
+                candidate = q_i + d * (q[i + d] - q_i) / (n[i + d] - n_i)
+            q[i] = candidate
+            n[i] = n_i + d
+
+    def value(self):
+        """
+        Current estimate (exact below five values, 0.0 for an empty stream).
+        """
+        if self._heights is not None:
+            return self._heights[2]
+        if not self._initial:
+            return 0.0
+        ordered = sorted(self._initial)
+        return ordered[round(self.p * (len(ordered) - 1))]
+
+
+class Trajectory:
+    """
+    Fixed-size record of a (time, value) series over a whole run.
+    Keeps every 'stride'-th point; when the buffer fills up, every other
+    point is dropped and the stride doubles, so the whole run stays
+    covered at a resolution that degrades gracefully.
+    """
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.points = []
+        self._stride = 1
+        self._seen = 0
+
+    def push(self, time, value):
+        seen = self._seen
+        self._seen = seen + 1
+        if seen % self._stride == 0:
+            points = self.points
+            if len(points) == self.capacity:
+                del points[1::2]
+                self._stride *= 2
+                if seen % self._stride:
+                    return
+            points.append((time, value))
+
+
+def _t_cdf(t, df):
+    """
+    P(T <= t) for Student's t with an integer number of degrees of freedom,
+    from the finite series in cos(theta), theta = atan(t / sqrt(df))
+    (Abramowitz & Stegun 26.7.3 and 26.7.4).
+    """
+    theta = math.atan(t / math.sqrt(df))
+    sin, cos = math.sin(theta), math.cos(theta)
+    c2 = cos * cos
+    term = total = 1.0
+    if df % 2:
+        for k in range(1, (df - 1) // 2):
+            term *= c2 * (2 * k) / (2 * k + 1)
+            total += term
+        a = 2 / math.pi * (theta + (sin * cos * total if df > 1 else 0.0))
+    else:
+        for k in range(1, df // 2):
+            term *= c2 * (2 * k - 1) / (2 * k)
+            total += term
+        a = sin * total
+    return (1 + a) / 2
+
+
+def t_quantile(p, df):
+    """
+    p-quantile of Student's t distribution with df degrees of freedom.
+    Closed forms for df <= 2. Up to EXACT_T_DF, the Cornish-Fisher
+    expansion around the normal quantile is refined by Newton steps on
+    the exact CDF (|error| < 1e-10); beyond, the expansion alone is used
+    (|error| < 1e-6 for 0.005 <= p <= 0.995).
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+
+    z = NormalDist().inv_cdf(p)
+    z2 = z * z
+    t = (z
+         + z * (z2 + 1) / (4 * df)
+         + z * ((5 * z2 + 16) * z2 + 3) / (96 * df ** 2)
+         + z * (((3 * z2 + 19) * z2 + 17) * z2 - 15) / (384 * df ** 3)
+         + z * ((((79 * z2 + 776) * z2 + 1482) * z2 - 1920) * z2 - 945) / (92160 * df ** 4))
+    if df > EXACT_T_DF:
+        return t
+
+    # Newton on the CDF: the expansion is close enough (< 0.05 off at df = 3) to converge in a few steps
+    log_density_scale = math.lgamma((df + 1) / 2) - math.lgamma(df / 2) - 0.5 * math.log(df * math.pi)
+    for _ in range(20):
+        density = math.exp(log_density_scale - (df + 1) / 2 * math.log1p(t * t / df))
+        step = (_t_cdf(t, df) - p) / density
+        t -= step
+        if abs(step) <= 1e-13 * max(1.0, abs(t)):
+            break
+    return t
+
+
+def confidence_interval(values, confidence=0.95):
+    """
+    (mean, half-width) of the Student-t confidence interval of the mean.
+    The half-width is infinite with fewer than two values.
+    """
+    stats = RunningStats()
+    for x in values:
+        stats.push(x)
+    return stats.mean, _half_width(stats, confidence)
+
+
+def _half_width(stats, confidence):
+    if stats.count < 2:
+        return math.inf
+    t = t_quantile(0.5 + confidence / 2, stats.count - 1)
+    return t * stats.std / math.sqrt(stats.count)
+
+
+def relative_half_width(mean, half_width):
+    """
+    Half-width relative to |mean| (0 for an exact zero, inf if undefined).
+    """
+    if half_width == 0:
+        return 0.0
+    if mean == 0:
+        return math.inf
+    return half_width / abs(mean)
+
+
+class BatchMeans:
+    """
+    Steady-state rate estimate by the method of batch means.
+
+    A cumulative counter (e.g. bytes delivered) is sampled over simulated
+    time; everything before 'warmup' is discarded and the rest is cut into
+    batches 'batch_time' seconds long. The batch rates are treated as
+    roughly independent samples of the steady-state rate.
+    """
+    def __init__(self, warmup, batch_time):
+        self.batch_time = batch_time
+        self.next_boundary = warmup  # Simulated time of the next sample
+        self.batches = RunningStats()
+        self._start_count = None     # Counter value at the start of the batch
+
+    def sample(self, count):
+        """
+        Records the counter value at next_boundary and moves to the next one.
+        """
+        if self._start_count is not None:
+            self.batches.push((count - self._start_count) / self.batch_time)
+        self._start_count = count
+        self.next_boundary += self.batch_time
+
+    @property
+    def mean(self):
+        return self.batches.mean
+
+    def half_width(self, confidence=0.95):
+        return _half_width(self.batches, confidence)
+
+    def precision(self, confidence=0.95):
+        """
+        Half-width of the confidence interval relative to the mean.
+        """
+        return relative_half_width(self.batches.mean, self.half_width(confidence))
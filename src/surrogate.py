@@ -0,0 +1,212 @@
+# src/surrogate.py
+"""
+Surrogate-guided search for the (W, L) point with the best goodput.
+
+A Gaussian process over (log2 W, log2 L) models mean goodput. Results
+already in results/*.csv enter as a prior: the same data with extra
+noise, since they may come from older versions of the simulator. Each
+round picks the candidates with the highest upper confidence bound
+(GP-UCB), runs them and refits. Rounds go through run_sweep, so the
+history CSV has the usual schema and an interrupted search resumes.
+"""
+import glob
+import os
+
+import numpy as np
+
+from src.sweep import load_completed, load_goodputs, make_seed, run_sweep
+
+# Candidate grid, roughly geometric (half steps between powers of two)
+DEFAULT_W_VALUES = [1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64, 96, 128, 192, 256]
+DEFAULT_L_VALUES = [128, 192, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096]
+
+# Length scales tried when fitting, in log2 units (octaves of W and of L)
+LENGTH_SCALES = (0.5, 1.0, 2.0, 4.0)
+
+
+class GaussianProcess:
+    """
+    GP regression with a squared-exponential kernel and a known noise
+    variance per observation. Targets are standardised internally; the
+    length scales are picked from LENGTH_SCALES by marginal likelihood.
+    """
+    def __init__(self):
+        self.length_scale = None
+        self._x = None
+        self._chol = None
+        self._alpha = None
+        self._y_mean = 0.0
+        self._y_std = 1.0
+
+    @staticmethod
+    def _kernel(a, b, length_scale):
+        d = (a[:, None, :] - b[None, :, :]) / length_scale
+        return np.exp(-0.5 * np.sum(d * d, axis=-1))
+
+    def _factor(self, x, y, noise, length_scale):
+        """
+        (cholesky factor, alpha, log marginal likelihood) for one length scale.
+        """
+        k = self._kernel(x, x, length_scale) + np.diag(noise)
+        chol = np.linalg.cholesky(k + 1e-9 * np.eye(len(x)))
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, y))
+        lml = -0.5 * y @ alpha - np.sum(np.log(np.diag(chol)))
+        return chol, alpha, lml
+
+    def fit(self, x, y, noise):
+        """
+        x: (n, d) inputs, y: (n,) targets, noise: (n,) noise variances.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self._y_mean = y.mean()
+        self._y_std = y.std() or 1.0
+        y = (y - self._y_mean) / self._y_std
+        noise = np.asarray(noise, dtype=float) / self._y_std ** 2
+
+        best = None
+        for lw in LENGTH_SCALES:
+            for ll in LENGTH_SCALES:
+                length_scale = np.array([lw, ll])
+                chol, alpha, lml = self._factor(x, y, noise, length_scale)
+                if best is None or lml > best[0]:
+                    best = (lml, length_scale, chol, alpha)
+
+        _, self.length_scale, self._chol, self._alpha = best
+        self._x = x
+        return self
+
+    def predict(self, x):
+        """
+        Posterior mean and standard deviation of the latent goodput at x.
+        """
+        x = np.asarray(x, dtype=float)
+        k_star = self._kernel(x, self._x, self.length_scale)
+        mean = k_star @ self._alpha
+        v = np.linalg.solve(self._chol, k_star.T)
+        var = np.clip(1.0 - np.sum(v * v, axis=0), 1e-12, None)
+        return mean * self._y_std + self._y_mean, np.sqrt(var) * self._y_std
+
+
+def _features(cells):
+    return np.log2(np.array(cells, dtype=float))
+
+
+def _load_prior(paths):
+    """
+    {(W, L): [goodput_mbps, ...]} over all the given CSVs.
+    """
+    cells = {}
+    for path in paths:
+        for cell, values in load_goodputs(path).items():
+            cells.setdefault(cell, []).extend(values)
+    return cells
+
+
+def _observations(history, prior, prior_noise):
+    """
+    Cell means with their noise variances. Run-to-run variance is pooled
+    over cells with several runs; prior cells get an extra prior_noise
+    (relative to the spread of all means) on top.
+    """
+    all_cells = {**prior, **history}
+    within = [np.var(v, ddof=1) for v in all_cells.values() if len(v) > 1]
+    means = [np.mean(v) for v in all_cells.values()]
+    spread = np.var(means) if len(means) > 1 else 1.0
+    run_var = np.mean(within) if within else 0.1 * spread
+
+    cells, y, noise = [], [], []
+    for source, extra in ((history, 0.0), (prior, prior_noise ** 2 * spread)):
+        for cell, values in source.items():
+            cells.append(cell)
+            y.append(np.mean(values))
+            noise.append(run_var / len(values) + extra + 1e-6 * spread)
+    return cells, y, noise
+
+
+def _next_run_ids(csv_path):
+    """
+    {(W, L): first free run_id}, one past the largest already on disk, so
+    that a cell with gaps in its run_ids never gets a run it already has.
+    """
+    next_ids = {}
+    for W, L, seed in load_completed(csv_path):
+        run_id = seed - make_seed(W, L, 0)
+        next_ids[(W, L)] = max(next_ids.get((W, L), 0), run_id + 1)
+    return next_ids
+
+
+def optimize(simulate, csv_path, fieldnames, budget=30, batch_size=1, w_values=None, l_values=None,
+             prior_paths=None, prior_noise=0.5, kappa=2.0, workers=None):
+    """
+    Spends 'budget' simulations looking for the best mean goodput.
+
+    History rows (same schema as the sweep) go to csv_path; rows already
+    there count as history, so a search can be resumed or extended.
+    prior_paths: CSVs or stores used as a noisy prior (default: results/*.csv and *.store).
+    Each round runs 'batch_size' points: the UCB maximiser, then the next
+    ones chosen as if the earlier picks had returned the predicted mean.
+    Returns the best evaluated cell as a dict.
+    """
+    w_values = w_values or DEFAULT_W_VALUES
+    l_values = l_values or DEFAULT_L_VALUES
+    candidates = [(W, L) for W in w_values for L in l_values]
+    candidate_x = _features(candidates)
+
+    if prior_paths is None:
+        prior_paths = sorted(glob.glob(os.path.join('results', '*.csv')) +
+                             glob.glob(os.path.join('results', '*.store')))
+    prior_paths = [p for p in prior_paths if os.path.abspath(p) != os.path.abspath(csv_path)]
+    prior = _load_prior(prior_paths)
+
+    history = load_goodputs(csv_path)
+    spent = sum(len(v) for v in history.values())
+    while spent < budget:
+        picks = []
+        cells, y, noise = _observations(history, prior, prior_noise)
+        if not cells:
+            # Nothing known yet: start from the corners and the centre of the grid
+            picks = [(w_values[0], l_values[0]), (w_values[-1], l_values[-1]),
+                     (w_values[0], l_values[-1]), (w_values[-1], l_values[0]),
+                     (w_values[len(w_values) // 2], l_values[len(l_values) // 2])]
+        else:
+            for _ in range(min(batch_size, budget - spent)):
+                gp = GaussianProcess().fit(_features(cells), y, noise)
+                mean, std = gp.predict(candidate_x)
+                best = int(np.argmax(mean + kappa * std))
+                picks.append(candidates[best])
+                # Kriging believer: pretend the pick returned the predicted mean
+                cells, y, noise = cells + [candidates[best]], y + [mean[best]], noise + [min(noise)]
+
+        picks = picks[:budget - spent]
+        next_ids = _next_run_ids(csv_path)
+        tasks = []
+        for W, L in picks:
+            run_id = next_ids.get((W, L), 0)
+            next_ids[(W, L)] = run_id + 1
+            tasks.append((W, L, make_seed(W, L, run_id), run_id))
+
+        if not run_sweep(simulate, tasks, csv_path, fieldnames, workers=workers, resume=True, reorder=False):
+            break   # Nothing new was run: the history cannot grow any further
+        history = load_goodputs(csv_path)
+        spent = sum(len(v) for v in history.values())
+
+    if not history:
+        return None
+
+    # Best evaluated cell by posterior mean: less fooled by one lucky run than the raw maximum
+    cells, y, noise = _observations(history, prior, prior_noise)
+    gp = GaussianProcess().fit(_features(cells), y, noise)
+    evaluated = sorted(history)
+    mean, std = gp.predict(_features(evaluated))
+    best = int(np.argmax(mean))
+    W, L = evaluated[best]
+    return {
+        'W': W,
+        'L': L,
+        'predicted_goodput_mbps': float(mean[best]),
+        'predicted_std': float(std[best]),
+        'runs': len(history[(W, L)]),
+        'mean_goodput_mbps': float(np.mean(history[(W, L)])),
+        'simulations': spent,
+    }
@@ -0,0 +1,359 @@
+# src/sweep.py
+import contextlib
+import csv
+import math
+import os
+import shutil
+from multiprocessing import Pool
+
+import numpy as np
+
+from src.results_store import ResultsStore, is_store
+from src.stats import confidence_interval, relative_half_width
+
+
+def make_seed(window_size, payload_size, run_id):
+    """
+    Deterministic seed for one (W, L, run_id) cell replication.
+    """
+    return (window_size * 10000) + (payload_size * 100) + run_id
+
+
+def build_grid(w_values, l_values, runs_per_config):
+    """
+    Expands the W x L x run_id grid into (W, L, seed, run_id) tasks,
+    in the same order as the original nested loops.
+    """
+    tasks = []
+    for W in w_values:
+        for L in l_values:
+            for run_id in range(runs_per_config):
+                tasks.append((W, L, make_seed(W, L, run_id), run_id))
+    return tasks
+
+
+def _row_key(row):
+    """
+    (W, L, seed) key of a CSV row. The seed is not stored in the CSV,
+    but it is fully determined by (W, L, run_id).
+    """
+    W, L, run_id = int(row['W']), int(row['L']), int(row['run_id'])
+    return (W, L, make_seed(W, L, run_id))
+
+
+def _repair_tail(csv_path):
+    """
+    Drops a half-written last line (crash in the middle of a write),
+    so that appended rows start on a fresh line.
+    """
+    with open(csv_path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def _store_cells(store_path, value_column):
+    """
+    Zips the W, L, run_id and value_column columns of a results store
+    (empty if the store does not exist yet).
+    """
+    store = ResultsStore(store_path)
+    if store.meta is None:
+        return iter(())
+    data = store.read(['W', 'L', 'run_id', value_column])
+    return zip(*(data[name].tolist() for name in ('W', 'L', 'run_id', value_column)))
+
+
+def load_completed(csv_path):
+    """
+    Returns the set of (W, L, seed) tuples already present in csv_path
+    (a CSV or a results store).
+    """
+    if is_store(csv_path):
+        return {(W, L, make_seed(W, L, run_id)) for W, L, run_id, _ in _store_cells(csv_path, 'run_id')}
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        return set()
+
+    _repair_tail(csv_path)
+    done = set()
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                done.add(_row_key(row))
+            except (KeyError, TypeError, ValueError):
+                continue  # Malformed row, it will simply be recomputed
+    return done
+
+
+def load_goodputs(csv_path):
+    """
+    Returns {(W, L): [goodput_mbps, ...]} for the rows already in csv_path
+    (a CSV or a results store).
+    """
+    cells = {}
+    if is_store(csv_path):
+        for W, L, _, goodput in _store_cells(csv_path, 'goodput_mbps'):
+            cells.setdefault((W, L), []).append(goodput)
+        return cells
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        return cells
+
+    _repair_tail(csv_path)
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                cell = (int(row['W']), int(row['L']))
+                cells.setdefault(cell, []).append(float(row['goodput_mbps']))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return cells
+
+
+def _reorder(csv_path, tasks, fieldnames):
+    """
+    Rewrites csv_path so that rows follow the grid order of 'tasks'.
+    Workers finish out of order; this makes the final file identical
+    to the one a serial run would produce.
+    """
+    order = {(W, L, seed): i for i, (W, L, seed, _) in enumerate(tasks)}
+    if is_store(csv_path):
+        store = ResultsStore(csv_path)
+        keys = zip(*(store.column(name).tolist() for name in ('W', 'L', 'run_id')))
+        position = np.array([order.get((W, L, make_seed(W, L, run_id)), len(order)) for W, L, run_id in keys])
+        store.compact(order=np.argsort(position, kind='stable'))
+        return
+
+    with open(csv_path, newline='') as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+        # The file's own columns: a resumed file may carry more than 'fieldnames'
+        fieldnames = reader.fieldnames or fieldnames
+
+    # Rows that do not belong to this grid keep their place at the end
+    rows.sort(key=lambda row: order.get(_row_key(row), len(order)))
+    _write_csv(csv_path, fieldnames, rows)
+
+
+def _write_csv(csv_path, fieldnames, rows):
+    """
+    Replaces csv_path with 'rows' under a 'fieldnames' header (missing values left empty).
+    """
+    tmp_path = csv_path + '.tmp'
+    with open(tmp_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, csv_path)
+
+
+def _resume_columns(csv_path, fieldnames):
+    """
+    Columns to append under in an existing csv_path. A file written with
+    fewer columns (e.g. by an older version, before new metrics were added)
+    is rewritten once with the union of both headers, the new columns left
+    empty in its old rows, so every line keeps matching the header.
+    """
+    _repair_tail(csv_path)
+    with open(csv_path, newline='') as f:
+        reader = csv.DictReader(f)
+        header = reader.fieldnames or []
+        missing = [name for name in fieldnames if name not in header]
+        if not missing:
+            return header
+        rows = list(reader)
+
+    if any(None in row for row in rows):
+        raise ValueError(f"{csv_path}: rows do not match the header; fix or remove the file before resuming")
+    columns = header + missing
+    _write_csv(csv_path, columns, rows)
+    print(f"{csv_path}: added columns {', '.join(missing)} to the existing file")
+    return columns
+
+
+# Set once per worker process by the Pool initializer
+_simulate = None
+
+
+def _init_worker(simulate):
+    global _simulate
+    _simulate = simulate
+
+
+def _run_task(task):
+    W, L, seed, run_id = task
+    return _simulate(W, L, seed, run_id)
+
+
+@contextlib.contextmanager
+def _open_results(path, fieldnames, resume):
+    """
+    Yields write(row) for 'path': a CSV (one flushed line per row) or a
+    results store (one chunk per row, plus a 'seed' column, merged into a
+    single chunk when the session ends).
+    """
+    if is_store(path):
+        if not resume and os.path.isdir(path):
+            shutil.rmtree(path)
+        # Every row is a finished simulation: none may wait in a buffer
+        store = ResultsStore(path, chunk_rows=1).open_session(fieldnames)
+
+        def write(row):
+            store.append({**row, 'seed': make_seed(row['W'], row['L'], row['run_id'])})
+        try:
+            yield write
+        finally:
+            store.compact()
+        return
+
+    append = resume and os.path.exists(path) and os.path.getsize(path) > 0
+    if append:
+        fieldnames = _resume_columns(path, fieldnames)
+    with open(path, 'a' if append else 'w', newline='') as csvfile:
+        # Optional extras (profile, integrity flag) are not CSV columns
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+        if not append:
+            writer.writeheader()
+            csvfile.flush()
+
+        def write(row):
+            writer.writerow(row)
+            csvfile.flush()
+        yield write
+
+
+def run_sweep(simulate, tasks, csv_path, fieldnames, workers=None, resume=True, reorder=True):
+    """
+    Runs simulate(W, L, seed, run_id) for every task over a process pool.
+
+    - Each finished row is appended (and flushed) to csv_path immediately;
+      a csv_path ending in .store is a columnar results store instead,
+      where each row is written as a chunk and the chunks are merged at
+      the end (see src/results_store.py).
+    - With resume=True, tasks whose (W, L, seed) is already on disk are skipped.
+    - When all tasks are done the file is put back into grid order
+      (unless reorder=False).
+
+    workers=1 runs everything in the current process.
+    Returns the number of simulations executed in this call.
+    """
+    done = load_completed(csv_path) if resume else set()
+    pending = [t for t in tasks if (t[0], t[1], t[2]) not in done]
+
+    total_sims = len(tasks)
+    current_sim = total_sims - len(pending)
+    if current_sim:
+        print(f"Resuming: {current_sim}/{total_sims} simulations already in {csv_path}")
+
+    with _open_results(csv_path, fieldnames, resume) as write:
+        if workers == 1:
+            _init_worker(simulate)
+            results = map(_run_task, pending)
+            pool = None
+        else:
+            pool = Pool(processes=workers, initializer=_init_worker, initargs=(simulate,))
+            results = pool.imap_unordered(_run_task, pending)
+
+        try:
+            for stats in results:
+                write(stats)
+
+                current_sim += 1
+                print(f"[{current_sim}/{total_sims}] W={stats['W']}, L={stats['L']} -> Goodput={stats['goodput_mbps']:.3f} Mbps")
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    if reorder:
+        _reorder(csv_path, tasks, fieldnames)
+    return len(pending)
+
+
+SUMMARY_FIELDNAMES = ['W', 'L', 'runs', 'goodput_mean', 'goodput_ci_low', 'goodput_ci_high',
+                      'rel_half_width', 'converged']
+
+
+def _cell_tasks(cells, runs):
+    """
+    (W, L, seed, run_id) tasks for runs[cell] replications of each cell, in grid order.
+    """
+    return [(W, L, make_seed(W, L, run_id), run_id)
+            for (W, L) in cells for run_id in range(runs[(W, L)])]
+
+
+def _runs_needed(n, rel, target, max_runs):
+    """
+    Replications a cell needs to reach 'target', extrapolated from the
+    current n and relative half-width (the half-width shrinks as 1/sqrt(n)).
+    """
+    if math.isinf(rel):
+        return max_runs
+    return min(max_runs, max(n + 1, math.ceil(n * (rel / target) ** 2)))
+
+
+def run_adaptive_sweep(simulate, w_values, l_values, csv_path, fieldnames, summary_path,
+                       min_runs=5, max_runs=30, target=0.05, confidence=0.95,
+                       workers=None, resume=True):
+    """
+    Sweep where each (W, L) cell gets only as many replications as it needs.
+
+    Every cell first runs min_runs seeds. After each round, cells whose
+    goodput confidence interval is still wider than 'target' (half-width
+    relative to the mean) get extra seeds, up to max_runs, sized from the
+    current variance estimate. Rounds run over the process pool like
+    run_sweep, so the per-run CSV stays resumable.
+
+    The per-cell interval is written to summary_path.
+    Returns {(W, L): (runs, mean, half_width)}.
+    """
+    cells = [(W, L) for W in w_values for L in l_values]
+    planned = {cell: min_runs for cell in cells}
+
+    if resume:
+        # Cells that already have more runs on disk keep them
+        for cell, values in load_goodputs(csv_path).items():
+            if cell in planned:
+                planned[cell] = min(max(planned[cell], len(values)), max_runs)
+
+    fresh = not resume
+    round_id = 0
+    while True:
+        tasks = _cell_tasks(cells, planned)
+        round_id += 1
+        print(f"Adaptive round {round_id}: {len(tasks)} runs over {len(cells)} cells")
+        run_sweep(simulate, tasks, csv_path, fieldnames, workers=workers,
+                  resume=not fresh, reorder=False)
+        fresh = False
+
+        goodputs = load_goodputs(csv_path)
+        results = {}
+        grow = False
+        for cell in cells:
+            values = goodputs.get(cell, [])
+            mean, half_width = confidence_interval(values, confidence)
+            results[cell] = (len(values), mean, half_width)
+
+            rel = relative_half_width(mean, half_width)
+            if rel > target and planned[cell] < max_runs:
+                planned[cell] = _runs_needed(len(values), rel, target, max_runs)
+                grow = True
+        if not grow:
+            break
+
+    _reorder(csv_path, _cell_tasks(cells, planned), fieldnames)
+
+    with open(summary_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDNAMES)
+        writer.writeheader()
+        for (W, L), (n, mean, half_width) in results.items():
+            writer.writerow({
+                'W': W,
+                'L': L,
+                'runs': n,
+                'goodput_mean': mean,
+                'goodput_ci_low': mean - half_width,
+                'goodput_ci_high': mean + half_width,
+                'rel_half_width': relative_half_width(mean, half_width),
+                'converged': relative_half_width(mean, half_width) <= target,
+            })
+    return results
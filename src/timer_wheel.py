@@ -0,0 +1,193 @@
+# src/timer_wheel.py
+from itertools import islice
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel for ARQ retransmission timers.
+
+    Timers are keyed (e.g. by sequence number) and kept in 'levels' wheels
+    of 'slots' slots each. Level 0 slots are 'tick' seconds wide, level k
+    slots are tick * slots^k wide; timers beyond the last level wait in an
+    overflow dict. Slots are dicts {key: (deadline, seq)}, so arm, re-arm
+    and cancel are all O(1) and a canceled timer leaves nothing behind.
+
+    The wheel keeps a 'driver' event on the EventManager at the exact
+    deadline of its earliest timer. When it fires, every timer due at
+    that instant is passed to callback(keys) in one batch, in deadline
+    (tie-break) order. Each timer reserves its EventManager tie-break
+    number when armed, so timers expire at exactly the same point in the
+    event order as per-timer events would.
+    A driver belongs to one timer: when that timer is canceled or re-armed
+    the driver is canceled too (and a new one placed at the next deadline
+    if needed), so the main queue never runs a driver with nothing to
+    expire. A driver's (deadline, seq) is never reused once canceled.
+    """
+    def __init__(self, event_manager, callback, tick=0.001, slots=256, levels=3):
+        self.event_manager = event_manager
+        self.callback = callback
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._counts = [0] * levels
+        self._overflow = {}
+        self._timers = {}       # key -> (level, slot dict); level -1 is the overflow
+        self._now_tick = 0      # Tick the wheel has advanced to
+
+        self._drivers = {}      # (deadline, seq) -> pending driver event
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    # --- Placement ---
+
+    def _place(self, key, deadline):
+        t = int(deadline[0] / self.tick)
+        now = self._now_tick
+        slots = self.slots
+        span = 1
+        for level in range(self.levels):
+            if t // (span * slots) == now // (span * slots):
+                slot = self._wheels[level][(t // span) % slots]
+                self._counts[level] += 1
+                break
+            span *= slots
+        else:
+            level = -1
+            slot = self._overflow
+
+        slot[key] = deadline
+        self._timers[key] = (level, slot)
+
+    def _remove(self, key):
+        level, slot = self._timers.pop(key)
+        deadline = slot.pop(key)
+        if level >= 0:
+            self._counts[level] -= 1
+        return deadline
+
+    # --- Public API ---
+
+    def arm(self, key, delay):
+        """
+        Starts (or restarts) the timer 'key' to expire after 'delay' seconds.
+        """
+        removed = self._remove(key) if key in self._timers else None
+
+        deadline = (self.event_manager.current_time + delay, self.event_manager.reserve_seq())
+        self._place(key, deadline)
+
+        if removed in self._drivers:
+            self._retire_driver(removed)
+        # The old driver may have been a later one, so retiring it placed
+        # nothing: an earlier new deadline still needs its own driver
+        if deadline not in self._drivers and (not self._drivers or deadline < min(self._drivers)):
+            self._schedule_driver(deadline)
+
+    def cancel(self, key):
+        """
+        Stops the timer 'key' if it is running.
+        """
+        if key in self._timers:
+            deadline = self._remove(key)
+            if deadline in self._drivers:
+                self._retire_driver(deadline)
+
+    # --- Driver ---
+
+    def _schedule_driver(self, deadline):
+        self._drivers[deadline] = self.event_manager.schedule_at(deadline[0], self._fire, args=(deadline,),
+                                                                 seq=deadline[1])
+
+    def _retire_driver(self, deadline):
+        """
+        The timer of the driver at 'deadline' is gone: cancels that driver
+        and, if it was the earliest one, places one at the next deadline.
+        """
+        self.event_manager.cancel_event(self._drivers.pop(deadline))
+        if not self._timers:
+            return
+        if not self._drivers or deadline < min(self._drivers):
+            # Every timer of an earlier tick has expired already, so the
+            # wheel may catch up with the clock first (shorter scan)
+            now_tick = int(self.event_manager.current_time / self.tick)
+            if now_tick > self._now_tick:
+                self._advance(now_tick)
+            following = self._next_deadline()
+            if not self._drivers or following < min(self._drivers):
+                self._schedule_driver(following)
+
+    def _advance(self, target):
+        """
+        Moves the wheel to tick 'target', cascading higher levels down
+        whenever a slot boundary is crossed.
+        """
+        old = self._now_tick
+        self._now_tick = target
+        if target // self.slots == old // self.slots:
+            return
+
+        span = self.slots ** self.levels
+        if target // span != old // span and self._overflow:
+            pending = self._overflow
+            self._overflow = {}
+            for key, deadline in pending.items():
+                self._place(key, deadline)
+
+        for level in range(self.levels - 1, 0, -1):
+            span = self.slots ** level
+            if target // span == old // span or not self._counts[level]:
+                continue
+            index = (target // span) % self.slots
+            pending = self._wheels[level][index]
+            if not pending:
+                continue
+            self._wheels[level][index] = {}
+            self._counts[level] -= len(pending)
+            for key, deadline in pending.items():
+                self._place(key, deadline)
+
+    def _next_deadline(self):
+        """
+        (deadline, seq) of the earliest running timer, or None.
+        """
+        slots = self.slots
+        span = 1
+        for level in range(self.levels):
+            if self._counts[level]:
+                # First non-empty slot from the current one on, scanned in C
+                slot = next(filter(None, islice(self._wheels[level], (self._now_tick // span) % slots, None)), None)
+                if slot is not None:
+                    return min(slot.values())
+            span *= slots
+        if self._overflow:
+            return min(self._overflow.values())
+        return None
+
+    def _fire(self, driver_deadline):
+        del self._drivers[driver_deadline]
+        now = self.event_manager.current_time
+        self._advance(int(now / self.tick))
+
+        slot = self._wheels[0][self._now_tick % self.slots]
+        expired = [key for key, deadline in slot.items() if deadline[0] <= now]
+        expired.sort(key=slot.__getitem__)
+        for key in expired:
+            deadline = slot.pop(key)
+            del self._timers[key]
+            if deadline in self._drivers:
+                # Same instant, later tie-break: expires in this batch
+                self.event_manager.cancel_event(self._drivers.pop(deadline))
+        self._counts[0] -= len(expired)
+
+        deadline = self._next_deadline()
+        if deadline is not None and (not self._drivers or deadline < min(self._drivers)):
+            self._schedule_driver(deadline)
+
+        if expired:
+            self.callback(expired)
@@ -0,0 +1,190 @@
+# src/topology.py
+"""
+N sender/receiver flows contending for one shared link.
+
+Every flow is a full Application/Transport/Link stack pair; all of them
+transmit through one PhysicalLayer, so data frames of all flows queue on
+the same transmitter and see the same Gilbert-Elliot channel. Flows are
+driven only by their own events (window-open callbacks, timers): there
+is no per-flow polling, and the stop check is O(1) per event.
+
+Usage (from the project root):
+    python -m src.topology --flows 100 -W 16 -L 1024
+"""
+import argparse
+
+import config
+from src.event_manager import EventManager, make_event_queue
+from src.physical import make_physical_layer
+from src.link import LinkLayer
+from src.transport import TransportLayer
+from src.application import ApplicationLayer
+from src.payload import VirtualSource
+from src.rng import RngStreams
+
+
+def jain_fairness(values):
+    """
+    Jain's fairness index: 1 when all values are equal, 1/n when one takes everything.
+    """
+    total = sum(values)
+    squares = sum(x * x for x in values)
+    return total * total / (len(values) * squares) if squares else 1.0
+
+
+class Flow:
+    """
+    One sender/receiver stack pair over the shared physical layer.
+    """
+    def __init__(self, flow_id, physical_layer, event_manager, window_size, payload_size, source, on_finished):
+        self.flow_id = flow_id
+        self.payload_size = payload_size
+        self.event_manager = event_manager
+
+        self.app_sender = ApplicationLayer(role='SENDER', source=source)
+        self.app_receiver = ApplicationLayer(role='RECEIVER', source=source)
+        self.app_receiver.on_finished = self._finished
+        self._on_finished = on_finished
+
+        self.transport_sender = TransportLayer(self.app_sender)
+        self.transport_receiver = TransportLayer(self.app_receiver)
+
+        self.link_sender = LinkLayer(physical_layer, event_manager, self.transport_sender, window_size=window_size)
+        self.link_receiver = LinkLayer(physical_layer, event_manager, self.transport_receiver, window_size=window_size)
+        self.link_sender.set_peer_callback(self.link_receiver.receive_frame_from_physical)
+        self.link_receiver.set_peer_callback(self.link_sender.receive_frame_from_physical)
+        self.link_sender.set_window_open_callback(self.fill_window)
+
+        event_manager.schedule(0.0, self.fill_window)
+
+    def fill_window(self):
+        link_sender = self.link_sender
+        free = link_sender.send_base + link_sender.window_size - link_sender.next_seq_num
+        segments = []
+        while len(segments) < free:
+            segment = self.transport_sender.create_segments(max_payload_size=self.payload_size)
+            if segment is None:
+                break # No more data
+            segments.append(segment)
+        # All at once, so they leave as one frame train
+        if segments:
+            link_sender.send_segments(segments)
+
+    def _finished(self):
+        self.app_receiver.finish_time = self.event_manager.current_time
+        self._on_finished(self)
+
+    def stats(self, duration):
+        """
+        Per-flow metrics. A flow that finished is measured over its own
+        transfer time, one still running over the whole simulation.
+        """
+        elapsed = self.app_receiver.finish_time or duration
+        total_bytes = self.app_receiver.bytes_received
+        rtt_stats = self.link_sender.rtt_stats
+        return {
+            'flow': self.flow_id,
+            'goodput_mbps': (total_bytes * 8) / elapsed / 1e6 if elapsed > 0 else 0,
+            'bytes_received': total_bytes,
+            'finish_time': self.app_receiver.finish_time,
+            'retransmissions': self.link_sender.total_retransmissions,
+            'avg_rtt': rtt_stats.mean if rtt_stats.count else 0,
+        }
+
+
+class MultiFlowSimulation:
+    """
+    n_flows flows of bytes_per_flow bytes each (default FILE_SIZE_BYTES),
+    all with window W and payload size L, started together at t = 0.
+    Runs until every flow has finished or max_sim_time is passed.
+    """
+    def __init__(self, n_flows, window_size, payload_size, seed, run_id, bytes_per_flow=None,
+                 max_sim_time=None):
+        self.window_size = window_size
+        self.payload_size = payload_size
+        self.run_id = run_id
+        self.max_sim_time = config.MAX_SIM_TIME if max_sim_time is None else max_sim_time
+
+        self.streams = RngStreams(seed, window_size, payload_size, run_id)
+        self.event_manager = EventManager(make_event_queue(config.EVENT_QUEUE))
+
+        # One shared link: one transmitter and one channel per direction for all flows
+        self.physical_layer = make_physical_layer(self.event_manager, self.streams)
+
+        # Flows only read lengths from a virtual source, so they can share one
+        source = VirtualSource(config.FILE_SIZE_BYTES if bytes_per_flow is None else bytes_per_flow)
+        self.unfinished = n_flows
+        self.flows = [Flow(i, self.physical_layer, self.event_manager, window_size, payload_size,
+                           source, self._flow_finished)
+                      for i in range(n_flows)]
+
+        self.event_manager.stop_condition = self._should_stop
+
+    def _flow_finished(self, flow):
+        self.unfinished -= 1
+
+    def _should_stop(self):
+        return not self.unfinished or self.event_manager.current_time > self.max_sim_time
+
+    def run(self):
+        event_manager = self.event_manager
+        queue = event_manager.event_queue
+        while queue:
+            event_manager.run_step()
+            if self._should_stop():
+                break
+
+    def stats(self):
+        """
+        Aggregate goodput (all bytes delivered over the whole run), Jain
+        fairness of the per-flow goodputs, and the per-flow metrics.
+        """
+        duration = self.event_manager.current_time
+        flows = [flow.stats(duration) for flow in self.flows]
+        total_bytes = sum(f['bytes_received'] for f in flows)
+        return {
+            'W': self.window_size,
+            'L': self.payload_size,
+            'run_id': self.run_id,
+            'flows': len(flows),
+            'finished_flows': len(flows) - self.unfinished,
+            'aggregate_goodput_mbps': (total_bytes * 8) / duration / 1e6 if duration > 0 else 0,
+            'jain_fairness': jain_fairness([f['goodput_mbps'] for f in flows]),
+            'duration': duration,
+            'queues': self.physical_layer.queue_stats(),
+            'per_flow': flows,
+        }
+
+
+def run_multiflow(n_flows, window_size, payload_size, seed, run_id, bytes_per_flow=None, max_sim_time=None):
+    """
+    Runs one multi-flow simulation. Returns its stats dictionary.
+    """
+    simulation = MultiFlowSimulation(n_flows, window_size, payload_size, seed, run_id,
+                                     bytes_per_flow=bytes_per_flow, max_sim_time=max_sim_time)
+    simulation.run()
+    return simulation.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="N flows over one shared link")
+    parser.add_argument('--flows', type=int, default=10, help="Number of sender/receiver pairs")
+    parser.add_argument('-W', type=int, default=16, help="Window size of every flow")
+    parser.add_argument('-L', type=int, default=1024, help="Payload size of every flow")
+    parser.add_argument('--bytes-per-flow', type=int, default=1024 * 1024, help="Data each flow transfers")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--max-sim-time', type=float, default=None)
+    args = parser.parse_args()
+
+    stats = run_multiflow(args.flows, args.W, args.L, args.seed, 0, bytes_per_flow=args.bytes_per_flow,
+                          max_sim_time=args.max_sim_time)
+    for flow in stats['per_flow']:
+        finish = f"{flow['finish_time']:.2f} s" if flow['finish_time'] is not None else "unfinished"
+        print(f"flow {flow['flow']:4d}: {flow['goodput_mbps']:.4f} Mbps  retx={flow['retransmissions']}  {finish}")
+    print(f"{stats['finished_flows']}/{stats['flows']} flows finished in {stats['duration']:.2f} s, "
+          f"aggregate goodput {stats['aggregate_goodput_mbps']:.4f} Mbps, "
+          f"Jain fairness {stats['jain_fairness']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# src/trace.py
+"""
+Per-frame trace: a binary record of what happened to every frame.
+
+LinkLayer and PhysicalLayer carry a 'trace' attribute, None by default;
+every hook is guarded by 'if self.trace is not None', so a run without
+tracing pays one attribute test per hook and nothing else. When enabled,
+hooks write fixed-width records (TRACE_DTYPE) into a preallocated NumPy
+structured array:
+- without a path, it is a ring buffer holding the last 'capacity' records;
+- with a path, a full buffer is flushed to the end of that file through
+  np.memmap, so the file holds the complete trace.
+
+Events (seq is the link sequence number; for ACK/SACK frames the seq
+they acknowledge, or that triggered them):
+    send        first transmission handed down by the sender's link layer
+    retransmit  a retransmission timer expired for this frame
+    tx          DATA frame accepted by the transmitter (corrupted, state:
+                channel outcome and Gilbert-Elliot state after the frame)
+    tx_ack      same for an ACK/SACK frame
+    queue_drop  DATA frame dropped at the transmit queue
+    queue_drop_ack  same for an ACK/SACK frame
+    rx          DATA frame reaching the receiver's link layer
+    rx_ack      ACK/SACK frame reaching the sender's link layer
+    buffered    DATA frame stored in the receive window
+    delivered   payload handed to the transport layer, in order
+    acked       frame acknowledged at the sender
+'state' is -1 where no channel is involved.
+
+Usage (from the project root):
+    python -m src.trace run -W 8 -L 1024 --max-sim-time 20 --out results/w8.trace
+    python -m src.trace analyze results/w8.trace [--seq 42]
+"""
+import argparse
+import os
+
+import numpy as np
+
+TRACE_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('event', 'u1'),
+    ('corrupted', '?'),
+    ('state', 'i1'),
+    ('size', '<u4'),
+    ('seq', '<i8'),
+])
+
+EVENTS = ['send', 'retransmit', 'tx', 'tx_ack', 'queue_drop', 'rx', 'rx_ack', 'buffered', 'delivered', 'acked',
+          'queue_drop_ack']
+(SEND, RETRANSMIT, TX, TX_ACK, QUEUE_DROP, RX, RX_ACK, BUFFERED, DELIVERED, ACKED,
+ QUEUE_DROP_ACK) = range(len(EVENTS))
+# Events of ACK/SACK frames, whose seq names the DATA frame they acknowledge
+ACK_EVENTS = (TX_ACK, RX_ACK, QUEUE_DROP_ACK)
+
+
+class TraceRecorder:
+    """
+    Preallocated ring buffer of TRACE_DTYPE records, optionally flushed
+    to 'path' (raw records, read back with load_trace).
+    A copy made by pickling (simulation snapshots and forks) is detached
+    from the file: it keeps the records not flushed yet as an in-memory
+    ring, so two simulations never append to the same file.
+    """
+    def __init__(self, capacity=1 << 16, path=None):
+        self.capacity = capacity
+        self.path = path
+        self._buffer = np.zeros(capacity, dtype=TRACE_DTYPE)
+        self._next = 0          # Slot of the next record
+        self.recorded = 0       # Records written in total (ring overwrites included)
+        self.flushed = 0        # Records already in the file
+        if path is not None:
+            open(path, 'wb').close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.path is not None:
+            state.update(path=None, flushed=0, recorded=self._next)
+        return state
+
+    def record(self, time, event, seq, size, corrupted=False, state=-1):
+        self._buffer[self._next] = (time, event, corrupted, state, size, seq)
+        self._next += 1
+        self.recorded += 1
+        if self._next == self.capacity:
+            if self.path is not None:
+                self.flush()
+            else:
+                self._next = 0  # Ring: overwrite the oldest records
+
+    def flush(self):
+        """
+        Appends the buffered records to the file (no-op without a path).
+        """
+        if self.path is None or not self._next:
+            return
+        n = self._next
+        with open(self.path, 'r+b') as f:
+            f.truncate((self.flushed + n) * TRACE_DTYPE.itemsize)
+        out = np.memmap(self.path, dtype=TRACE_DTYPE, mode='r+',
+                        offset=self.flushed * TRACE_DTYPE.itemsize, shape=(n,))
+        out[:] = self._buffer[:n]
+        out.flush()
+        del out
+        self.flushed += n
+        self._next = 0
+
+    def records(self):
+        """
+        Records still in memory, oldest first.
+        """
+        if self.path is None and self.recorded > self.capacity:
+            return np.concatenate([self._buffer[self._next:], self._buffer[:self._next]])
+        return self._buffer[:self._next].copy()
+
+
+def load_trace(path):
+    """
+    Memory-mapped records of a trace file.
+    """
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=TRACE_DTYPE)
+    return np.memmap(path, dtype=TRACE_DTYPE, mode='r')
+
+
+def frame_timelines(records):
+    """
+    {seq: records of that DATA frame, in time order}. ACK/SACK records
+    are left out: their seq names the frame they acknowledge.
+    """
+    data = records[~np.isin(records['event'], ACK_EVENTS)]
+    order = np.lexsort((data['time'], data['seq']))
+    data = data[order]
+    seqs, starts = np.unique(data['seq'], return_index=True)
+    bounds = list(starts[1:]) + [len(data)]
+    return {int(seq): data[start:end] for seq, start, end in zip(seqs, starts, bounds)}
+
+
+def _first(records, event):
+    """
+    {seq: time of the first 'event' record of that seq}.
+    """
+    mask = records['event'] == event
+    seqs, index = np.unique(records['seq'][mask], return_index=True)
+    return dict(zip(seqs.tolist(), records['time'][mask][index].tolist()))
+
+
+def summarize(records):
+    """
+    Per-frame aggregates rebuilt from the timelines: transmissions per
+    frame, corruption by channel state, time in the reorder buffer and
+    send-to-delivery latency.
+    """
+    events = records['event']
+    tx = records[events == TX]
+    tx_per_frame = np.bincount(np.unique(tx['seq'], return_inverse=True)[1]) if len(tx) else np.zeros(0, int)
+
+    sent, buffered, delivered = _first(records, SEND), _first(records, BUFFERED), _first(records, DELIVERED)
+    reorder = np.array([delivered[s] - buffered[s] for s in delivered if s in buffered])
+    latency = np.array([delivered[s] - sent[s] for s in delivered if s in sent])
+
+    by_state = {}
+    for state, name in ((0, 'good'), (1, 'bad')):
+        in_state = tx['state'] == state
+        by_state[name] = (int(in_state.sum()), int(tx['corrupted'][in_state].sum()))
+
+    def describe(values):
+        if not len(values):
+            return None
+        return {'mean': float(values.mean()), 'p50': float(np.percentile(values, 50)),
+                'p99': float(np.percentile(values, 99)), 'max': float(values.max())}
+
+    return {
+        'records': len(records),
+        'event_counts': {name: int(np.count_nonzero(events == i)) for i, name in enumerate(EVENTS)},
+        'frames': len(tx_per_frame),
+        'retransmitted_frames': int(np.count_nonzero(tx_per_frame > 1)),
+        'max_transmissions': int(tx_per_frame.max()) if len(tx_per_frame) else 0,
+        'tx_by_state': by_state,
+        'reorder_wait': describe(reorder),
+        'latency': describe(latency),
+    }
+
+
+def _print_summary(summary):
+    print(f"{summary['records']} records, {summary['frames']} data frames, "
+          f"{summary['retransmitted_frames']} retransmitted (up to {summary['max_transmissions']} transmissions)")
+    print("events: " + ", ".join(f"{name}={count}" for name, count in summary['event_counts'].items() if count))
+    for state, (total, corrupted) in summary['tx_by_state'].items():
+        if total:
+            print(f"channel {state:4s}: {total} transmissions, {corrupted} corrupted ({corrupted / total:.1%})")
+    for key, label in (('reorder_wait', 'reorder buffer wait'), ('latency', 'send -> delivery')):
+        d = summary[key]
+        if d:
+            print(f"{label}: mean {d['mean'] * 1e3:.2f} ms, p50 {d['p50'] * 1e3:.2f} ms, "
+                  f"p99 {d['p99'] * 1e3:.2f} ms, max {d['max'] * 1e3:.2f} ms")
+
+
+def _print_timeline(seq, timeline):
+    print(f"frame {seq}:")
+    for r in timeline:
+        extra = ""
+        if r['event'] in (TX, TX_ACK):
+            extra = f" state={'bad' if r['state'] else 'good'}{' CORRUPTED' if r['corrupted'] else ''}"
+        elif r['event'] == RX and r['corrupted']:
+            extra = " CORRUPTED"
+        print(f"  {r['time']:12.6f}  {EVENTS[r['event']]:10s} {r['size']:6d} B{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame trace recorder and analyzer")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="Run one traced simulation")
+    run.add_argument('-W', type=int, default=8)
+    run.add_argument('-L', type=int, default=1024)
+    run.add_argument('--seed', type=int, default=1)
+    run.add_argument('--max-sim-time', type=float, default=None)
+    run.add_argument('--out', required=True, help="Trace file to write")
+    analyze = commands.add_parser('analyze', help="Summarise a trace file")
+    analyze.add_argument('path')
+    analyze.add_argument('--seq', type=int, action='append', help="Print the timeline of this frame")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        from src.simulation import Simulation
+
+        trace = TraceRecorder(path=args.out)
+        with Simulation(args.W, args.L, args.seed, 0, max_sim_time=args.max_sim_time, trace=trace) as simulation:
+            simulation.run()
+            trace.flush()
+            stats = simulation.stats()
+        print(f"W={args.W} L={args.L}: goodput {stats['goodput_mbps']:.4f} Mbps, "
+              f"{trace.flushed} records -> {args.out}")
+        return
+
+    records = load_trace(args.path)
+    _print_summary(summarize(records))
+    if args.seq:
+        timelines = frame_timelines(records)
+        for seq in args.seq:
+            if seq in timelines:
+                _print_timeline(seq, timelines[seq])
+            else:
+                print(f"frame {seq}: not in trace")
+
+
+if __name__ == "__main__":
+    main()
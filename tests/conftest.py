@@ -0,0 +1,30 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Tests import the project modules (config, src.*) from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+
+@pytest.fixture
+def small_file(monkeypatch):
+    """
+    Short transfers (300 KB instead of 100 MB) so whole simulations run in well under a second.
+    """
+    monkeypatch.setattr(config, 'FILE_SIZE_BYTES', 300_000)
+
+
+def run_stats(W, L, seed=None, run_id=0, **kwargs):
+    """
+    stats() of one finished simulation, engine counters included.
+    """
+    from src.simulation import Simulation
+
+    seed = W * 10000 + L * 100 if seed is None else seed
+    with Simulation(W, L, seed, run_id, **kwargs) as simulation:
+        simulation.run()
+        return simulation.stats(engine_stats=True)
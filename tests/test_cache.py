@@ -0,0 +1,85 @@
+# tests/test_cache.py
+import functools
+import os
+
+import pytest
+
+import config
+from src import cache
+from src.cache import ResultCache
+
+
+# Simulations actually run (cache misses); module-level, so the simulate callable's description stays the same
+CALLS = []
+
+
+def counting_simulate(W, L, seed, run_id, scale=1.0):
+    CALLS.append((W, L, seed, run_id))
+    return {'W': W, 'L': L, 'run_id': run_id, 'goodput_mbps': scale * seed}
+
+
+@pytest.fixture
+def result_cache(tmp_path):
+    CALLS.clear()
+    return ResultCache(counting_simulate, cache_dir=str(tmp_path)), CALLS
+
+
+def test_hit_returns_stored_row(result_cache):
+    rc, calls = result_cache
+    first = rc(2, 128, 1, 0)
+    assert rc(2, 128, 1, 0) == first
+    assert rc(2, 128, 2, 0) != first
+    assert len(calls) == 2
+
+
+def test_config_change_invalidates(result_cache, monkeypatch):
+    rc, calls = result_cache
+    rc(2, 128, 1, 0)
+    monkeypatch.setattr(config, 'P_B', config.P_B * 2)
+    rc(2, 128, 1, 0)
+    assert len(calls) == 2
+
+
+def test_simulate_arguments_invalidate(result_cache, tmp_path):
+    rc, calls = result_cache
+    rc(2, 128, 1, 0)
+    ResultCache(functools.partial(counting_simulate, scale=2.0), cache_dir=str(tmp_path))(2, 128, 1, 0)
+    assert len(calls) == 2
+
+
+def test_payload_content_invalidates(result_cache, tmp_path, monkeypatch):
+    rc, calls = result_cache
+    payload = tmp_path / 'payload.bin'
+    payload.write_bytes(b'a' * 1000)
+    monkeypatch.setattr(config, 'PAYLOAD_FILE', str(payload))
+    rc(2, 128, 1, 0)
+    rc(2, 128, 1, 0)
+    assert len(calls) == 1
+
+    # Same path and size, new content
+    payload.write_bytes(b'b' * 1000)
+    st = os.stat(payload)
+    os.utime(payload, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    rc(2, 128, 1, 0)
+    assert len(calls) == 2
+
+
+def test_eviction_is_periodic(result_cache, monkeypatch):
+    rc, _ = result_cache
+    scans = []
+    monkeypatch.setattr(cache, 'evict', lambda *args: scans.append(args))
+    for seed in range(2 * cache.EVICT_EVERY + 1):
+        rc(2, 128, seed, 0)
+    assert len(scans) == 3
+
+
+def test_evict_keeps_most_recent(result_cache, tmp_path):
+    rc, calls = result_cache
+    for seed in range(10):
+        rc(2, 128, seed, 0)
+        path = rc._path(rc.key(2, 128, seed, 0))
+        os.utime(path, (seed, seed))
+    size = os.path.getsize(path)
+    assert cache.evict(str(tmp_path), max_bytes=3 * size) == 7
+    rc(2, 128, 9, 0)
+    assert len(calls) == 10
@@ -0,0 +1,86 @@
+# tests/test_event_manager.py
+import random
+
+import pytest
+
+import config
+from src.event_manager import CalendarQueue, EventManager, HeapQueue, make_event_queue
+from tests.conftest import run_stats
+
+
+def _drain_order(queue, operations):
+    """
+    Applies (op, value) operations to an EventManager on 'queue' and
+    returns the (timestamp, tag) order in which the events ran. Events are
+    scheduled 'value' seconds ahead, on a 1 ms grid so that many tie.
+    """
+    manager = EventManager(queue)
+    order = []
+    pending = []
+    for op, value in operations:
+        if op == 'schedule':
+            timestamp = round(manager.current_time + value, 3)
+            tag = len(pending)
+            pending.append(manager.schedule_at(timestamp, order.append, args=((timestamp, tag),)))
+        elif op == 'cancel' and pending:
+            manager.cancel_event(pending[value % len(pending)])
+        elif op == 'step':
+            manager.run_step()
+    manager.run()
+    return order
+
+
+def _random_operations(rng, n):
+    operations = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.55:
+            # Clustered delays (many exact ties) and a few far-future ones
+            delay = rng.choice([0.0, 0.001, 0.002, rng.random() * 0.3, rng.random() * 50])
+            operations.append(('schedule', delay))
+        elif r < 0.65:
+            operations.append(('cancel', rng.randrange(1 << 30)))
+        else:
+            operations.append(('step', None))
+    return operations
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_calendar_queue_pops_in_heap_order(seed):
+    operations = _random_operations(random.Random(seed), 5000)
+    assert _drain_order(CalendarQueue(), operations) == _drain_order(HeapQueue(), operations)
+
+
+def test_calendar_queue_resizes_and_keeps_order():
+    queue = CalendarQueue()
+    rng = random.Random(1)
+    entries = [[rng.random() * 10, i, object(), ()] for i in range(2000)]
+    for entry in entries:
+        queue.push(entry)
+    assert queue._nbuckets > CalendarQueue.MIN_BUCKETS
+    popped = [queue.pop() for _ in range(len(entries))]
+    assert popped == sorted(entries, key=lambda e: (e[0], e[1]))
+    assert queue._nbuckets == CalendarQueue.MIN_BUCKETS
+
+
+def test_equal_timestamps_run_fifo():
+    for kind in ('heap', 'calendar'):
+        manager = EventManager(make_event_queue(kind))
+        order = []
+        for i in range(20):
+            manager.schedule_at(1.0, order.append, args=(i,))
+        manager.run()
+        assert order == list(range(20))
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        make_event_queue('fibonacci')
+
+
+@pytest.mark.parametrize('W, L', [(2, 128), (16, 1024), (64, 512)])
+def test_same_results_with_either_backend(small_file, monkeypatch, W, L):
+    monkeypatch.setattr(config, 'EVENT_QUEUE', 'heap')
+    heap = run_stats(W, L)
+    monkeypatch.setattr(config, 'EVENT_QUEUE', 'calendar')
+    assert run_stats(W, L) == heap
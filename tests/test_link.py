@@ -0,0 +1,231 @@
+# tests/test_link.py
+import random
+
+import pytest
+
+import config
+from src.event_manager import EventManager
+from src.link import LinkLayer
+from src.packet import TransportSegment
+
+
+class LossyPhysical:
+    """
+    Stand-in for PhysicalLayer: every frame arrives after a random delay
+    (so frames overtake each other), is lost with probability 'loss' or
+    arrives twice with probability 'duplicate'.
+    """
+    def __init__(self, event_manager, rng, loss=0.2, duplicate=0.05):
+        self.event_manager = event_manager
+        self.rng = rng
+        self.loss = loss
+        self.duplicate = duplicate
+
+    def transmit(self, packet, is_forward_path, receiver_callback):
+        if self.rng.random() < self.loss:
+            return
+        copies = 2 if self.rng.random() < self.duplicate else 1
+        for _ in range(copies):
+            self.event_manager.schedule(self.rng.uniform(0.01, 0.05), receiver_callback, args=(packet, False))
+
+    def transmit_batch(self, packets, is_forward_path, receiver_callback):
+        for packet in packets:
+            self.transmit(packet, is_forward_path, receiver_callback)
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.delivered = []
+
+    def receive_segment(self, segment):
+        self.delivered.append(segment.seq_num)
+        return True
+
+
+class DictReference:
+    """
+    Window state kept the way the LinkLayer did before its rings and
+    bitmaps: a set of ACKed seqs and a dict of buffered payloads.
+    """
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self.send_base = 0
+        self.acked = set()
+        self.rcv_base = 0
+        self.buffered = {}
+
+    def ack(self, seqs, next_seq_num):
+        self.acked.update(seq for seq in seqs if self.send_base <= seq < next_seq_num)
+        while self.send_base in self.acked:
+            self.acked.remove(self.send_base)
+            self.send_base += 1
+
+    def data(self, seq, payload):
+        if self.rcv_base <= seq < self.rcv_base + self.window_size:
+            self.buffered.setdefault(seq, payload)
+        while self.rcv_base in self.buffered:
+            del self.buffered[self.rcv_base]
+            self.rcv_base += 1
+
+
+def _bits(mask, base):
+    seqs = set()
+    while mask:
+        low = mask & -mask
+        seqs.add(base + low.bit_length() - 1)
+        mask ^= low
+    return seqs
+
+
+def _check_against_reference(sender, receiver, reference):
+    assert sender.send_base == reference.send_base
+    assert _bits(sender.acked_mask, sender.send_base) == reference.acked
+    assert receiver.rcv_base == reference.rcv_base
+    buffered = {seq: receiver.rcv_buffer[seq % receiver.window_size]
+                for seq in _bits(receiver.rcv_mask, receiver.rcv_base)}
+    assert buffered == reference.buffered
+
+
+def _run_pair(window_size, n_segments, seed):
+    """
+    Transfers n_segments over a lossy, reordering, duplicating path and
+    checks the rings/bitmaps against DictReference after every arrival.
+    """
+    event_manager = EventManager()
+    physical = LossyPhysical(event_manager, random.Random(seed))
+    transport = RecordingTransport()
+    sender = LinkLayer(physical, event_manager, window_size=window_size)
+    receiver = LinkLayer(physical, event_manager, transport, window_size=window_size)
+    reference = DictReference(window_size)
+    sacks = []
+
+    def to_receiver(frame, corrupted):
+        reference.data(frame.seq_num, frame.payload)
+        receiver.receive_frame_from_physical(frame, corrupted)
+        _check_against_reference(sender, receiver, reference)
+
+    def to_sender(frame, corrupted):
+        if frame.type == 'SACK':
+            sacks.append(frame)
+            # Everything below the cumulative ACK, plus the flagged frames
+            seqs = set(range(reference.send_base, frame.cum_ack)) | _bits(frame.bitmap, frame.cum_ack)
+        else:
+            seqs = {frame.seq_num}
+        next_seq_num = sender.next_seq_num
+        sender.receive_frame_from_physical(frame, corrupted)
+        reference.ack(seqs, next_seq_num)
+        _check_against_reference(sender, receiver, reference)
+
+    sender.set_peer_callback(to_receiver)
+    receiver.set_peer_callback(to_sender)
+
+    segments = iter(range(n_segments))
+
+    def fill_window():
+        while sender.next_seq_num < sender.send_base + window_size:
+            seq = next(segments, None)
+            if seq is None:
+                return
+            sender.send(TransportSegment(seq, b'x' * 16))
+
+    sender.set_window_open_callback(fill_window)
+    event_manager.schedule(0.0, fill_window)
+    while event_manager.event_queue and sender.send_base < n_segments:
+        event_manager.run_step()
+
+    assert transport.delivered == list(range(n_segments))
+    assert sender.send_base == sender.next_seq_num == n_segments
+    return sender, sacks
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('window_size', [1, 3, 8, 64])
+def test_ring_matches_dict_window(monkeypatch, window_size, seed):
+    monkeypatch.setattr(config, 'ACK_MODE', 'per_frame')
+    # Many times the window, so every slot is reused
+    sender, _ = _run_pair(window_size, 20 * window_size + 7, seed)
+    assert sender.total_retransmissions > 0
+    assert len(sender.timers) == 0
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('window_size', [1, 3, 8, 64])
+def test_sack_matches_dict_window(monkeypatch, window_size, seed):
+    monkeypatch.setattr(config, 'ACK_MODE', 'sack')
+    sender, sacks = _run_pair(window_size, 20 * window_size + 7, seed)
+    assert sacks
+    # The bitmap only ever describes the receive window
+    assert all(sack.bitmap >> window_size == 0 and not sack.bitmap & 1 for sack in sacks)
+    assert len(sender.timers) == 0
+
+
+def _sender_with_outstanding(monkeypatch, window_size, n):
+    """
+    Sender LinkLayer with frames 0..n-1 sent and none acknowledged.
+    """
+    monkeypatch.setattr(config, 'ACK_MODE', 'sack')
+    event_manager = EventManager()
+    physical = LossyPhysical(event_manager, random.Random(0), loss=1.0)
+    sender = LinkLayer(physical, event_manager, window_size=window_size)
+    sender.set_peer_callback(lambda frame, corrupted: None)
+    for seq in range(n):
+        sender.send(TransportSegment(seq, b'x' * 16))
+    event_manager.current_time = 0.03
+    return sender
+
+
+def test_sack_bitmap_acks_flagged_frames(monkeypatch):
+    sender = _sender_with_outstanding(monkeypatch, 8, 8)
+    # 0 and 1 received in order, 3 and 6 buffered (bits 1 and 4 above cum_ack 2)
+    sender.receive_sack(6, 2, 0b10010)
+    assert sender.send_base == 2
+    assert _bits(sender.acked_mask, sender.send_base) == {3, 6}
+    assert [seq for seq in range(8) if seq in sender.timers] == [2, 4, 5, 7]
+    # Only the triggering frame gives an RTT sample: twice in the mean
+    # accumulator (clean ACK), once in the quantile estimators
+    assert sender.rtt_stats.count == 2
+    assert sender.rtt_p50._initial == sender.rtt_p99._initial == [pytest.approx(0.03)]
+
+
+def test_sack_duplicate_and_stale(monkeypatch):
+    sender = _sender_with_outstanding(monkeypatch, 8, 8)
+    sender.receive_sack(6, 2, 0b10010)
+    state = (sender.send_base, sender.acked_mask, sender.rtt_stats.count)
+    sender.receive_sack(6, 2, 0b10010)
+    # Older SACK: cum_ack below send_base, its bits shifted accordingly
+    sender.receive_sack(3, 1, 0b100)
+    assert (sender.send_base, sender.acked_mask, sender.rtt_stats.count) == state
+
+    # Bits beyond the frames sent so far are ignored
+    sender.receive_sack(2, 3, 0b10 | 1 << 20)
+    assert sender.send_base == 5
+    assert _bits(sender.acked_mask, sender.send_base) == {6}
+
+
+class RecordingPhysical:
+    """
+    Stand-in for PhysicalLayer that only logs each transmit call.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def transmit(self, packet, is_forward_path, receiver_callback):
+        self.calls.append([packet.seq_num])
+
+    def transmit_batch(self, packets, is_forward_path, receiver_callback):
+        self.calls.append([packet.seq_num for packet in packets])
+
+
+def test_window_opening_leaves_as_one_train(monkeypatch, small_file):
+    from src.simulation import Simulation
+
+    monkeypatch.setattr(config, 'ACK_MODE', 'per_frame')
+    monkeypatch.setattr(config, 'FRAME_TRAINS', True)
+    with Simulation(4, 256, 40256, 0) as simulation:
+        sender = simulation.link_sender
+        sender.physical = physical = RecordingPhysical()
+        simulation.event_manager.run_step()     # Initial kickstart
+        # Frame 0 is ACKed last, so the window opens by four frames at once
+        for seq in (1, 2, 3, 0):
+            sender.receive_ack(seq)
+    assert physical.calls == [[0, 1, 2, 3], [4, 5, 6, 7]]
@@ -0,0 +1,171 @@
+# tests/test_physical.py
+import numpy as np
+import pytest
+
+import config
+from src.physical import make_channel
+
+
+def _exact(size_bytes):
+    """
+    Stationary frame error rate and P(error | previous frame in error)
+    for back-to-back frames of 'size_bytes', from the transition matrices.
+    """
+    bits = size_bytes * 8
+    transition = np.array([[1 - config.TRANS_G_TO_B, config.TRANS_G_TO_B],
+                           [config.TRANS_B_TO_G, 1 - config.TRANS_B_TO_G]])
+    ok = np.diag([1 - config.P_G, 1 - config.P_B]) @ transition
+    error = np.linalg.matrix_power(transition, bits) - np.linalg.matrix_power(ok, bits)
+    stationary = np.array([config.TRANS_B_TO_G, config.TRANS_G_TO_B])
+    stationary /= stationary.sum()
+    fer = stationary @ error @ np.ones(2)
+    both = stationary @ error @ error @ np.ones(2)
+    return fer, both / fer
+
+
+# Frames per run and tolerance (about 4 standard deviations, bursts included)
+@pytest.mark.parametrize('size_bytes, frames, tolerance', [(64, 40000, 0.006), (1024, 10000, 0.02)])
+@pytest.mark.parametrize('model', ['scalar', 'batched', 'matrix'])
+def test_channel_matches_gilbert_elliot_model(model, size_bytes, frames, tolerance):
+    channel = make_channel(model, rng=np.random.default_rng(7))
+    corrupted = np.array([channel.is_packet_corrupted(size_bytes) for _ in range(frames)])
+    fer, burst = _exact(size_bytes)
+
+    assert corrupted.mean() == pytest.approx(fer, abs=tolerance)
+    # State carries over from frame to frame: errors come in bursts
+    after_error = corrupted[1:][corrupted[:-1]]
+    assert after_error.mean() == pytest.approx(burst, abs=3 * tolerance)
+
+
+def _outcomes(channel, frames=200):
+    return [(channel.is_packet_corrupted(1024), channel.current_state) for _ in range(frames)]
+
+
+@pytest.mark.parametrize('model', ['scalar', 'batched', 'matrix'])
+def test_reset_stream_switches_generator(model):
+    channel = make_channel(model, rng=np.random.default_rng(3))
+    _outcomes(channel, 100)
+    state = channel.current_state
+    channel.reset_stream(np.random.default_rng(11))
+    assert channel.current_state == state
+
+    # From then on, the draws depend on the new generator alone
+    twin = make_channel(model, rng=np.random.default_rng(99))
+    _outcomes(twin, 37)
+    twin.current_state = state
+    twin.reset_stream(np.random.default_rng(11))
+    assert _outcomes(channel) == _outcomes(twin)
+
+
+def test_unknown_channel_model():
+    with pytest.raises(ValueError):
+        make_channel('gaussian')
+
+
+class _Frame:
+    def __init__(self, seq_num, size_bytes):
+        self.seq_num = seq_num
+        self.size_bytes = size_bytes
+        self.type = 'DATA'
+
+
+def _deliveries(batched, sizes, interrupt_at=None):
+    """
+    (time, what) log of frames sent back-to-back at t=0, by one transmit()
+    per frame or one transmit_batch(); an unrelated event at 'interrupt_at'
+    lands in the middle of the train.
+    """
+    from src.event_manager import EventManager
+    from src.physical import PhysicalLayer
+
+    event_manager = EventManager()
+    physical = PhysicalLayer(event_manager, channel=make_channel('matrix', rng=np.random.default_rng(5)))
+    log = []
+
+    def receive(frame, corrupted):
+        log.append((event_manager.current_time, frame.seq_num, corrupted))
+
+    frames = [_Frame(i, size) for i, size in enumerate(sizes)]
+    if batched:
+        physical.transmit_batch(frames, True, receive)
+    else:
+        for frame in frames:
+            physical.transmit(frame, True, receive)
+    if interrupt_at is not None:
+        event_manager.schedule_at(interrupt_at, lambda: log.append((event_manager.current_time, 'other', None)))
+    event_manager.run()
+    return log, physical.frames_transmitted
+
+
+@pytest.mark.parametrize('interrupt_at', [None, 0.0, 0.0458, 0.0495, 1.0])
+def test_train_matches_per_frame_transmit(interrupt_at):
+    sizes = [1024, 1024, 64, 4096, 512, 1024, 1024, 128]
+    per_frame = _deliveries(False, sizes, interrupt_at)
+    assert _deliveries(True, sizes, interrupt_at) == per_frame
+    times = [t for t, what, _ in per_frame[0] if what != 'other']
+    assert times == sorted(times) and len(set(times)) == len(sizes)
+
+
+def test_unbounded_transmitter_times_match_bounded():
+    from src.physical import Transmitter
+
+    unbounded, bounded = Transmitter(), Transmitter(capacity_bytes=10 ** 9)
+    arrivals = np.cumsum(np.random.default_rng(2).exponential(0.0005, 500))
+    for now in arrivals:
+        assert unbounded.send(now, 1048) == bounded.send(now, 1048)
+    assert unbounded.stats()['enqueued'] == bounded.stats()['enqueued'] == 500
+    # The unbounded queue counts the part of the frame in service still to
+    # be sent, the bounded one the whole frame
+    assert 1048 <= unbounded.stats()['peak_occupancy_bytes'] <= bounded.stats()['peak_occupancy_bytes']
+    assert bounded.stats()['peak_occupancy_bytes'] - unbounded.stats()['peak_occupancy_bytes'] < 1048
+
+
+def _backlog_average(arrivals, size_bytes, end, steps=200_000):
+    """
+    Time average of the bytes not yet sent, sampled on a fine grid.
+    """
+    busy_until = np.empty(len(arrivals))
+    busy = 0.0
+    for i, now in enumerate(arrivals):
+        busy = max(now, busy) + size_bytes * 8 / config.BIT_RATE
+        busy_until[i] = busy
+    grid = np.linspace(0, end, steps, endpoint=False) + end / steps / 2
+    last = np.searchsorted(arrivals, grid, side='right') - 1
+    backlog = np.where(last >= 0, busy_until[np.maximum(last, 0)] - grid, 0.0)
+    return np.maximum(backlog, 0.0).mean() * config.BIT_RATE / 8
+
+
+@pytest.mark.parametrize('rate', [0.0005, 0.002])
+def test_unbounded_occupancy_is_time_average(rate):
+    from src.physical import Transmitter
+
+    transmitter = Transmitter()
+    arrivals = np.cumsum(np.random.default_rng(4).exponential(rate, 300))
+    for now in arrivals:
+        transmitter.send(now, 1048)
+    end = arrivals[-1] + 0.01
+    average = transmitter.stats(now=end)['avg_occupancy_bytes']
+    assert average == pytest.approx(_backlog_average(arrivals, 1048, end), rel=1e-3)
+
+
+def test_bounded_occupancy_is_time_average():
+    from src.physical import Transmitter
+
+    transmitter = Transmitter(capacity_bytes=10 ** 6)
+    tx = 1000 * 8 / config.BIT_RATE
+    # Two frames at t=0 (departing at tx and 2 tx), then idle until 4 tx
+    transmitter.send(0.0, 1000)
+    transmitter.send(0.0, 1000)
+    stats = transmitter.stats(now=4 * tx)
+    assert stats['peak_occupancy_bytes'] == 2000
+    assert stats['avg_occupancy_bytes'] == pytest.approx((2000 * tx + 1000 * tx) / (4 * tx))
+
+
+def test_droptail_drops_when_full():
+    from src.physical import Transmitter
+
+    transmitter = Transmitter(capacity_bytes=3000)
+    results = [transmitter.send(0.0, 1000) for _ in range(5)]
+    assert [r is None for r in results] == [False, False, False, True, True]
+    assert transmitter.stats()['drops'] == 2
+    assert transmitter.stats()['peak_occupancy_bytes'] == 3000
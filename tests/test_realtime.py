@@ -0,0 +1,40 @@
+# tests/test_realtime.py
+import asyncio
+import os
+
+import pytest
+
+from src.packet import LinkFrame, SackFrame, TransportSegment
+from src.realtime import decode_frame, encode_frame, run_realtime
+
+
+@pytest.mark.parametrize('frame', [
+    LinkFrame(7, 'DATA', TransportSegment(3, b'payload' * 20)),
+    LinkFrame(7, 'ACK'),
+    SackFrame(7, 5, 0b1010, 16),
+])
+def test_crc_rejects_flipped_byte(frame):
+    datagram = encode_frame(frame, 16)
+    assert len(datagram) == frame.size_bytes
+
+    decoded, corrupted = decode_frame(datagram, 16)
+    assert not corrupted
+    assert (decoded.type, decoded.seq_num, decoded.size_bytes) == (frame.type, frame.seq_num, frame.size_bytes)
+
+    damaged = bytearray(datagram)
+    damaged[-1] ^= 0xFF
+    assert decode_frame(bytes(damaged), 16)[1] is True
+
+
+def test_impaired_transfer_delivers_the_file(tmp_path):
+    path = tmp_path / 'payload.bin'
+    path.write_bytes(os.urandom(20_000))
+
+    stats = asyncio.run(run_realtime(32, 1024, None, impair=True, seed=3, timeout=30.0, path=str(path)))
+    assert stats['finished']
+    assert stats['bytes_delivered'] == 20_000
+    # Frames corrupted by the channel failed the CRC check and were
+    # retransmitted: the receiver's SHA-256 matches the file
+    assert stats['corrupted_frames'] > 0
+    assert stats['retransmissions'] > 0
+    assert stats['integrity_ok'] is True
@@ -0,0 +1,88 @@
+# tests/test_results_store.py
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from main import FIELDNAMES
+from src import results_store
+from src.results_store import ResultsStore, _parse, csv_to_store, store_to_csv
+from src.sweep import build_grid, load_completed, run_sweep
+from tests.test_sweep import fake_simulate
+
+
+def _csv_rows(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_csv_store_round_trip(tmp_path):
+    csv_path = str(tmp_path / 'sweep.csv')
+    tasks = build_grid([2, 4], [128, 256], 3)
+    run_sweep(fake_simulate, tasks, csv_path, FIELDNAMES, workers=1)
+
+    store_path = csv_to_store(csv_path)
+    assert len(ResultsStore(store_path)) == len(tasks)
+    back = str(tmp_path / 'back.csv')
+    store_to_csv(store_path, back)
+
+    original, exported = _csv_rows(csv_path), _csv_rows(back)
+    assert len(original) == len(exported)
+    for a, b in zip(original, exported):
+        assert {name: _parse(a[name]) for name in FIELDNAMES} == {name: _parse(b[name]) for name in FIELDNAMES}
+
+
+def test_sweep_rows_reach_the_store_immediately(tmp_path):
+    path = str(tmp_path / 'sweep.store')
+    calls = []
+
+    def simulate(W, L, seed, run_id):
+        # Every row finished so far is already readable from disk
+        assert len(load_completed(path)) == len(calls)
+        calls.append(run_id)
+        return fake_simulate(W, L, seed, run_id)
+
+    tasks = build_grid([2], [128, 256], 3)
+    run_sweep(simulate, tasks, path, FIELDNAMES, workers=1)
+    store = ResultsStore(path)
+    assert len(store) == len(tasks)
+    assert len(store._chunk_dirs()) == 1
+    assert store.column('run_id').tolist() == [t[3] for t in tasks]
+
+
+def test_interrupted_compaction_keeps_every_row_once(tmp_path, monkeypatch):
+    store = ResultsStore(str(tmp_path / 'c.store'), chunk_rows=2).create([('x', 'int64')])
+    for x in range(7):
+        store.append({'x': x})
+    store.flush()
+    assert len(store._chunk_dirs()) == 4
+
+    # Crash right after the commit point: new chunk still aside, old chunks all there
+    def crash(self):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(ResultsStore, '_finish_compaction', crash)
+    with pytest.raises(KeyboardInterrupt):
+        store.compact(order=np.arange(7)[::-1])
+    monkeypatch.undo()
+
+    reopened = ResultsStore(store.path)
+    assert reopened.column('x').tolist() == list(range(7))[::-1]
+    assert len(reopened._chunk_dirs()) == 1
+    assert not os.path.exists(os.path.join(store.path, results_store.COMPACT_MARKER))
+
+
+def test_crash_before_commit_keeps_old_chunks(tmp_path, monkeypatch):
+    store = ResultsStore(str(tmp_path / 'c.store'), chunk_rows=2).create([('x', 'int64')])
+    for x in range(5):
+        store.append({'x': x})
+    store.flush()
+
+    def crash(*args):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(results_store.json, 'dump', crash)
+    with pytest.raises(KeyboardInterrupt):
+        store.compact()
+    monkeypatch.undo()
+
+    assert ResultsStore(store.path).column('x').tolist() == list(range(5))
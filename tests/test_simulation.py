@@ -0,0 +1,73 @@
+# tests/test_simulation.py
+import os
+
+import pytest
+
+import config
+from src.simulation import Simulation, run_forked
+from tests.conftest import run_stats
+
+
+def _open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+@pytest.fixture
+def payload_file(tmp_path, monkeypatch):
+    path = tmp_path / 'payload.bin'
+    path.write_bytes(os.urandom(200_000))
+    monkeypatch.setattr(config, 'PAYLOAD_FILE', str(path))
+    return path
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason="needs /proc")
+@pytest.mark.parametrize('max_sim_time', [0.5, None])
+def test_close_releases_payload_file(payload_file, max_sim_time):
+    before = _open_fds()
+    for run_id in range(3):
+        # Stopped mid-transfer (frames in flight) or run to completion
+        with Simulation(16, 1024, 1, run_id, max_sim_time=max_sim_time) as simulation:
+            simulation.run()
+        stats = simulation.stats()
+        assert stats['integrity_ok'] is (None if max_sim_time else True)
+    assert _open_fds() == before
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason="needs /proc")
+def test_snapshot_and_fork_own_their_file(payload_file):
+    before = _open_fds()
+    with Simulation(16, 1024, 1, 0) as simulation:
+        simulation.run(until=0.5)
+        snapshot = simulation.snapshot()
+        with simulation.fork(2) as fork:
+            fork.run()
+            assert fork.stats()['integrity_ok'] is True
+        # Closing the fork left the original untouched
+        simulation.run()
+        assert simulation.stats()['integrity_ok'] is True
+    with Simulation.restore(snapshot) as restored:
+        restored.run()
+        assert restored.stats()['integrity_ok'] is True
+    assert len(run_forked(16, 1024, 1, 0, 0.5, [3, 4], workers=1)) == 2
+    assert _open_fds() == before
+
+
+def test_closed_simulation_does_not_run(small_file):
+    with Simulation(8, 512, 1, 0) as simulation:
+        simulation.run(until=0.2)
+    assert simulation.run() is True
+    assert simulation.stats()['duration'] <= 0.2
+
+
+@pytest.mark.parametrize('model', ['scalar', 'batched', 'matrix'])
+@pytest.mark.parametrize('W, L', [(4, 256), (32, 1024)])
+def test_same_seed_same_stats_across_engine_settings(small_file, monkeypatch, model, W, L):
+    monkeypatch.setattr(config, 'CHANNEL_MODEL', model)
+    results = []
+    for queue in ('heap', 'calendar'):
+        for trains in (False, True):
+            monkeypatch.setattr(config, 'EVENT_QUEUE', queue)
+            monkeypatch.setattr(config, 'FRAME_TRAINS', trains)
+            results.append(run_stats(W, L))
+    assert all(stats == results[0] for stats in results[1:])
+    assert run_stats(W, L) == run_stats(W, L)
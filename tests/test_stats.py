@@ -0,0 +1,33 @@
+# tests/test_stats.py
+import pytest
+
+from src.stats import EXACT_T_DF, t_quantile
+
+# Student t quantiles (df, p) -> t, to 12 significant digits
+T_TABLE = {
+    (1, 0.975): 12.7062047362,
+    (2, 0.975): 4.30265272975,
+    (3, 0.975): 3.18244630528,
+    (3, 0.995): 5.84090930973,
+    (4, 0.975): 2.77644510520,
+    (4, 0.995): 4.60409487142,
+    (5, 0.95): 2.01504837334,
+    (9, 0.975): 2.26215716280,
+    (29, 0.995): 2.75638590367,
+    (30, 0.975): 2.04227245630,
+    (60, 0.975): 2.00029782106,
+    (120, 0.995): 2.61742135168,
+}
+
+
+@pytest.mark.parametrize('df, p', sorted(T_TABLE))
+def test_t_quantile_table(df, p):
+    tolerance = 1e-9 if df <= EXACT_T_DF else 1e-6
+    assert t_quantile(p, df) == pytest.approx(T_TABLE[(df, p)], abs=tolerance)
+
+
+@pytest.mark.parametrize('df', [1, 2, 3, 4, 7, 30, 31, 200])
+def test_t_quantile_symmetric(df):
+    for p in (0.6, 0.9, 0.975, 0.995):
+        assert t_quantile(1 - p, df) == pytest.approx(-t_quantile(p, df), abs=1e-9)
+    assert t_quantile(0.5, df) == pytest.approx(0.0, abs=1e-12)
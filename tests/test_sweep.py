@@ -0,0 +1,82 @@
+# tests/test_sweep.py
+import csv
+
+import pytest
+
+from main import FIELDNAMES
+from src.sweep import build_grid, load_completed, run_sweep
+
+
+def fake_simulate(W, L, seed, run_id):
+    """
+    Cheap deterministic stand-in for run_simulation: one value per column.
+    """
+    row = {name: seed % 97 + i for i, name in enumerate(FIELDNAMES)}
+    row.update({'W': W, 'L': L, 'run_id': run_id, 'goodput_mbps': seed / 1e6, 'stopped_early': run_id % 2 == 0})
+    return row
+
+
+def _read(path):
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+
+def test_resume_onto_file_with_fewer_columns(tmp_path, capsys):
+    # A file written before the newer metric columns existed
+    path = str(tmp_path / 'old.csv')
+    old_columns = FIELDNAMES[:9]
+    tasks = build_grid([2, 4], [128], 2)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=old_columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerow(fake_simulate(*tasks[0]))
+
+    assert run_sweep(fake_simulate, tasks, path, FIELDNAMES, workers=1) == len(tasks) - 1
+
+    header, rows = _read(path)
+    assert header == FIELDNAMES
+    assert len(rows) == len(tasks)
+    assert all(None not in row for row in rows)
+    # Old row kept, with the new columns empty
+    assert rows[0]['queue_peak_bytes'] == ''
+    assert rows[1]['queue_peak_bytes'] == str(fake_simulate(*tasks[1])['queue_peak_bytes'])
+    assert load_completed(path) == {task[:3] for task in tasks}
+
+
+def test_resume_refuses_mismatched_rows(tmp_path):
+    path = str(tmp_path / 'broken.csv')
+    with open(path, 'w', newline='') as f:
+        f.write(','.join(FIELDNAMES[:3]) + '\n')
+        f.write('2,128,0,1.0,5\n')   # More fields than the header
+    with pytest.raises(ValueError, match='do not match the header'):
+        run_sweep(fake_simulate, build_grid([2], [128], 2), path, FIELDNAMES, workers=1)
+
+
+def test_sweep_file_in_grid_order(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    tasks = build_grid([2, 4], [128, 256], 2)
+    run_sweep(fake_simulate, tasks[::-1], path, FIELDNAMES, workers=1, reorder=False)
+    run_sweep(fake_simulate, tasks, path, FIELDNAMES, workers=1)
+    _, rows = _read(path)
+    assert [(int(r['W']), int(r['L']), int(r['run_id'])) for r in rows] == \
+        [(W, L, run_id) for W, L, _, run_id in tasks]
+
+
+def test_optimize_with_gaps_in_run_ids(tmp_path):
+    from src.surrogate import optimize
+
+    # run_ids 0 and 2 only: the next run of that cell is 3, not len() == 2
+    path = str(tmp_path / 'history.csv')
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for run_id in (0, 2):
+            writer.writerow(fake_simulate(2, 128, 2 * 10000 + 128 * 100 + run_id, run_id))
+
+    # A single candidate cell, so every pick lands on it
+    best = optimize(fake_simulate, path, FIELDNAMES, budget=5, w_values=[2], l_values=[128],
+                    prior_paths=[], workers=1)
+    assert best['simulations'] == 5
+    _, rows = _read(path)
+    assert sorted(int(r['run_id']) for r in rows) == [0, 2, 3, 4, 5]
@@ -0,0 +1,136 @@
+# tests/test_timer_wheel.py
+import random
+
+import pytest
+
+from src.event_manager import EventManager
+from src.timer_wheel import TimerWheel
+
+
+def _wheel(**kwargs):
+    manager = EventManager()
+    batches = []
+    wheel = TimerWheel(manager, lambda keys: batches.append((manager.current_time, list(keys))), **kwargs)
+    return manager, wheel, batches
+
+
+def test_arm_expires_at_deadline():
+    manager, wheel, batches = _wheel()
+    wheel.arm('a', 0.25)
+    manager.run()
+    assert batches == [(0.25, ['a'])]
+    assert len(wheel) == 0
+
+
+def test_cancel_leaves_no_driver():
+    manager, wheel, batches = _wheel()
+    wheel.arm('a', 0.25)
+    wheel.arm('b', 0.5)
+    wheel.cancel('a')
+    wheel.cancel('missing')
+    assert manager.queue_stats()['live'] == 1
+    wheel.cancel('b')
+    assert manager.queue_stats()['live'] == 0
+    manager.run()
+    assert batches == []
+    assert manager.events_executed == 0
+
+
+def test_rearm_moves_deadline():
+    manager, wheel, batches = _wheel()
+    wheel.arm('a', 0.1)
+    wheel.arm('a', 0.3)
+    manager.run()
+    assert batches == [(0.3, ['a'])]
+    assert manager.events_executed == 1
+
+
+def test_batch_in_arm_order():
+    manager, wheel, batches = _wheel()
+    for key in (5, 3, 9, 1):
+        wheel.arm(key, 0.2)
+    wheel.arm(7, 0.1)
+    manager.run()
+    assert batches == [(0.1, [7]), (0.2, [5, 3, 9, 1])]
+
+
+def _reference_expiries(operations):
+    """
+    (time, key) expiry order with one EventManager event per timer.
+    """
+    manager = EventManager()
+    events = {}
+    expired = []
+
+    def expire(key):
+        del events[key]
+        expired.append((manager.current_time, key))
+
+    def apply(op, key, delay):
+        if key in events:
+            manager.cancel_event(events.pop(key))
+        if op == 'arm':
+            events[key] = manager.schedule(delay, expire, args=(key,))
+
+    _replay(manager, operations, apply)
+    return expired
+
+
+def _wheel_expiries(operations, **kwargs):
+    manager, wheel, batches = _wheel(**kwargs)
+
+    def apply(op, key, delay):
+        if op == 'arm':
+            wheel.arm(key, delay)
+        else:
+            wheel.cancel(key)
+
+    _replay(manager, operations, apply)
+    return [(t, key) for t, keys in batches for key in keys], manager
+
+
+def _replay(manager, operations, apply):
+    # Operations are applied from inside events, as the link layer does
+    for at, op, key, delay in operations:
+        manager.schedule_at(at, apply, args=(op, key, delay))
+    manager.run()
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('geometry', [{}, {'slots': 4, 'levels': 2}])
+def test_matches_per_timer_events(seed, geometry):
+    rng = random.Random(seed)
+    operations = []
+    for _ in range(2000):
+        at = round(rng.random() * 5, 3)
+        op = 'arm' if rng.random() < 0.7 else 'cancel'
+        # Delays on a coarse grid so that many deadlines tie, a few far off (overflow)
+        delay = rng.choice([0.05, 0.1, round(rng.random(), 3), rng.random() * 200])
+        operations.append((at, op, rng.randrange(64), delay))
+
+    expired, manager = _wheel_expiries(operations, **geometry)
+    assert expired == _reference_expiries(operations)
+    # Every driver that ran expired at least one timer
+    assert manager.events_executed == len(operations) + len({t for t, _ in expired})
+
+
+def test_rearm_earlier_than_other_driver():
+    # k3's driver is not the earliest (k4's is) when k3 moves before both
+    operations = [(0.504, 'arm', 'k3', 0.967), (0.947, 'arm', 'k4', 0.477), (0.962, 'arm', 'k3', 0.223)]
+    expired, _ = _wheel_expiries(operations)
+    assert expired == _reference_expiries(operations) == [(0.962 + 0.223, 'k3'), (0.947 + 0.477, 'k4')]
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('geometry', [{}, {'slots': 4, 'levels': 2}])
+def test_rearm_heavy_matches_per_timer_events(seed, geometry):
+    rng = random.Random(seed)
+    operations = []
+    for _ in range(300):
+        at = round(rng.random() * 3, 3)
+        op = 'arm' if rng.random() < 0.9 else 'cancel'
+        # Few keys, so most arms restart a running timer, often to an earlier deadline
+        operations.append((at, op, rng.randrange(6), round(rng.random(), 3)))
+
+    expired, _ = _wheel_expiries(operations, **geometry)
+    assert expired == _reference_expiries(operations)
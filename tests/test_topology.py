@@ -0,0 +1,38 @@
+# tests/test_topology.py
+import pytest
+
+from conftest import run_stats
+from src.topology import MultiFlowSimulation, jain_fairness, run_multiflow
+
+
+@pytest.mark.parametrize('W, L', [(4, 512), (16, 1024)])
+def test_one_flow_matches_simulation(small_file, W, L):
+    seed = W * 10000 + L * 100
+    single = run_stats(W, L, seed, steady_state=False)
+    multi = run_multiflow(1, W, L, seed, 0)
+    flow = multi['per_flow'][0]
+
+    assert multi['finished_flows'] == 1
+    assert flow['finish_time'] == multi['duration'] == single['duration']
+    assert flow['goodput_mbps'] == single['goodput_mbps']
+    assert flow['retransmissions'] == single['retransmissions']
+    assert flow['avg_rtt'] == single['avg_rtt']
+    assert multi['jain_fairness'] == 1.0
+
+
+def test_jain_fairness():
+    assert jain_fairness([0.3] * 10) == pytest.approx(1.0)
+    assert jain_fairness([1.0, 0, 0, 0]) == pytest.approx(0.25)
+    assert jain_fairness([0, 0]) == 1.0
+
+
+def test_identical_flows_share_the_link(small_file):
+    simulation = MultiFlowSimulation(4, 8, 512, 1, 0, bytes_per_flow=100_000)
+    simulation.run()
+    stats = simulation.stats()
+    assert stats['finished_flows'] == 4
+    goodputs = [flow['goodput_mbps'] for flow in stats['per_flow']]
+    assert stats['jain_fairness'] == pytest.approx(jain_fairness(goodputs))
+    # Same window, payload and file size: no flow starves the others
+    assert stats['jain_fairness'] > 0.9
+    assert stats['aggregate_goodput_mbps'] > max(goodputs)
@@ -0,0 +1,46 @@
+# tests/test_trace.py
+import numpy as np
+
+from src.event_manager import EventManager
+from src.packet import LinkFrame, SackFrame, TransportSegment
+from src.physical import PhysicalLayer, Transmitter
+from src.trace import QUEUE_DROP, QUEUE_DROP_ACK, TX, TraceRecorder, frame_timelines, load_trace
+
+
+def test_ack_queue_drop_stays_out_of_data_timelines():
+    trace = TraceRecorder()
+    physical = PhysicalLayer(EventManager(), transmitter=Transmitter(capacity_bytes=2000))
+    physical.trace = trace
+    # Two 1000-byte DATA frames fill the queue; the ACK and SACK behind them are dropped
+    data = [LinkFrame(seq, 'DATA', TransportSegment(seq, b'x' * 968)) for seq in (7, 8)]
+    for frame in data + [LinkFrame(7, 'ACK')]:
+        physical.transmit(frame, True, lambda frame, corrupted: None)
+    physical.transmit_batch([SackFrame(8, 9, 0, 8)], True, lambda frame, corrupted: None)
+
+    records = trace.records()
+    assert list(records['event']).count(QUEUE_DROP_ACK) == 2
+    assert QUEUE_DROP not in records['event']
+    timelines = frame_timelines(records)
+    assert sorted(timelines) == [7, 8]
+    assert all(list(timeline['event']) == [TX] for timeline in timelines.values())
+
+
+def _traced_run(path, fork_at=None):
+    from src.simulation import Simulation
+
+    with Simulation(4, 512, 4512, 0, trace=TraceRecorder(capacity=256, path=path)) as simulation:
+        if fork_at is not None:
+            simulation.run(until=fork_at)
+            with simulation.fork(1) as fork:
+                assert fork.trace.path is None
+                fork.run()
+        simulation.run()
+    return simulation.trace
+
+
+def test_fork_detaches_trace_file(tmp_path, small_file):
+    plain = _traced_run(str(tmp_path / 'plain.bin'))
+    forked = _traced_run(str(tmp_path / 'forked.bin'), fork_at=0.5)
+    # The fork ran to completion in between, yet the file holds the original run alone
+    assert forked.flushed == forked.recorded == plain.recorded > 256
+    assert np.array_equal(load_trace(str(tmp_path / 'forked.bin')), load_trace(str(tmp_path / 'plain.bin')))